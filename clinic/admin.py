@@ -5,13 +5,25 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.db.models import Count, Q
 from django.utils import timezone
-from .models import CustomUser, Appointment, TreatmentPlan, Testimonial, EmailVerification
+from .caching import bump_version
+from . import bulk, search, stats, testimonial_feed
+from .models import CustomUser, Appointment, TreatmentPlan, Testimonial, EmailVerification, OutboundEmail
+
+class IndexedSearchMixin:
+    """Serve the changelist search box from the full-text index instead of LIKE on search_fields"""
+    search_document_kind = None
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.matching_ids(self.search_document_kind, search_term)), False
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(IndexedSearchMixin, UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'is_email_verified', 'date_joined', 'last_login')
     list_filter = ('role', 'is_active', 'is_email_verified', 'date_joined', 'last_login')
     search_fields = ('username', 'email', 'first_name', 'last_name')
+    search_document_kind = 'user'
     ordering = ('-date_joined',)
     readonly_fields = ('created_at', 'updated_at')
     
@@ -32,10 +44,11 @@ class CustomUserAdmin(UserAdmin):
         return super().get_queryset(request).select_related()
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'date', 'service_type', 'status', 'therapist', 'duration', 'created_at', 'get_days_until')
     list_filter = ('service_type', 'status', 'date', 'created_at', 'user__role', 'therapist')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'note', 'therapist__first_name', 'therapist__last_name')
+    search_document_kind = 'appointment'
     ordering = ('-date',)
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'date'
@@ -100,10 +113,7 @@ class TreatmentPlanAdmin(admin.ModelAdmin):
     actions = ['calculate_progress']
     
     def calculate_progress(self, request, queryset):
-        updated_count = 0
-        for plan in queryset:
-            plan.calculate_progress()
-            updated_count += 1
+        updated_count = bulk.update_progress(queryset)
         self.message_user(request, f'Progress calculated for {updated_count} treatment plans.')
     calculate_progress.short_description = 'Calculate progress for selected plans'
     
@@ -115,10 +125,11 @@ class TreatmentPlanAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('appointment__user')
 
 @admin.register(Testimonial)
-class TestimonialAdmin(admin.ModelAdmin):
+class TestimonialAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('get_display_name', 'treatment_type', 'rating', 'is_approved', 'is_featured', 'created_at')
     list_filter = ('treatment_type', 'rating', 'is_approved', 'is_featured', 'anonymous', 'created_at')
     search_fields = ('full_name', 'email', 'condition', 'testimonial_text', 'user__username')
+    search_document_kind = 'testimonial'
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at', 'approved_at', 'get_display_name')
     date_hierarchy = 'created_at'
@@ -155,18 +166,27 @@ class TestimonialAdmin(admin.ModelAdmin):
     
     actions = ['approve_testimonials', 'feature_testimonials', 'unfeatured_testimonials']
     
+    def _after_bulk_testimonial_update(self, queryset):
+        """update() sends no post_save, so do what the Testimonial signals would have done"""
+        bump_version(stats.CACHE_NAMESPACE)
+        bump_version(testimonial_feed.CACHE_NAMESPACE)
+        search.index_queryset(queryset)
+    
     def approve_testimonials(self, request, queryset):
         updated_count = queryset.update(is_approved=True, approved_by=request.user, approved_at=timezone.now())
+        self._after_bulk_testimonial_update(queryset)
         self.message_user(request, f'{updated_count} testimonials approved.')
     approve_testimonials.short_description = 'Approve selected testimonials'
     
     def feature_testimonials(self, request, queryset):
         updated_count = queryset.update(is_featured=True)
+        self._after_bulk_testimonial_update(queryset)
         self.message_user(request, f'{updated_count} testimonials featured.')
     feature_testimonials.short_description = 'Feature selected testimonials'
     
     def unfeatured_testimonials(self, request, queryset):
         updated_count = queryset.update(is_featured=False)
+        self._after_bulk_testimonial_update(queryset)
         self.message_user(request, f'{updated_count} testimonials unfeatured.')
     unfeatured_testimonials.short_description = 'Unfeature selected testimonials'
     
@@ -212,14 +232,7 @@ class EmailVerificationAdmin(admin.ModelAdmin):
     is_expired_status.short_description = 'Status'
     
     def mark_as_used(self, request, queryset):
-        updated_count = 0
-        for verification in queryset:
-            try:
-                if not verification.is_used:
-                    verification.mark_as_used()
-                    updated_count += 1
-            except Exception as e:
-                self.message_user(request, f'Error updating verification {verification.id}: {e}', level='ERROR')
+        updated_count = bulk.update_in_batches(queryset.filter(is_used=False), is_used=True, used_at=timezone.now())
         self.message_user(request, f'{updated_count} verifications marked as used.')
     mark_as_used.short_description = 'Mark selected verifications as used'
     
@@ -245,6 +258,24 @@ class EmailVerificationAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    ordering = ('-created_at',)
+    readonly_fields = ('attempts', 'locked_at', 'last_error', 'created_at', 'sent_at')
+    date_hierarchy = 'created_at'
+    
+    actions = ['requeue_messages']
+    
+    def requeue_messages(self, request, queryset):
+        updated_count = queryset.exclude(status='sent').update(
+            status='queued', attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f'{updated_count} emails requeued.')
+    requeue_messages.short_description = 'Requeue selected emails'
+
 # Customize admin site
 admin.site.site_header = "AL-BOQAI Center Administration"
 admin.site.site_title = "AL-BOQAI Admin"
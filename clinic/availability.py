@@ -0,0 +1,121 @@
+"""
+Therapist Availability
+Appointments are treated as half-open [date, date + duration) intervals.
+"""
+from bisect import bisect_left
+from datetime import time, timedelta
+
+from django.conf import settings
+
+from .booking import clinic_datetime
+from .models import Appointment
+
+# Statuses that occupy a time slot
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+BUSINESS_START = time(8, 0)
+BUSINESS_END = time(20, 0)
+
+
+def _max_duration():
+    return timedelta(minutes=getattr(settings, 'APPOINTMENT_MAX_DURATION_MINUTES', 480))
+
+
+def business_hours(day):
+    """Aware [open, close) datetimes for a calendar day, in the clinic's timezone"""
+    return clinic_datetime(day, BUSINESS_START), clinic_datetime(day, BUSINESS_END)
+
+
+def busy_intervals(start, end, **party):
+    """
+    Return the sorted (start, end, appointment_id) intervals that overlap
+    [start, end) for one party, e.g. therapist=<user> or user=<user>.
+
+    `date` is indexed together with the party column, so the lookup is a
+    single range scan: an appointment can only overlap the window if it
+    starts before `end` and no earlier than `start` minus the longest
+    allowed duration. The exact overlap test is then done on those rows.
+    """
+    rows = (
+        Appointment.objects
+        .filter(**party, status__in=ACTIVE_STATUSES, date__gte=start - _max_duration(), date__lt=end)
+        .order_by('date')
+        .values_list('id', 'date', 'duration')
+    )
+    intervals = []
+    for appointment_id, begins, duration in rows:
+        ends = begins + timedelta(minutes=duration)
+        if ends > start:
+            intervals.append((begins, ends, appointment_id))
+    return intervals
+
+
+def merge_intervals(intervals):
+    """Collapse overlapping or touching intervals into disjoint (start, end) pairs"""
+    merged = []
+    for begins, ends, *_ in sorted(intervals):
+        if merged and begins <= merged[-1][1]:
+            if ends > merged[-1][1]:
+                merged[-1] = (merged[-1][0], ends)
+        else:
+            merged.append((begins, ends))
+    return merged
+
+
+def find_conflicts(start, duration, therapist=None, user=None, guest_email=None, exclude_id=None):
+    """
+    Return the active appointments that overlap [start, start + duration)
+    for the given therapist, patient account or guest email.
+    """
+    end = start + timedelta(minutes=duration)
+    # is_guest matches the condition of the partial (guest_email, date) index
+    parties = [
+        {'therapist': therapist},
+        {'user': user},
+        {'guest_email': guest_email, 'is_guest': True},
+    ]
+    conflict_ids = set()
+    for party in parties:
+        if next(iter(party.values())) is None:
+            continue
+        conflict_ids.update(
+            appointment_id
+            for _, _, appointment_id in busy_intervals(start, end, **party)
+            if appointment_id != exclude_id
+        )
+    if not conflict_ids:
+        return []
+    return list(Appointment.objects.filter(id__in=conflict_ids).order_by('date'))
+
+
+def free_slots(therapist, day, duration=60, step=None):
+    """
+    List the [start, end) slots of `duration` minutes on `day` in which the
+    therapist has no active appointment, on a grid of `step` minutes within
+    business hours.
+
+    Busy time is fetched with one range query and merged once; each
+    candidate slot is then checked with a binary search over the merged
+    intervals, so the cost is O(n log n + slots log n) for n appointments.
+    """
+    step = step or getattr(settings, 'AVAILABILITY_SLOT_MINUTES', 30)
+    opens, closes = business_hours(day)
+    busy = merge_intervals(busy_intervals(opens, closes, therapist=therapist))
+    busy_starts = [begins for begins, _ in busy]
+    length = timedelta(minutes=duration)
+
+    slots = []
+    slot_start = opens
+    while slot_start + length <= closes:
+        slot_end = slot_start + length
+        # The only merged interval that can overlap is the last one starting before slot_end
+        index = bisect_left(busy_starts, slot_end) - 1
+        if index >= 0 and busy[index][1] > slot_start:
+            # Skip straight past the busy block instead of testing every grid point inside it
+            blocked_until = busy[index][1]
+            steps = -(-(blocked_until - opens) // timedelta(minutes=step))
+            slot_start = max(opens + steps * timedelta(minutes=step), slot_start + timedelta(minutes=step))
+            continue
+        slots.append((slot_start, slot_end))
+        slot_start += timedelta(minutes=step)
+    return slots, busy
@@ -0,0 +1,31 @@
+"""
+Authentication Backends
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from . import profile_cache
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session user from the per-user profile
+    cache, so authenticated requests do not query CustomUser each time.
+    Password checks are unchanged; the cached copy is dropped whenever the
+    user is saved, which also covers password changes and deactivation.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # ModelBackend stays listed after this one so sessions stored under
+            # its path keep resolving; stop authenticate() there, or a failed
+            # login would run the password hasher a second time
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        user = profile_cache.get_cached_user(user_id)
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        return user
@@ -0,0 +1,256 @@
+"""
+Booking Validation
+Booking payloads are checked against a table of field rules in a single
+pass. Patterns, choice tables and messages are built once at import, and the
+appointment date and time are parsed once. Validators return the cleaned
+values together with every error found, so the caller can answer with the
+full list in one response.
+
+PUBLIC_BOOKING validates public_appointment_booking, GUEST_DETAILS the guest
+fields of AppointmentSerializer.create, and GUEST_UPDATE the fields a guest
+may change through guest_appointment_update.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'[\d\s\-\+\(\)]{10,}')
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+TIME_PATTERN = re.compile(r'\d{2}:\d{2}')
+
+GENDERS = frozenset(('male', 'female', 'other'))
+# Human-readable service names from the booking form, and the model values themselves
+SERVICE_TYPES = {
+    'manual therapy': 'manual-therapy',
+    'physical therapy': 'physical-therapy',
+    'rehabilitation': 'rehabilitation',
+    'consultation': 'consultation',
+    'follow-up': 'follow-up',
+    'assessment': 'assessment',
+}
+SERVICE_TYPES.update({value: value for value in list(SERVICE_TYPES.values())})
+TRUE_VALUES = frozenset(('true', '1', 'yes', 'on'))
+
+OPENING_HOUR = 8
+CLOSING_HOUR = 20
+MAX_DAYS_AHEAD = 180
+
+
+def clinic_datetime(day, at):
+    """
+    Combine a calendar day and a wall-clock time in the clinic's own
+    timezone, without make_aware()'s per-request active-timezone lookup.
+    """
+    return datetime.combine(day, at, tzinfo=timezone.get_default_timezone())
+
+
+class Invalid(str):
+    """An error message returned by a cleaner in place of the cleaned value"""
+
+
+# Messages are built once; cleaners return them rather than raising, which keeps invalid payloads cheap
+INVALID_EMAIL = Invalid('Please enter a valid email address')
+INVALID_PHONE = Invalid('Please enter a valid phone number (minimum 10 digits)')
+INVALID_AGE = Invalid('Age must be a valid number')
+AGE_OUT_OF_RANGE = Invalid('Age must be between 1 and 120 years')
+INVALID_GENDER = Invalid('Gender must be Male, Female, or Other')
+INVALID_SERVICE_TYPE = Invalid(
+    'Please select a valid service type. Available options: Manual Therapy, Physical Therapy, '
+    'Rehabilitation, Consultation, Follow-up, Assessment'
+)
+INVALID_DATE_FORMAT = Invalid('Appointment date must be in YYYY-MM-DD format')
+INVALID_TIME_FORMAT = Invalid('Appointment time must be in HH:MM format (24-hour)')
+INVALID_DATETIME = Invalid(
+    'Invalid date/time format. Please use YYYY-MM-DD for date and HH:MM for time (24-hour format)'
+)
+
+
+def text(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def email(value):
+    return value if EMAIL_PATTERN.fullmatch(text(value)) else INVALID_EMAIL
+
+
+def phone(value):
+    return value if PHONE_PATTERN.fullmatch(text(value)) else INVALID_PHONE
+
+
+def age(value):
+    if isinstance(value, str):
+        if not value.isdigit():
+            return INVALID_AGE
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        return INVALID_AGE
+    value = int(value)
+    return value if 1 <= value <= 120 else AGE_OUT_OF_RANGE
+
+
+def gender(value):
+    value = text(value).lower()
+    return value if value in GENDERS else INVALID_GENDER
+
+
+def service_type(value):
+    return SERVICE_TYPES.get(text(value).lower(), INVALID_SERVICE_TYPE)
+
+
+def appointment_date(value):
+    value = text(value)
+    # fromisoformat() also takes week dates and compact forms; only YYYY-MM-DD is accepted
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    # The pattern only decides which message the rejected value gets
+    return INVALID_DATETIME if DATE_PATTERN.fullmatch(value) else INVALID_DATE_FORMAT
+
+
+def appointment_time(value):
+    value = text(value)
+    if len(value) == 5 and value[2] == ':':
+        try:
+            return time.fromisoformat(value)
+        except ValueError:
+            pass
+    return INVALID_DATETIME if TIME_PATTERN.fullmatch(value) else INVALID_TIME_FORMAT
+
+
+def boolean(value):
+    if isinstance(value, str):
+        return value.lower() in TRUE_VALUES
+    return bool(value)
+
+
+class Field:
+    """One row of a validator's table: the payload key, its label and how the value is cleaned"""
+
+    __slots__ = ('name', 'label', 'clean', 'required', 'default')
+
+    def __init__(self, name, label, clean=None, required=True, default=None):
+        self.name = name
+        self.label = label
+        # None keeps the stripped value as it is
+        self.clean = clean
+        self.required = required
+        self.default = default
+
+
+class BookingValidator:
+    """
+    Validates a payload against a table of Fields. Missing optional fields
+    take their default (or are left out when it is None). With
+    `schedule=True`, appointment_date and appointment_time are also combined
+    into an aware `date` that must fall in the future, within
+    MAX_DAYS_AHEAD days and within opening hours.
+    """
+
+    def __init__(self, fields, schedule=False):
+        self.fields = tuple(fields)
+        self.schedule = schedule
+        # The table flattened once, with the "is required" messages already formatted.
+        # Fields that cannot fail are only read for payloads that passed everything else.
+        rules = [
+            (field.name, field.clean, f'{field.label} is required' if field.required else None, field.default)
+            for field in self.fields
+        ]
+        self.checks = tuple(rule for rule in rules if rule[1] is not None or rule[2] is not None)
+        self.extras = tuple(rule for rule in rules if rule[1] is None and rule[2] is None)
+
+    def validate(self, data, now=None):
+        """Return (cleaned, errors); cleaned values are only complete when errors is empty"""
+        cleaned = {}
+        errors = []
+        self.read(self.checks, data, cleaned, errors)
+        if errors:
+            return cleaned, errors
+        self.read(self.extras, data, cleaned, errors)
+        if self.schedule:
+            errors.extend(self.check_schedule(cleaned, now or timezone.now()))
+        return cleaned, errors
+
+    def read(self, rules, data, cleaned, errors):
+        get = data.get
+        for name, clean, missing, default in rules:
+            value = get(name)
+            if value is None:
+                if missing is not None:
+                    errors.append(missing)
+                elif default is not None:
+                    cleaned[name] = default
+                continue
+            if value.__class__ is str:
+                value = value.strip()
+                if not value:
+                    if missing is not None:
+                        errors.append(missing)
+                    else:
+                        cleaned[name] = ''
+                    continue
+            if clean is not None:
+                value = clean(value)
+                if value.__class__ is Invalid:
+                    errors.append(value)
+                    continue
+            cleaned[name] = value
+
+    def check_schedule(self, cleaned, now):
+        when = clinic_datetime(cleaned['appointment_date'], cleaned['appointment_time'])
+        cleaned['date'] = when
+        errors = []
+        if when <= now:
+            errors.append('Appointment date and time must be in the future')
+        if when > now + timedelta(days=MAX_DAYS_AHEAD):
+            errors.append('Appointment cannot be scheduled more than 6 months in advance')
+        if not OPENING_HOUR <= when.hour < CLOSING_HOUR:
+            errors.append('Appointments are only available between 8:00 AM and 8:00 PM')
+        return errors
+
+
+PUBLIC_BOOKING = BookingValidator([
+    Field('firstname', 'First Name'),
+    Field('lastname', 'Last Name'),
+    Field('email', 'Email Address', email),
+    Field('phone', 'Phone Number', phone),
+    Field('age', 'Age', age),
+    Field('gender', 'Gender', gender),
+    Field('service_type', 'Service Type', service_type),
+    Field('appointment_date', 'Appointment Date', appointment_date),
+    Field('appointment_time', 'Appointment Time', appointment_time),
+    Field('symptoms', 'Symptoms Description'),
+    Field('is_guest', 'Guest Booking', boolean, required=False, default=False),
+    Field('medical_history', 'Medical History', required=False),
+    Field('previous_treatment', 'Previous Treatment', required=False),
+    Field('special_requirements', 'Special Requirements', required=False),
+    Field('insurance', 'Insurance', required=False),
+    Field('urgency', 'Urgency', required=False, default='routine'),
+    Field('referral', 'Referral Source', required=False),
+], schedule=True)
+
+GUEST_DETAILS = BookingValidator([
+    Field('guest_first_name', 'Guest first name'),
+    Field('guest_last_name', 'Guest last name'),
+    Field('guest_email', 'Guest email', email),
+    Field('guest_phone', 'Guest phone', phone),
+])
+
+GUEST_UPDATE = BookingValidator([
+    Field('guest_phone', 'Phone Number', phone, required=False),
+    Field('note', 'Note', required=False),
+])
+
+
+def booking_note(cleaned):
+    """The appointment note recorded for a public booking"""
+    return (
+        f"Symptoms: {cleaned.get('symptoms', '')}\n"
+        f"Medical History: {cleaned.get('medical_history', '')}\n"
+        f"Previous Treatment: {cleaned.get('previous_treatment', '')}\n"
+        f"Special Requirements: {cleaned.get('special_requirements', '')}\n"
+        f"Insurance: {cleaned.get('insurance', '')}\n"
+        f"Urgency: {cleaned.get('urgency', 'routine')}"
+    )
@@ -0,0 +1,94 @@
+"""
+Bulk Operations
+Set-based updates for admin actions and management commands. Queryset
+update() skips save() and post_save, so callers here bump the cache
+namespaces that signals would otherwise have invalidated.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Appointment, TreatmentPlan
+from . import profile_cache, search, stats
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def update_in_batches(queryset, batch_size=DEFAULT_BATCH_SIZE, **values):
+    """
+    Apply queryset.update(**values) in primary-key order, `batch_size` rows
+    per statement, so no single UPDATE holds locks on the whole table.
+    Returns the number of rows updated.
+    """
+    model = queryset.model
+    updated = 0
+    last_pk = None
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:batch_size])
+        if not batch:
+            break
+        updated += model.objects.filter(pk__in=batch).update(**values)
+        last_pk = batch[-1]
+    return updated
+
+
+def update_progress(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Recalculate progress_percentage for every plan in the queryset"""
+    updated = update_in_batches(
+        queryset,
+        batch_size=batch_size,
+        progress_percentage=TreatmentPlan.progress_expression(),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version(stats.CACHE_NAMESPACE)
+    return updated
+
+
+def verify_users(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Mark users as email-verified and active"""
+    updated = update_in_batches(
+        queryset,
+        batch_size=batch_size,
+        is_email_verified=True,
+        is_active=True,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version(stats.CACHE_NAMESPACE)
+        profile_cache.invalidate_all()
+    return updated
+
+
+def link_guest_appointments(users, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Attach unlinked guest appointments to the email-verified users among
+    `users` whose email they were booked under. Each batch is one UPDATE
+    that looks the owner up in a subquery. The rows stay guest bookings, so
+    their guest IDs keep working. Returns the number of appointments linked
+    (or that would be, with dry_run).
+    """
+    verified = users.filter(is_email_verified=True)
+    pending = Appointment.objects.filter(
+        is_guest=True, user__isnull=True, guest_email__in=verified.values('email'),
+    ).order_by('pk').values_list('pk', flat=True)
+    if dry_run:
+        return pending.count()
+
+    # The oldest verified account wins when several share an email
+    owner = verified.filter(email=OuterRef('guest_email')).order_by('pk').values('pk')[:1]
+    ids = list(pending)
+    linked = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            linked += Appointment.objects.filter(pk__in=batch, user__isnull=True).update(
+                user=Subquery(owner), updated_at=timezone.now(),
+            )
+        # Search documents carry the owner, and update() sends no post_save
+        search.index_queryset(Appointment.objects.filter(pk__in=batch), batch_size=batch_size)
+    if linked:
+        bump_version(stats.CACHE_NAMESPACE)
+    return linked
@@ -0,0 +1,53 @@
+"""
+Versioned cache keys.
+
+Every cached value is stored under a key that embeds its namespace's current
+version. Writers bump the version instead of hunting down individual keys, so
+invalidation is a single cache operation and stale entries simply expire.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def get_version(namespace):
+    """Return the current version of a namespace, creating it if needed"""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Start from a timestamp so an evicted counter never reuses an old version
+        version = time.time_ns()
+        cache.add(_version_key(namespace), version, None)
+        version = cache.get(_version_key(namespace), version)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every key in a namespace"""
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        version = time.time_ns()
+        cache.set(_version_key(namespace), version, None)
+        return version
+
+
+def make_key(namespace, *parts):
+    """Build a versioned key; long or unsafe parts are hashed"""
+    raw = ':'.join(str(part) for part in parts)
+    digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+    return f'{namespace}:v{get_version(namespace)}:{digest}'
+
+
+def get_or_compute(namespace, parts, compute, timeout=300):
+    """Return a cached value for (namespace, parts), computing it on a miss"""
+    key = make_key(namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
@@ -1,41 +1,78 @@
 import django_filters
 from django_filters import rest_framework as filters
 from .models import Appointment, TreatmentPlan, CustomUser
-from django.utils import timezone
-from datetime import datetime, timedelta
-from django.db.models import Q
+from rest_framework.filters import SearchFilter
+from . import search, timewindows
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    ?search= through the full-text index for views that set
+    `search_document_kind`; other views keep DRF's LIKE-based search_fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        kind = getattr(view, 'search_document_kind', None)
+        if kind is None:
+            return super().filter_queryset(request, queryset, view)
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return queryset.filter(pk__in=search.matching_ids(kind, ' '.join(search_terms)))
+
 
 class AppointmentFilter(filters.FilterSet):
     date_from = filters.DateTimeFilter(field_name='date', lookup_expr='gte')
     date_to = filters.DateTimeFilter(field_name='date', lookup_expr='lte')
     status = filters.ChoiceFilter(choices=Appointment.STATUS_CHOICES)
     user = filters.ModelChoiceFilter(queryset=CustomUser.objects.all())
+    # Calendar-day filters are ranges on the raw column so the date index is used
+    date__date = filters.DateFilter(method='filter_day')
     today = filters.BooleanFilter(method='filter_today')
+    tomorrow = filters.BooleanFilter(method='filter_tomorrow')
+    this_week = filters.BooleanFilter(method='filter_this_week')
+    week_of = filters.DateFilter(method='filter_week_of')
     upcoming = filters.BooleanFilter(method='filter_upcoming')
     past = filters.BooleanFilter(method='filter_past')
     
     class Meta:
         model = Appointment
         fields = {
-            'date': ['exact', 'date'],
+            'date': ['exact'],
             'status': ['exact', 'in'],
+            'service_type': ['exact'],
             'duration': ['exact', 'gte', 'lte'],
         }
     
+    def filter_day(self, queryset, name, value):
+        return timewindows.within(queryset, 'date', timewindows.day(value))
+    
     def filter_today(self, queryset, name, value):
         if value:
-            today = timezone.now().date()
-            return queryset.filter(date__date=today)
+            return timewindows.within(queryset, 'date', timewindows.today())
         return queryset
     
+    def filter_tomorrow(self, queryset, name, value):
+        if value:
+            return timewindows.within(queryset, 'date', timewindows.tomorrow())
+        return queryset
+    
+    def filter_this_week(self, queryset, name, value):
+        if value:
+            return timewindows.within(queryset, 'date', timewindows.week())
+        return queryset
+    
+    def filter_week_of(self, queryset, name, value):
+        return timewindows.within(queryset, 'date', timewindows.week(value))
+    
     def filter_upcoming(self, queryset, name, value):
         if value:
-            return queryset.filter(date__gte=timezone.now())
+            return timewindows.within(queryset, 'date', timewindows.upcoming())
         return queryset
     
     def filter_past(self, queryset, name, value):
         if value:
-            return queryset.filter(date__lt=timezone.now())
+            return timewindows.within(queryset, 'date', timewindows.past())
         return queryset
 
 class TreatmentPlanFilter(filters.FilterSet):
@@ -45,13 +82,17 @@ class TreatmentPlanFilter(filters.FilterSet):
     duration_weeks_max = filters.NumberFilter(field_name='duration_weeks', lookup_expr='lte')
     created_after = filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     created_before = filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
+    created_at__date = filters.DateFilter(method='filter_created_on')
     
     class Meta:
         model = TreatmentPlan
         fields = {
             'duration_weeks': ['exact', 'gte', 'lte'],
-            'created_at': ['exact', 'date'],
+            'created_at': ['exact'],
         }
+    
+    def filter_created_on(self, queryset, name, value):
+        return timewindows.within(queryset, 'created_at', timewindows.day(value))
 
 class CustomUserFilter(filters.FilterSet):
     role = filters.ChoiceFilter(choices=CustomUser.ROLE_CHOICES)
@@ -72,9 +113,4 @@ class CustomUserFilter(filters.FilterSet):
         }
     
     def search_filter(self, queryset, name, value):
-        return queryset.filter(
-            Q(username__icontains=value) |
-            Q(email__icontains=value) |
-            Q(first_name__icontains=value) |
-            Q(last_name__icontains=value)
-        ) 
\ No newline at end of file
+        return queryset.filter(pk__in=search.matching_ids('user', value))
\ No newline at end of file
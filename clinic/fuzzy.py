@@ -0,0 +1,333 @@
+"""
+Fuzzy Patient Lookup
+Each patient gets a PatientLookup row whose `key` holds their normalized
+name, username, email and phone digits, plus a consonant "skeleton" of every
+name so that Arabic and English spellings meet (محمد, Mohammed and Mohamed
+all become "mhmd"). Candidates come from a trigram index over the keys and
+are re-ranked in process by trigram similarity:
+
+- PostgreSQL: pg_trgm GIN index, candidates via the %> word-similarity operator
+- SQLite 3.34+: FTS5 trigram table created by migration 0017, queried in two
+  tiers: every word as a substring (or by skeleton) first, then, if that finds
+  too little, any half of each word, which tolerates one typo per word
+- anything else: a scan of every key in process
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import CustomUser, PatientLookup
+
+TRGM_TABLE = 'clinic_patientlookup_trgm'
+MAX_WORDS = 6
+MAX_RESULTS = 25
+CANDIDATES = 100
+DEFAULT_BATCH_SIZE = 500
+# Fields the lookup key depends on
+KEY_FIELDS = {'username', 'email', 'first_name', 'last_name', 'phone_number', 'role'}
+
+_ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي', 'ـ': None,
+    **{chr(0x0660 + n): str(n) for n in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + n): str(n) for n in range(10)},  # Persian digits
+})
+# Arabic letters to Latin consonants; و and ي are vowels except at the start of a word
+_ARABIC_LATIN = {
+    'ا': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h', 'خ': 'kh', 'د': 'd', 'ذ': 'dh',
+    'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': '',
+    'غ': 'gh', 'ف': 'f', 'ق': 'k', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'ة': 'a',
+    'و': 'u', 'ي': 'i', 'ء': '',
+}
+_LATIN_FOLDS = (('ph', 'f'), ('ck', 'k'), ('q', 'k'), ('c', 'k'), ('x', 'ks'))
+_VOWELS = re.compile(r'[aeiouwy]')
+_REPEATS = re.compile(r'(.)\1+')
+_WORD = re.compile(r'[^\W_]+')
+_ARTICLES = ('al', 'el')
+
+
+def fold(text):
+    """Lowercase, strip accents and Arabic diacritics, unify letter variants and digits"""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.translate(_ARABIC_FOLD)
+
+
+def words(text):
+    """Folded words of `text`; digit runs lose their leading zeros so local and international numbers meet"""
+    result = []
+    for word in _WORD.findall(fold(text)):
+        if word.isdigit():
+            word = word.lstrip('0') or '0'
+        result.append(word)
+    return result
+
+
+def _without_article(word):
+    if word.startswith('ال') and len(word) > 3:
+        return word[2:]
+    if word.startswith(_ARTICLES) and len(word) > 5:
+        return word[2:]
+    return None
+
+
+def skeleton(word):
+    """Consonant skeleton of a name: transliterated, vowels dropped, doubled letters collapsed"""
+    if word.isdigit():
+        return ''
+    latin = []
+    for position, char in enumerate(word):
+        if char in ('و', 'ي') and position == 0:
+            latin.append('w' if char == 'و' else 'y')
+        else:
+            latin.append(_ARABIC_LATIN.get(char, char))
+    latin = ''.join(latin)
+    for source, target in _LATIN_FOLDS:
+        latin = latin.replace(source, target)
+    if not latin:
+        return ''
+    # A leading w/y is a consonant (Youssef, Waleed); anywhere else it spells a vowel
+    head, tail = latin[0], latin[1:]
+    head = '' if head in 'aeiou' else head
+    return _REPEATS.sub(r'\1', head + _VOWELS.sub('', tail))
+
+
+def variants(word):
+    """The forms a name word is indexed and matched under: itself without an article, and skeletons"""
+    forms = [word]
+    bare = _without_article(word)
+    if bare:
+        forms.append(bare)
+    skeletons = [skeleton(form) for form in forms]
+    # A single consonant says too little about a name to match on
+    return forms, [form for form in skeletons if len(form) > 1]
+
+
+def lookup_key(user):
+    """Space-delimited key for a patient; the padding lets ' mo' match only at a word start"""
+    key = []
+    for word in words(user.first_name) + words(user.last_name):
+        forms, skeletons = variants(word)
+        key.extend(forms + skeletons)
+    key.extend(words(user.username))
+    if user.email:
+        key.append(fold(user.email))
+    phone = ''.join(char for char in fold(user.phone_number) if char.isdigit())
+    if phone:
+        # All digits in one word, so a number typed with or without spaces is a substring of it
+        key.append(phone.lstrip('0'))
+    return ' ' + ' '.join(dict.fromkeys(key)) + ' '
+
+
+def index_users(users, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert lookup rows for the patients among `users` and drop the rows of anyone else"""
+    rows = [PatientLookup(user_id=user.pk, key=lookup_key(user)) for user in users if user.role == 'patient']
+    others = [user.pk for user in users if user.role != 'patient']
+    if rows:
+        PatientLookup.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['key'],
+        )
+    if others:
+        PatientLookup.objects.filter(user_id__in=others).delete()
+    return len(rows)
+
+
+def index(user, update_fields=None):
+    if update_fields is not None and not set(update_fields) & KEY_FIELDS:
+        return
+    index_users([user])
+
+
+def rebuild(batch_size=DEFAULT_BATCH_SIZE):
+    """Re-key every patient and drop rows of users who are no longer patients; returns the row count"""
+    indexed = 0
+    batch = []
+    for user in CustomUser.objects.filter(role='patient').order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            indexed += index_users(batch, batch_size)
+            batch = []
+    indexed += index_users(batch, batch_size)
+    PatientLookup.objects.exclude(user__role='patient').delete()
+    return indexed
+
+
+@lru_cache(maxsize=65536)
+def trigrams(word):
+    """pg_trgm-style trigrams: two spaces of padding in front, one behind"""
+    padded = f'  {word} '
+    return frozenset(padded[n:n + 3] for n in range(len(padded) - 2))
+
+
+def similarity(query_word, key_word):
+    """
+    How well one query word matches one key word, from 0 to 1. Mostly the
+    share of the query's trigrams found in the key word, so a prefix typed
+    into an autocomplete scores high, with a little Jaccard similarity mixed
+    in so that "ali" ranks Ali above Alina.
+    """
+    if query_word == key_word:
+        return 1.0
+    query_grams, key_grams = trigrams(query_word), trigrams(key_word)
+    shared = len(query_grams & key_grams)
+    if not shared:
+        return 0.0
+    if len(query_word) >= 3 and key_word.startswith(query_word):
+        contained = 1.0
+    elif len(query_word) >= 3 and query_word in key_word:
+        contained = 0.9
+    else:
+        contained = shared / len(query_grams)
+    return 0.8 * contained + 0.2 * shared / (len(query_grams) + len(key_grams) - shared)
+
+
+def matcher(query_words):
+    """
+    Return a function scoring a key against the query: the average over the
+    query words of each one's best match among the key's words, where a match
+    on a skeleton counts for 90%.
+    """
+    weighted = []
+    for word in query_words:
+        forms, skeletons = variants(word)
+        weighted.append([(form, 1.0) for form in forms] + [(form, 0.9) for form in skeletons])
+
+    def score(key):
+        key_words = key.split()
+        if not key_words:
+            return 0.0
+        present = set(key_words)
+        total = 0.0
+        for forms in weighted:
+            if forms[0][0] in present:
+                # The word itself is in the key; nothing can beat that
+                total += 1.0
+                continue
+            total += max(weight * similarity(form, key_word) for form, weight in forms for key_word in key_words)
+        return total / len(weighted)
+
+    return score
+
+
+class ScanBackend:
+    """Score every key in process; the fallback when no trigram index exists"""
+
+    def candidates(self, query_words):
+        return PatientLookup.objects.values_list('user_id', 'key').iterator(chunk_size=2000)
+
+
+class SQLiteTrigramBackend:
+    """FTS5 trigram table; MATCH phrases are substring tests, answered from the index"""
+
+    SQL = f'SELECT rowid, key FROM {TRGM_TABLE} WHERE {TRGM_TABLE} MATCH %s LIMIT %s'
+
+    def phrase(self, text):
+        # Trigram phrases shorter than three characters match nothing
+        return f'"{text}"' if len(text) >= 3 else None
+
+    def exact(self, word):
+        forms, skeletons = variants(word)
+        phrases = [self.phrase(form) or self.phrase(f' {form}') for form in forms]
+        phrases += [self.phrase(f' {form}') for form in skeletons]
+        return [phrase for phrase in phrases if phrase]
+
+    def pieces(self, word):
+        # One edit can break at most one half of a word, so the other half still matches
+        half = len(word) // 2
+        if half < 3:
+            return []
+        return [self.phrase(word[:half]), self.phrase(word[half:])]
+
+    def expression(self, query_words, fuzzy):
+        clauses = []
+        for word in query_words:
+            phrases = self.exact(word) + (self.pieces(word) if fuzzy else [])
+            if phrases:
+                clauses.append('(' + ' OR '.join(dict.fromkeys(phrases)) + ')')
+        return ' AND '.join(clauses)
+
+    def fetch(self, expression):
+        with connection.cursor() as cursor:
+            cursor.execute(self.SQL, [expression, CANDIDATES])
+            return cursor.fetchall()
+
+    def candidates(self, query_words):
+        exact = self.expression(query_words, fuzzy=False)
+        if not exact:
+            return []
+        rows = self.fetch(exact)
+        if len(rows) < CANDIDATES:
+            fuzzy = self.expression(query_words, fuzzy=True)
+            if fuzzy != exact:
+                seen = {row_id for row_id, _ in rows}
+                rows += [row for row in self.fetch(fuzzy) if row[0] not in seen]
+        return rows
+
+
+class PostgresTrigramBackend:
+    """pg_trgm word similarity over the GIN-indexed key, against the query and its skeletons"""
+
+    def candidates(self, query_words):
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        texts = [' '.join(query_words)]
+        skeletons = ' '.join(form for word in query_words for form in variants(word)[1])
+        if skeletons:
+            texts.append(skeletons)
+        condition = Q()
+        for text in texts:
+            # key %> text, the operator the gin_trgm_ops index serves
+            condition |= Q(TrigramWordSimilar(F('key'), Value(text)))
+        similarities = [TrigramWordSimilarity(text, 'key') for text in texts]
+        best = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return (
+            PatientLookup.objects.filter(condition)
+            .annotate(similarity=best)
+            .order_by('-similarity')
+            .values_list('user_id', 'key')[:CANDIDATES]
+        )
+
+
+_trgm_tables = {}
+
+
+def _has_trgm_table():
+    name = str(connection.settings_dict['NAME'])
+    if name not in _trgm_tables:
+        _trgm_tables[name] = TRGM_TABLE in connection.introspection.table_names()
+    return _trgm_tables[name]
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresTrigramBackend()
+    if connection.vendor == 'sqlite' and _has_trgm_table():
+        return SQLiteTrigramBackend()
+    return ScanBackend()
+
+
+def lookup(query, limit=10):
+    """Return up to `limit` (patient, score) pairs for `query`, best first"""
+    query_words = words(query)[:MAX_WORDS]
+    if not query_words:
+        return []
+    threshold = getattr(settings, 'PATIENT_LOOKUP_MIN_SCORE', 0.5)
+    score = matcher(query_words)
+    scored = []
+    for user_id, key in get_backend().candidates(query_words):
+        value = score(key)
+        if value >= threshold:
+            scored.append((value, user_id))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    scored = scored[:limit]
+    users = CustomUser.objects.in_bulk([user_id for _, user_id in scored])
+    return [(users[user_id], round(value, 3)) for value, user_id in scored if user_id in users]
@@ -0,0 +1,42 @@
+"""
+Guest Lookup Cache
+Guests reopen their booking page many times before the visit. The lookup
+response is cached for a short time under a key hashed from the guest ID and
+email, so repeat lookups are answered without touching the database. Each
+guest ID has its own versioned namespace, bumped whenever its appointment is
+saved or deleted: guest updates, status changes and staff edits alike.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import bump_version, make_key
+from .models import Appointment
+from .serializers import GuestAppointmentSerializer
+
+
+def _namespace(guest_id):
+    return f"guest:{hashlib.sha256(str(guest_id).encode('utf-8')).hexdigest()[:32]}"
+
+
+def _timeout():
+    return getattr(settings, 'GUEST_LOOKUP_CACHE_TIMEOUT', 120)
+
+
+def get_appointment(guest_id, email):
+    """GuestAppointmentSerializer data for the guest's appointment, or None if there is no match"""
+    key = make_key(_namespace(guest_id), 'lookup', email)
+    data = cache.get(key)
+    if data is None:
+        # Misses are not cached: a later booking must not be hidden behind a stale "not found"
+        appointment = Appointment.objects.filter(guest_id=guest_id, guest_email=email, is_guest=True).first()
+        if appointment is None:
+            return None
+        data = dict(GuestAppointmentSerializer(appointment).data)
+        cache.set(key, data, _timeout())
+    return data
+
+
+def invalidate(guest_id):
+    bump_version(_namespace(guest_id))
@@ -0,0 +1,25 @@
+"""
+Password Hashing
+PBKDF2 with a work factor set in settings. Stored hashes carry their own
+iteration count, so changing PASSWORD_HASH_ITERATIONS never locks anyone
+out: check_password() verifies with the old count and, on a successful
+login, rehashes to the configured one.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+# OWASP's 2023 recommendation for PBKDF2-HMAC-SHA256; tuning never goes below it
+MIN_ITERATIONS = 600000
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Same algorithm name as Django's hasher, so existing pbkdf2_sha256 hashes
+    are handled by this class and must_update() flags any whose iteration
+    count differs from the configured one.
+    """
+
+    @property
+    def iterations(self):
+        configured = getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+        return max(int(configured), MIN_ITERATIONS)
@@ -0,0 +1,137 @@
+"""
+Idempotency Keys
+Clients send an `Idempotency-Key` header with a POST to make retries safe.
+The first request with a key claims it in the cache (an atomic add, SET NX on
+Redis), runs, and stores its response next to a hash of the request. A retry
+with the same key and payload gets the stored response back without reaching
+the view, so no second appointment, confirmation email or guest ID is made.
+
+- the same key with a different payload is refused with 422
+- a retry while the first request is still running gets 409 and Retry-After
+- server errors (5xx) and exceptions release the key so the client can retry
+
+Keys are scoped to the endpoint and to the caller (user id, or anonymous).
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+
+
+def _ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)
+
+
+def _lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def fingerprint(request):
+    """Hash of what makes two requests the same: method, path and payload"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, cls=JSONEncoder, default=str)
+    return _digest(f'{request.method}:{request.path}:{payload}')
+
+
+def cache_key(scope, request, key):
+    user = getattr(request, 'user', None)
+    caller = user.pk if user is not None and user.is_authenticated else 'anon'
+    return f'idempotency:{scope}:{caller}:{_digest(key)}'
+
+
+def _error(message, status_code, **extra):
+    return Response({'success': False, 'error': message, **extra}, status=status_code)
+
+
+def _in_progress():
+    response = _error(
+        'A request with this Idempotency-Key is still being processed',
+        status.HTTP_409_CONFLICT,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def _answer(entry, request_hash):
+    """Response for a key that is already taken"""
+    if entry['fingerprint'] != request_hash:
+        return _error(
+            'This Idempotency-Key was already used with a different request',
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if entry['state'] == IN_PROGRESS:
+        return _in_progress()
+    response = Response(entry['data'], status=entry['status_code'])
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Decorate a DRF view function (below @api_view) or, through
+    method_decorator, a viewset action. Requests without the header run as
+    before.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.META.get(HEADER)
+            if key is None:
+                return view(request, *args, **kwargs)
+            key = key.strip()
+            if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+                return _error(
+                    f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} printable characters',
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+            storage_key = cache_key(scope, request, key)
+            request_hash = fingerprint(request)
+            entry = cache.get(storage_key)
+            if entry is not None:
+                return _answer(entry, request_hash)
+            claim = {'fingerprint': request_hash, 'state': IN_PROGRESS}
+            if not cache.add(storage_key, claim, _lock_timeout()):
+                # Another request claimed the key between the get and the add
+                entry = cache.get(storage_key)
+                if entry is not None:
+                    return _answer(entry, request_hash)
+                # ...and its entry is already gone again; the view never runs without a claim
+                if not cache.add(storage_key, claim, _lock_timeout()):
+                    return _in_progress()
+
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(storage_key)
+                raise
+            if response.status_code >= 500:
+                cache.delete(storage_key)
+                return response
+            cache.set(storage_key, {
+                'fingerprint': request_hash,
+                'state': DONE,
+                'status_code': response.status_code,
+                # Plain JSON types, so serializer-bound ReturnDicts and datetimes pickle cleanly
+                'data': json.loads(json.dumps(response.data, cls=JSONEncoder)),
+            }, _ttl())
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,303 @@
+"""
+Appointment Import/Export
+Streaming CSV / NDJSON export and batched bulk import of appointments.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Appointment, CustomUser, GuestIdSequence
+from . import search, stats
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column, queryset value path)
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('service_type', 'service_type'),
+    ('status', 'status'),
+    ('duration', 'duration'),
+    ('note', 'note'),
+    ('user_id', 'user_id'),
+    ('user_email', 'user__email'),
+    ('therapist_id', 'therapist_id'),
+    ('is_guest', 'is_guest'),
+    ('guest_id', 'guest_id'),
+    ('guest_first_name', 'guest_first_name'),
+    ('guest_last_name', 'guest_last_name'),
+    ('guest_email', 'guest_email'),
+    ('guest_phone', 'guest_phone'),
+    ('guest_age', 'guest_age'),
+    ('guest_gender', 'guest_gender'),
+    ('created_at', 'created_at'),
+)
+EXPORT_HEADER = [column for column, _ in EXPORT_COLUMNS]
+
+SERVICE_TYPES = {value for value, _ in Appointment.SERVICE_TYPE_CHOICES}
+STATUSES = {value for value, _ in Appointment.STATUS_CHOICES}
+GENDERS = {'male', 'female', 'other'}
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(queryset, chunk_size=None):
+    """Yield one dict per appointment, streaming from the database in chunks"""
+    chunk_size = chunk_size or getattr(settings, 'APPOINTMENT_EXPORT_CHUNK_SIZE', 2000)
+    paths = [path for _, path in EXPORT_COLUMNS]
+    for values in queryset.values_list(*paths).iterator(chunk_size=chunk_size):
+        yield {column: _export_value(value) for column, value in zip(EXPORT_HEADER, values)}
+
+
+def stream_csv(queryset, chunk_size=None):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in iter_export_rows(queryset, chunk_size):
+        yield writer.writerow(['' if row[column] is None else row[column] for column in EXPORT_HEADER])
+
+
+def stream_ndjson(queryset, chunk_size=None):
+    for row in iter_export_rows(queryset, chunk_size):
+        yield json.dumps(row) + '\n'
+
+
+def stream_export(queryset, output='csv', chunk_size=None):
+    if output == 'ndjson':
+        return stream_ndjson(queryset, chunk_size)
+    return stream_csv(queryset, chunk_size)
+
+
+def read_rows(stream, input_format='csv'):
+    """Yield (line_number, row dict) from a binary or text stream"""
+    if isinstance(stream, str):
+        stream = io.StringIO(stream)
+    elif isinstance(stream, bytes):
+        stream = io.BytesIO(stream)
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if input_format == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        # Line 1 is the header
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row
+
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _parse_date(value):
+    date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def clean_row(row):
+    """
+    Validate one import row. Returns (fields, errors); `fields` holds model
+    values plus `_user_key`/`_therapist_key` lookups resolved per batch.
+    """
+    if row is None:
+        return None, ['Row is not a JSON object']
+
+    errors = []
+    fields = {}
+
+    try:
+        fields['date'] = _parse_date(_text(row, 'date'))
+    except ValueError:
+        errors.append('date must be an ISO 8601 datetime')
+
+    service_type = _text(row, 'service_type') or 'consultation'
+    if service_type not in SERVICE_TYPES:
+        errors.append(f'Unknown service_type "{service_type}"')
+    fields['service_type'] = service_type
+
+    status = _text(row, 'status') or 'scheduled'
+    if status not in STATUSES:
+        errors.append(f'Unknown status "{status}"')
+    fields['status'] = status
+
+    try:
+        duration = int(_text(row, 'duration') or 60)
+        if not 15 <= duration <= 480:
+            raise ValueError
+        fields['duration'] = duration
+    except ValueError:
+        errors.append('duration must be a whole number of minutes between 15 and 480')
+
+    fields['note'] = _text(row, 'note')
+
+    is_guest = _text(row, 'is_guest').lower() in TRUE_VALUES
+    fields['is_guest'] = is_guest
+    if is_guest:
+        for key in ('guest_first_name', 'guest_last_name', 'guest_email'):
+            if not _text(row, key):
+                errors.append(f'{key} is required for guest appointments')
+            fields[key] = _text(row, key)
+        fields['guest_id'] = _text(row, 'guest_id') or None
+        fields['guest_phone'] = _text(row, 'guest_phone') or None
+        gender = _text(row, 'guest_gender').lower()
+        if gender and gender not in GENDERS:
+            errors.append(f'Unknown guest_gender "{gender}"')
+        fields['guest_gender'] = gender or None
+        age = _text(row, 'guest_age')
+        try:
+            fields['guest_age'] = int(age) if age else None
+            if age and not 1 <= fields['guest_age'] <= 120:
+                raise ValueError
+        except ValueError:
+            errors.append('guest_age must be between 1 and 120')
+    else:
+        user_key = _text(row, 'user_id') or _text(row, 'user_email')
+        if not user_key:
+            errors.append('user_id or user_email is required for registered patients')
+        fields['_user_key'] = user_key
+
+    fields['_therapist_key'] = _text(row, 'therapist_id') or None
+    return fields, errors
+
+
+def _resolve_users(keys, role=None):
+    """Map user ids and emails to users with at most two queries"""
+    ids = {key for key in keys if key.isdigit()}
+    emails = {key for key in keys if key and not key.isdigit()}
+    users = CustomUser.objects.all()
+    if role:
+        users = users.filter(role=role)
+    resolved = {}
+    if ids:
+        resolved.update({str(user.pk): user for user in users.filter(id__in=ids)})
+    if emails:
+        resolved.update({user.email: user for user in users.filter(email__in=emails)})
+    return resolved
+
+
+def import_batch(batch, dry_run=False):
+    """
+    Resolve users, allocate guest IDs and insert one batch of cleaned rows.
+    Returns (created_count, rejected_count, errors).
+    """
+    errors = []
+    users = _resolve_users({fields['_user_key'] for _, fields in batch if fields.get('_user_key')})
+    therapists = _resolve_users({fields['_therapist_key'] for _, fields in batch if fields['_therapist_key']}, role='therapist')
+
+    appointments = []
+    for line_number, fields in batch:
+        user_key = fields.pop('_user_key', None)
+        therapist_key = fields.pop('_therapist_key')
+        if user_key is not None:
+            if user_key not in users:
+                errors.append({'line': line_number, 'errors': [f'Unknown patient "{user_key}"']})
+                continue
+            fields['user'] = users[user_key]
+        if therapist_key is not None:
+            if therapist_key not in therapists:
+                errors.append({'line': line_number, 'errors': [f'Unknown therapist "{therapist_key}"']})
+                continue
+            fields['therapist'] = therapists[therapist_key]
+        appointments.append(Appointment(**fields))
+
+    if dry_run or not appointments:
+        return 0, len(errors), errors
+
+    try:
+        with transaction.atomic():
+            # bulk_create skips Appointment.save(), so guest IDs are reserved here:
+            # one counter update per appointment day for the whole batch
+            needs_id = defaultdict(list)
+            for appointment in appointments:
+                if appointment.is_guest and not appointment.guest_id:
+                    needs_id[timezone.localdate(appointment.date)].append(appointment)
+            for day, day_appointments in needs_id.items():
+                first = GuestIdSequence.allocate(count=len(day_appointments), day=day)
+                for offset, appointment in enumerate(day_appointments):
+                    appointment.guest_id = GuestIdSequence.format_guest_id(day, first + offset)
+            Appointment.objects.bulk_create(appointments)
+            # post_save is skipped too; users are already attached, so this is one upsert
+            search.index_objects(appointments)
+    except IntegrityError as e:
+        # e.g. a supplied guest_id that already exists; the whole batch is rolled back
+        lines = [line_number for line_number, _ in batch]
+        errors.append({'lines': [lines[0], lines[-1]], 'errors': [f'Batch rejected: {e}']})
+        return 0, len(batch), errors
+
+    return len(appointments), len(errors), errors
+
+
+def import_appointments(stream, input_format='csv', batch_size=None, dry_run=False, max_errors=100):
+    """
+    Validate and insert appointments from a CSV or NDJSON stream.
+
+    Rows are cleaned as they are read and inserted with bulk_create in
+    batches, each in its own transaction. Invalid rows are skipped and
+    reported; valid rows in the same batch are still imported.
+    """
+    batch_size = batch_size or getattr(settings, 'APPOINTMENT_IMPORT_BATCH_SIZE', 1000)
+    summary = {'created': 0, 'valid': 0, 'invalid': 0, 'errors': []}
+
+    def record_errors(errors, rejected):
+        summary['invalid'] += rejected
+        room = max_errors - len(summary['errors'])
+        if room > 0:
+            summary['errors'].extend(errors[:room])
+
+    def flush(batch):
+        created, rejected, errors = import_batch(batch, dry_run=dry_run)
+        summary['created'] += created
+        summary['valid'] += len(batch) - rejected
+        record_errors(errors, rejected)
+
+    batch = []
+    for line_number, row in read_rows(stream, input_format):
+        fields, errors = clean_row(row)
+        if errors:
+            record_errors([{'line': line_number, 'errors': errors}], 1)
+            continue
+        batch.append((line_number, fields))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if summary['created']:
+        # bulk_create does not send post_save, so invalidate cached aggregates here
+        bump_version(stats.CACHE_NAMESPACE)
+    return summary
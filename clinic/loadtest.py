@@ -0,0 +1,244 @@
+"""
+API Load Testing
+Seeds a synthetic dataset with the test factories, drives the real API
+endpoints from a pool of threads through Django's test client, and reports
+throughput, latency percentiles and query counts per endpoint. Results are
+plain dicts so they can be saved as JSON baselines and compared later.
+"""
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import CustomUser, Testimonial
+from .profiling import QueryRecorder, percentile
+
+SEED_PASSWORD = 'loadtest-pass-123'
+ENDPOINTS = ('booking', 'login', 'appointment_list', 'guest_lookup', 'testimonials')
+# Failed responses kept per endpoint, and how much of each body
+ERROR_SAMPLES = 5
+ERROR_BODY_CHARS = 300
+
+
+def seed(users=50, appointments=500, plans=100, testimonials=50, guests=50):
+    """
+    Create the synthetic dataset and return the context scenarios need:
+    usernames to log in as and (guest_id, email) pairs to look up.
+    """
+    # Factories are dev-only, like the rest of the load-test tooling
+    from .tests.conftest import AppointmentFactory, CustomUserFactory, TestimonialFactory, TreatmentPlanFactory
+
+    run = uuid.uuid4().hex[:6]
+    # Hash once; every seeded user shares the same password
+    password = make_password(SEED_PASSWORD)
+    patients = [
+        CustomUserFactory(username=f'lt-{run}-patient-{n}', email=f'lt-{run}-patient-{n}@loadtest.invalid',
+                          role='patient', password=password, is_email_verified=True)
+        for n in range(max(1, users))
+    ]
+    therapists = [
+        CustomUserFactory(username=f'lt-{run}-therapist-{n}', email=f'lt-{run}-therapist-{n}@loadtest.invalid',
+                          role='therapist', password=password, is_email_verified=True)
+        for n in range(max(1, users // 10))
+    ]
+
+    now = timezone.now()
+    created = []
+    for n in range(appointments):
+        created.append(AppointmentFactory(
+            user=random.choice(patients),
+            therapist=random.choice(therapists),
+            date=now + timedelta(days=random.randint(-30, 30), hours=random.randint(0, 9)),
+        ))
+    guest_pairs = []
+    for n in range(guests):
+        email = f'lt-{run}-guest-{n}@loadtest.invalid'
+        appointment = AppointmentFactory(
+            is_guest=True,
+            guest_first_name='Guest',
+            guest_last_name=str(n),
+            guest_email=email,
+            guest_phone='+966 555 000 000',
+            date=now + timedelta(days=random.randint(1, 30)),
+        )
+        guest_pairs.append((appointment.guest_id, email))
+    for appointment in created[:plans]:
+        TreatmentPlanFactory(appointment=appointment, total_sessions=10,
+                             completed_sessions=random.randint(0, 10))
+
+    Testimonial.objects.bulk_create([
+        TestimonialFactory.build(
+            full_name=f'Load Test {n}',
+            email=f'lt-{run}-testimonial-{n}@loadtest.invalid',
+            rating=random.randint(1, 5),
+            is_approved=n % 2 == 0,
+        )
+        for n in range(testimonials)
+    ])
+
+    return {
+        'patients': [user.username for user in patients],
+        'therapists': [user.username for user in therapists],
+        'guests': guest_pairs,
+        'dataset': {
+            'users': len(patients) + len(therapists),
+            'appointments': appointments + guests,
+            'plans': min(plans, appointments),
+            'testimonials': testimonials,
+        },
+    }
+
+
+def _booking(client, context, n):
+    day = timezone.localdate() + timedelta(days=1 + n % 60)
+    return client.post(reverse('public_appointment_booking'), {
+        'firstname': 'Load',
+        'lastname': 'Test',
+        # A fresh email per request so bookings never conflict with each other
+        'email': f'lt-booking-{uuid.uuid4().hex[:12]}@loadtest.invalid',
+        'phone': '+966 555 123 456',
+        'age': 30,
+        'gender': 'female',
+        'service_type': 'Manual Therapy',
+        'appointment_date': day.isoformat(),
+        'appointment_time': f'{8 + n % 12:02d}:00',
+        'symptoms': 'Load test',
+        'is_guest': True,
+    }, format='json')
+
+
+def _login(client, context, n):
+    username = context['patients'][n % len(context['patients'])]
+    return client.post(reverse('customuser-login'), {'username': username, 'password': SEED_PASSWORD}, format='json')
+
+
+def _appointment_list(client, context, n):
+    return client.get(reverse('appointment-list'))
+
+
+def _guest_lookup(client, context, n):
+    guest_id, email = context['guests'][n % len(context['guests'])]
+    return client.post(reverse('guest_appointment_lookup'), {'guest_id': guest_id, 'email': email}, format='json')
+
+
+def _testimonials(client, context, n):
+    return client.get(reverse('testimonial-public'))
+
+
+def _login_therapist(client, context):
+    client.force_login(CustomUser.objects.get(username=context['therapists'][0]))
+
+
+# name -> (request function, per-client setup, expected status)
+SCENARIOS = {
+    'booking': (_booking, None, 201),
+    'login': (_login, None, 200),
+    'appointment_list': (_appointment_list, _login_therapist, 200),
+    'guest_lookup': (_guest_lookup, None, 200),
+    'testimonials': (_testimonials, None, 200),
+}
+
+
+def run_endpoint(name, context, requests=100, concurrency=1):
+    """
+    Send `requests` requests for one scenario from `concurrency` threads and
+    summarize them. With concurrency 1 everything runs on the calling thread,
+    inside its current connection and transaction. Responses other than the
+    expected status count as errors; the first few are kept in error_samples.
+    """
+    call, setup, expected = SCENARIOS[name]
+    lock = threading.Lock()
+    issued = iter(range(requests))
+
+    def worker():
+        client = APIClient()
+        client.raise_request_exception = False
+        if setup:
+            setup(client, context)
+        samples = []
+        try:
+            while True:
+                with lock:
+                    n = next(issued, None)
+                if n is None:
+                    return samples
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    started = time.perf_counter()
+                    response = call(client, context, n)
+                    elapsed = time.perf_counter() - started
+                body = None
+                if response.status_code != expected:
+                    body = response.content[:ERROR_BODY_CHARS].decode('utf-8', 'replace')
+                samples.append((elapsed * 1000, len(recorder.queries), response.status_code, body))
+        finally:
+            if concurrency > 1:
+                connection.close()
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        samples = worker()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(concurrency)]
+            samples = [sample for future in futures for sample in future.result()]
+    wall = time.perf_counter() - started
+
+    durations = sorted(sample[0] for sample in samples)
+    queries = sorted(sample[1] for sample in samples)
+    failed = [{'status': code, 'body': body} for _, _, code, body in samples if code != expected]
+    return {
+        'requests': len(samples),
+        'errors': len(failed),
+        'error_samples': failed[:ERROR_SAMPLES],
+        'throughput_rps': round(len(samples) / wall, 2) if wall else 0,
+        'p50_ms': round(percentile(durations, 50), 2),
+        'p95_ms': round(percentile(durations, 95), 2),
+        'p99_ms': round(percentile(durations, 99), 2),
+        'max_ms': round(durations[-1], 2) if durations else 0,
+        'queries_p50': percentile(queries, 50),
+        'queries_p95': percentile(queries, 95),
+    }
+
+
+def run(context, endpoints=ENDPOINTS, requests=100, concurrency=1):
+    """Run every scenario in `endpoints` and return a JSON-serializable report"""
+    return {
+        'created_at': timezone.now().isoformat(),
+        'requests': requests,
+        'concurrency': concurrency,
+        'dataset': context['dataset'],
+        'endpoints': {name: run_endpoint(name, context, requests, concurrency) for name in endpoints},
+    }
+
+
+def compare(baseline, current, latency_threshold=0.2, min_latency_delta_ms=2.0, query_threshold=0):
+    """
+    List regressions of `current` against `baseline`: p95 latency up by more
+    than `latency_threshold` (a fraction) and by at least
+    `min_latency_delta_ms`, or p95 query count up by more than
+    `query_threshold`. Failed requests are always flagged, since their
+    timings do not measure the endpoint. Endpoints missing from the
+    baseline are otherwise skipped.
+    """
+    regressions = []
+    for name, result in current['endpoints'].items():
+        if result.get('errors'):
+            regressions.append(f"{name}: {result['errors']} failed requests")
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            continue
+        delta = result['p95_ms'] - base['p95_ms']
+        if result['p95_ms'] > base['p95_ms'] * (1 + latency_threshold) and delta >= min_latency_delta_ms:
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['queries_p95'] > base['queries_p95'] + query_threshold:
+            regressions.append(f"{name}: p95 queries {base['queries_p95']} -> {result['queries_p95']}")
+    return regressions
@@ -0,0 +1,164 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from clinic import booking
+from clinic.profiling import percentile
+from datetime import datetime, timedelta
+import re
+import time
+
+
+def legacy_validate(data):
+    """
+    The validation public_appointment_booking did inline before clinic.booking,
+    kept as the baseline: tables and patterns rebuilt per call, two passes and
+    a separate strptime of the date and time.
+    """
+    validation_errors = []
+    required_fields = {
+        'firstname': 'First Name',
+        'lastname': 'Last Name',
+        'email': 'Email Address',
+        'phone': 'Phone Number',
+        'age': 'Age',
+        'gender': 'Gender',
+        'service_type': 'Service Type',
+        'appointment_date': 'Appointment Date',
+        'appointment_time': 'Appointment Time',
+        'symptoms': 'Symptoms Description'
+    }
+    for field, display_name in required_fields.items():
+        value = data.get(field)
+        if not value:
+            validation_errors.append(f'{display_name} is required')
+        elif isinstance(value, str) and value.strip() == '':
+            validation_errors.append(f'{display_name} cannot be empty')
+    email = data.get('email', '').strip()
+    if email and not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        validation_errors.append('Please enter a valid email address')
+    phone = data.get('phone', '').strip()
+    if phone and not re.match(r'^[\d\s\-\+\(\)]{10,}$', phone):
+        validation_errors.append('Please enter a valid phone number (minimum 10 digits)')
+    try:
+        age = int(data.get('age', 0))
+        if age < 1 or age > 120:
+            validation_errors.append('Age must be between 1 and 120 years')
+    except (ValueError, TypeError):
+        validation_errors.append('Age must be a valid number')
+    valid_genders = ['male', 'female', 'other']
+    gender = data.get('gender', '').lower().strip()
+    if gender and gender not in valid_genders:
+        validation_errors.append('Gender must be Male, Female, or Other')
+    service_mapping = {
+        'manual therapy': 'manual-therapy',
+        'physical therapy': 'physical-therapy',
+        'rehabilitation': 'rehabilitation',
+        'consultation': 'consultation',
+        'follow-up': 'follow-up',
+        'assessment': 'assessment'
+    }
+    service_type_input = data.get('service_type', '').strip()
+    if not service_type_input:
+        validation_errors.append('Service type is required')
+    else:
+        service_type = service_mapping.get(service_type_input.lower(), service_type_input.lower())
+        if service_type not in service_mapping.values():
+            validation_errors.append('Please select a valid service type.')
+        else:
+            data['service_type'] = service_type
+    if validation_errors:
+        return validation_errors
+    try:
+        date_str = data['appointment_date'].strip()
+        time_str = data['appointment_time'].strip()
+        if not re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
+            validation_errors.append('Appointment date must be in YYYY-MM-DD format')
+        if not re.match(r'^\d{2}:\d{2}$', time_str):
+            validation_errors.append('Appointment time must be in HH:MM format (24-hour)')
+        if validation_errors:
+            return validation_errors
+        appointment_datetime = timezone.make_aware(datetime.strptime(f"{date_str} {time_str}:00", "%Y-%m-%d %H:%M:%S"))
+        if appointment_datetime <= timezone.now():
+            validation_errors.append('Appointment date and time must be in the future')
+        if appointment_datetime > timezone.now() + timezone.timedelta(days=180):
+            validation_errors.append('Appointment cannot be scheduled more than 6 months in advance')
+        if appointment_datetime.hour < 8 or appointment_datetime.hour >= 20:
+            validation_errors.append('Appointments are only available between 8:00 AM and 8:00 PM')
+    except ValueError:
+        validation_errors.append('Invalid date/time format')
+    return validation_errors
+
+
+def payloads():
+    """Named payloads: one valid booking and the common ways real ones fail"""
+    valid = {
+        'firstname': 'Sara',
+        'lastname': 'Ahmed',
+        'email': 'sara@example.com',
+        'phone': '+966 555 123 456',
+        'age': 34,
+        'gender': 'female',
+        'service_type': 'Manual Therapy',
+        'appointment_date': (timezone.localdate() + timedelta(days=3)).isoformat(),
+        'appointment_time': '10:30',
+        'symptoms': 'Lower back pain',
+        'is_guest': True,
+    }
+    return {
+        'valid': valid,
+        'invalid_fields': {**valid, 'email': 'not-an-email', 'phone': '123', 'age': 'old', 'gender': 'x'},
+        'invalid_schedule': {**valid, 'appointment_time': '22:00'},
+        'missing_fields': {'email': 'sara@example.com'},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark the per-request CPU cost of booking validation: the precompiled '
+        'clinic.booking validator against the inline validation it replaced, for valid '
+        'and invalid payloads. No database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000, help='Validations timed per payload and implementation')
+        parser.add_argument('--repeats', type=int, default=5, help='Timing rounds; the median round is reported')
+
+    def time_per_call(self, validate, payload, iterations, repeats):
+        rounds = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                # Copies keep the legacy validator's in-place edits from leaking between calls
+                validate(dict(payload))
+            rounds.append((time.perf_counter() - started) / iterations * 1000000)
+        return percentile(sorted(rounds), 50)
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+        repeats = max(1, options['repeats'])
+        implementations = {
+            'legacy': legacy_validate,
+            'precompiled': lambda data: booking.PUBLIC_BOOKING.validate(data)[1],
+        }
+
+        self.stdout.write(f"{'payload':<18} {'legacy µs':>10} {'new µs':>10} {'speedup':>8}")
+        speedups = []
+        for name, payload in payloads().items():
+            # Both must agree on whether the payload is acceptable before their speed is compared
+            verdicts = {key: not validate(dict(payload)) for key, validate in implementations.items()}
+            if len(set(verdicts.values())) != 1:
+                self.stdout.write(self.style.WARNING(f"{name}: implementations disagree ({verdicts})"))
+            legacy = self.time_per_call(implementations['legacy'], payload, iterations, repeats)
+            current = self.time_per_call(implementations['precompiled'], payload, iterations, repeats)
+            speedup = legacy / current if current else 0
+            speedups.append(speedup)
+            self.stdout.write(f"{name:<18} {legacy:>10.2f} {current:>10.2f} {speedup:>7.2f}x")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nBOOKING VALIDATION BENCHMARK SUMMARY:\n"
+                f"Payloads: {len(speedups)}\n"
+                f"Iterations per payload: {iterations}\n"
+                f"Slowest speedup: {min(speedups):.2f}x\n"
+                f"Fastest speedup: {max(speedups):.2f}x"
+            )
+        )
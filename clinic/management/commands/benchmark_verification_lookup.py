@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from clinic.models import CustomUser, EmailVerification
+from clinic.profiling import percentile
+from datetime import timedelta
+import random
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        'Time EmailVerification.find_open while the table grows with used (historical) '
+        'verifications. Runs in a transaction that is rolled back, so nothing is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100000,
+            help='Historical rows to insert in total (e.g. 10000000 for the full-size check)',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=200,
+            help='Lookups timed at each table size',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows inserted per bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        total_rows = max(1, options['rows'])
+        lookups = max(1, options['lookups'])
+        batch_size = max(1, options['batch_size'])
+
+        # Table sizes at which lookups are timed: 1k, 10k, 100k, ... up to --rows
+        checkpoints = []
+        size = 1000
+        while size < total_rows:
+            checkpoints.append(size)
+            size *= 10
+        checkpoints.append(total_rows)
+
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username=f'verification-benchmark-{uuid.uuid4().hex[:8]}',
+                email=f'benchmark-{uuid.uuid4().hex[:8]}@example.invalid',
+                password=None,
+            )
+            expires_at = timezone.now() + timedelta(hours=24)
+
+            # Open codes that will be looked up; historical rows reuse the same codes
+            targets = []
+            for n in range(lookups):
+                code = f'{random.randrange(1000000):06d}'
+                email = f'open-{n}@example.invalid'
+                EmailVerification.objects.create(
+                    user=user, verification_type='registration', email=email,
+                    verification_code=code, expires_at=expires_at,
+                )
+                targets.append((email, code))
+
+            self.stdout.write(f"{'rows':>12} {'p50 µs':>10} {'p95 µs':>10} {'max µs':>10}")
+            inserted = 0
+            results = []
+            for checkpoint in checkpoints:
+                while inserted < checkpoint:
+                    count = min(batch_size, checkpoint - inserted)
+                    EmailVerification.objects.bulk_create([
+                        EmailVerification(
+                            user=user,
+                            verification_type='registration',
+                            token=uuid.uuid4().hex,
+                            verification_code=targets[(inserted + n) % len(targets)][1],
+                            email=f'history-{inserted + n}@example.invalid',
+                            expires_at=expires_at,
+                            is_used=True,
+                        )
+                        for n in range(count)
+                    ])
+                    inserted += count
+
+                timings = []
+                for email, code in targets:
+                    started = time.perf_counter()
+                    EmailVerification.find_open('registration', email=email, verification_code=code)
+                    timings.append((time.perf_counter() - started) * 1000000)
+                timings.sort()
+                results.append((checkpoint, timings))
+                self.stdout.write(
+                    f"{checkpoint:>12} {percentile(timings, 50):>10.0f} "
+                    f"{percentile(timings, 95):>10.0f} {timings[-1]:>10.0f}"
+                )
+
+            email, code = targets[0]
+            plan = EmailVerification.objects.filter(
+                verification_type='registration', is_used=False, verification_code=code, email=email,
+            ).explain()
+            transaction.set_rollback(True)
+
+        first_p50 = percentile(results[0][1], 50)
+        last_p50 = percentile(results[-1][1], 50)
+        self.stdout.write(f"\nQuery plan:\n{plan}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nVERIFICATION LOOKUP BENCHMARK SUMMARY:\n"
+                f"Historical rows: {inserted}\n"
+                f"Lookups per size: {lookups}\n"
+                f"p50 at smallest size: {first_p50:.0f}µs\n"
+                f"p50 at largest size: {last_p50:.0f}µs\n"
+                f"Growth: {last_p50 / first_p50 if first_p50 else 0:.2f}x"
+            )
+        )
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Case, Count, DateTimeField, F, Q, Value, When
 from django.utils import timezone
 from datetime import timedelta
 from clinic.models import EmailVerification
@@ -9,41 +10,36 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self.stdout.write('🔧 Starting EmailVerification cleanup...')
-        
+
+        now = timezone.now()
+        old_cutoff = now - timedelta(hours=24)
+
         # Find records with null expires_at
         null_expires = EmailVerification.objects.filter(expires_at__isnull=True)
-        count = null_expires.count()
-        
-        if count == 0:
+        counts = null_expires.aggregate(
+            total=Count('id'),
+            expired=Count('id', filter=Q(created_at__lt=old_cutoff)),
+        )
+
+        if counts['total'] == 0:
             self.stdout.write(self.style.SUCCESS('✅ No records with null expires_at found.'))
             return
-        
-        self.stdout.write(f'📊 Found {count} records with null expires_at values.')
-        
-        # Set expires_at to 24 hours from creation time, or mark as expired if old
-        fixed_count = 0
-        expired_count = 0
-        
-        for verification in null_expires:
-            if verification.created_at:
-                # If created more than 24 hours ago, mark as expired
-                if timezone.now() - verification.created_at > timedelta(hours=24):
-                    verification.expires_at = verification.created_at + timedelta(hours=1)
-                    expired_count += 1
-                else:
-                    # Set expiration to 24 hours from creation
-                    verification.expires_at = verification.created_at + timedelta(hours=24)
-                    fixed_count += 1
-                
-                verification.save()
-            else:
-                # If no created_at, set to current time + 24 hours
-                verification.expires_at = timezone.now() + timedelta(hours=24)
-                verification.save()
-                fixed_count += 1
-        
+
+        self.stdout.write(f"📊 Found {counts['total']} records with null expires_at values.")
+
+        # One UPDATE for all rows: created more than 24 hours ago -> already expired,
+        # otherwise 24 hours from creation, or from now when created_at is missing
+        null_expires.update(
+            expires_at=Case(
+                When(created_at__isnull=True, then=Value(now + timedelta(hours=24))),
+                When(created_at__lt=old_cutoff, then=F('created_at') + timedelta(hours=1)),
+                default=F('created_at') + timedelta(hours=24),
+                output_field=DateTimeField(),
+            )
+        )
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'✅ Cleanup complete! Fixed: {fixed_count}, Expired: {expired_count}'
+                f"✅ Cleanup complete! Fixed: {counts['total'] - counts['expired']}, Expired: {counts['expired']}"
             )
         )
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from clinic.importexport import import_appointments
+import time
+
+
+class Command(BaseCommand):
+    help = 'Bulk import appointments from a CSV or NDJSON file (e.g. an export of the old system)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV or NDJSON file to import')
+        parser.add_argument(
+            '--input',
+            choices=['csv', 'ndjson'],
+            default=None,
+            help='File format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'APPOINTMENT_IMPORT_BATCH_SIZE', 1000),
+            help='Rows inserted per bulk_create transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without inserting anything',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be inserted'))
+
+        started = time.monotonic()
+        try:
+            with open(path, 'rb') as source:
+                summary = import_appointments(
+                    source,
+                    input_format=input_format,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        elapsed = time.monotonic() - started
+
+        for error in summary['errors']:
+            location = f"line {error['line']}" if 'line' in error else f"lines {error['lines'][0]}-{error['lines'][1]}"
+            self.stdout.write(self.style.ERROR(f"✗ {location}: {'; '.join(error['errors'])}"))
+        if summary['invalid'] > len(summary['errors']):
+            self.stdout.write(f"... and {summary['invalid'] - len(summary['errors'])} more invalid rows")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nIMPORT SUMMARY:\n"
+                f"Valid rows: {summary['valid']}\n"
+                f"Created: {summary['created']}\n"
+                f"Invalid: {summary['invalid']}\n"
+                f"Time: {elapsed:.2f}s"
+            )
+        )
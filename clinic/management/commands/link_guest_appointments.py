@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from clinic.bulk import DEFAULT_BATCH_SIZE, link_guest_appointments
+from clinic.models import Appointment, CustomUser
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Link guest appointments to the email-verified accounts whose email they were booked under, '
+        'in batches. Safe to rerun: appointments that already have a user are left alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Only link appointments for the account with this email')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Appointments updated per statement')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be linked without changing anything')
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.all()
+        if options['email']:
+            users = users.filter(email=options['email'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be linked'))
+            self.stdout.write(
+                self.style.WARNING(f"\nDRY RUN SUMMARY:\nWould link: {link_guest_appointments(users, dry_run=True)}")
+            )
+            return
+
+        started = time.monotonic()
+        linked = link_guest_appointments(users, batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nGUEST LINKING SUMMARY:\n"
+                f"Linked: {linked}\n"
+                f"Unlinked guest appointments: {Appointment.objects.filter(is_guest=True, user__isnull=True).count()}\n"
+                f"Time: {elapsed:.2f}s"
+            )
+        )
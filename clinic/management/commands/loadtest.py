@@ -0,0 +1,167 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from clinic import loadtest
+import json
+import os
+import tempfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset in a throwaway test database, load the API endpoints '
+        'concurrently and report throughput, latency percentiles and query counts. '
+        'Results can be saved as a JSON baseline and compared against on later runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Patients to seed (plus one therapist per 10)')
+        parser.add_argument('--appointments', type=int, default=500, help='Patient appointments to seed')
+        parser.add_argument('--plans', type=int, default=100, help='Treatment plans to seed')
+        parser.add_argument('--testimonials', type=int, default=50, help='Testimonials to seed (half approved)')
+        parser.add_argument('--guests', type=int, default=50, help='Guest appointments to seed')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4, help='Client threads per endpoint')
+        parser.add_argument(
+            '--endpoints',
+            default=','.join(loadtest.ENDPOINTS),
+            help=f"Comma-separated scenarios to run (default: {','.join(loadtest.ENDPOINTS)})",
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results to this JSON file (e.g. to record a baseline); refused if any request failed',
+        )
+        parser.add_argument('--compare', metavar='BASELINE', help='Fail if results regress against this JSON baseline')
+        parser.add_argument(
+            '--latency-threshold',
+            type=float,
+            default=0.2,
+            help='Allowed p95 latency increase as a fraction of the baseline (default 0.2)',
+        )
+        parser.add_argument(
+            '--min-latency-delta-ms',
+            type=float,
+            default=2.0,
+            help='Ignore p95 increases smaller than this many milliseconds',
+        )
+        parser.add_argument(
+            '--query-threshold',
+            type=int,
+            default=0,
+            help='Allowed increase in p95 query count per request',
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = [name for name in endpoints if name not in loadtest.SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['compare']}: {e}")
+
+        report = self.run_in_test_database(endpoints, options)
+
+        self.stdout.write(
+            f"{'endpoint':<18} {'req':>6} {'err':>5} {'rps':>8} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9} {'q p50':>6} {'q p95':>6}"
+        )
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<18} {result['requests']:>6} {result['errors']:>5} {result['throughput_rps']:>8} "
+                f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+                f"{result['queries_p50']:>6} {result['queries_p95']:>6}"
+            )
+
+        errors = sum(result['errors'] for result in report['endpoints'].values())
+        for name, result in report['endpoints'].items():
+            for sample in result.get('error_samples', []):
+                self.stdout.write(self.style.ERROR(f"{name}: HTTP {sample['status']}: {sample['body']}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nLOAD TEST SUMMARY:\n"
+                f"Endpoints: {len(report['endpoints'])}\n"
+                f"Requests per endpoint: {options['requests']}\n"
+                f"Concurrency: {options['concurrency']}\n"
+                f"Errors: {errors}"
+            )
+        )
+
+        if options['output']:
+            if errors:
+                raise CommandError(
+                    f"Not writing {options['output']}: {errors} requests failed, so the timings are not a valid baseline"
+                )
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"\nResults written to {options['output']}")
+
+        if baseline is not None:
+            regressions = loadtest.compare(
+                baseline,
+                report,
+                latency_threshold=options['latency_threshold'],
+                min_latency_delta_ms=options['min_latency_delta_ms'],
+                query_threshold=options['query_threshold'],
+            )
+            if regressions:
+                raise CommandError('Regressions against baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def run_in_test_database(self, endpoints, options):
+        """
+        Seed and load a fresh test database so the real one is never touched.
+        SQLite test databases default to in-memory, which threads cannot
+        share, so a private temporary file is used instead; never the
+        configured TEST NAME, which a running test suite may be using.
+
+        The seeded rows reuse real primary keys, so the configured cache (Redis
+        in production, which also holds sessions) is swapped for a private
+        in-process one; otherwise load-test users and testimonials would be
+        cached under the same keys as the real ones.
+        """
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        configured_name = test_settings.get('NAME')
+        tempdir = None
+        if connection.vendor == 'sqlite':
+            tempdir = tempfile.mkdtemp(prefix='clinic-loadtest-')
+            test_settings['NAME'] = os.path.join(tempdir, 'loadtest.sqlite3')
+
+        isolated = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'clinic-loadtest'}},
+            SESSION_CACHE_ALIAS='default',
+            # Every simulated client shares one IP, which the rate limiter would soon answer with 429s
+            RATE_LIMIT_ENABLED=False,
+        )
+        isolated.enable()
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            context = loadtest.seed(
+                users=options['users'],
+                appointments=options['appointments'],
+                plans=options['plans'],
+                testimonials=options['testimonials'],
+                guests=options['guests'],
+            )
+            return loadtest.run(
+                context,
+                endpoints=endpoints,
+                requests=max(1, options['requests']),
+                concurrency=max(1, options['concurrency']),
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            cache.clear()
+            isolated.disable()
+            if tempdir:
+                test_settings['NAME'] = configured_name
+                os.rmdir(tempdir)
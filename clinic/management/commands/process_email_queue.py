@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from clinic.models import OutboundEmail
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails in batches over a reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 50),
+            help='Number of messages to send per SMTP connection',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the queue instead of exiting when it is empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep between polls when the queue is empty (with --loop)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches',
+        )
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'failed': 0, 'dead': 0}
+        batches = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            results = OutboundEmail.send_batch(batch_size=options['batch_size'])
+            processed = sum(results.values())
+
+            if processed == 0:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            batches += 1
+            for key, value in results.items():
+                totals[key] += value
+            logger.info(f"Email queue batch {batches}: {results}")
+            self.stdout.write(
+                f"Batch {batches}: sent {results['sent']}, "
+                f"retrying {results['failed']}, dead-lettered {results['dead']}"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nEMAIL QUEUE SUMMARY:\n"
+                f"Sent: {totals['sent']}\n"
+                f"Scheduled for retry: {totals['failed']}\n"
+                f"Dead-lettered: {totals['dead']}"
+            )
+        )
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from clinic.profiling import summarize
+import json
+
+
+class Command(BaseCommand):
+    help = 'Summarize the request profiler log into per-endpoint latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            type=str,
+            default=getattr(settings, 'PERFORMANCE_LOG_FILE', None),
+            help='Path to the JSON-lines performance log (defaults to PERFORMANCE_LOG_FILE)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of endpoints to show, slowest p95 first',
+        )
+        parser.add_argument(
+            '--min-requests',
+            type=int,
+            default=1,
+            help='Hide endpoints with fewer profiled requests than this',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the summary as JSON instead of a table',
+        )
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('No log file given; pass --file or set PERFORMANCE_LOG_FILE')
+
+        try:
+            with open(options['file'], encoding='utf-8') as log_file:
+                rows = summarize(log_file)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['file']}: {e}")
+
+        rows = [row for row in rows if row['requests'] >= options['min_requests']][:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        if not rows:
+            self.stdout.write(self.style.WARNING('No profiled requests found'))
+            return
+
+        header = f"{'ENDPOINT':<45} {'REQS':>6} {'P50 ms':>9} {'P95 ms':>9} {'P99 ms':>9} {'P95 SQL':>8} {'N+1':>5}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            endpoint = f"{row['method']} {row['view']}"[:45]
+            self.stdout.write(
+                f"{endpoint:<45} {row['requests']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                f"{row['p99_ms']:>9.1f} {row['p95_queries']:>8} {row['n_plus_one']:>5}"
+            )
+
+        flagged = [row for row in rows if row['top_repeated_query']]
+        if flagged:
+            self.stdout.write(self.style.WARNING('\nLIKELY N+1 QUERIES:'))
+            for row in flagged:
+                self.stdout.write(f"{row['method']} {row['view']}: {row['top_repeated_query'][:200]}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\nSummarized {sum(row['requests'] for row in rows)} requests across {len(rows)} endpoints")
+        )
@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from clinic.models import EmailVerification
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Archive (or delete) used and expired email verifications in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'EMAIL_VERIFICATION_PURGE_BATCH_SIZE', 1000),
+            help='Rows archived and deleted per transaction',
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete stale rows without copying them to the archive table',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be purged without changing anything',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, purging again every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=3600.0,
+            help='Seconds to sleep between runs (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.report_dry_run()
+            return
+
+        while True:
+            self.purge(options)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def report_dry_run(self):
+        now = timezone.now()
+        totals = EmailVerification.stale(now).aggregate(
+            total=Count('id'),
+            used=Count('id', filter=Q(is_used=True)),
+            oldest=Min('expires_at'),
+        )
+        self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be purged'))
+        self.stdout.write(
+            self.style.WARNING(
+                f"\nDRY RUN SUMMARY:\n"
+                f"Would purge: {totals['total']}\n"
+                f"Used: {totals['used']}\n"
+                f"Expired unused: {totals['total'] - totals['used']}\n"
+                f"Oldest expiry: {totals['oldest'] or '-'}\n"
+                f"Table rows: {EmailVerification.objects.count()}"
+            )
+        )
+
+    def purge(self, options):
+        batch_size = max(1, options['batch_size'])
+        archive = not options['delete']
+        # A fixed cutoff keeps one run bounded even while new rows expire
+        now = timezone.now()
+        started = time.monotonic()
+        purged = 0
+        batches = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            removed = EmailVerification.purge_stale(now=now, batch_size=batch_size, limit=batch_size, archive=archive)
+            if not removed:
+                break
+            batches += 1
+            purged += removed
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Batch {batches}: {'archived' if archive else 'deleted'} {removed} "
+                f"({purged} total, {purged / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Purged {purged} email verifications in {batches} batches ({elapsed:.2f}s)")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nVERIFICATION PURGE SUMMARY:\n"
+                f"{'Archived' if archive else 'Deleted'}: {purged}\n"
+                f"Batches: {batches}\n"
+                f"Remaining rows: {EmailVerification.objects.count()}\n"
+                f"Time: {elapsed:.2f}s"
+            )
+        )
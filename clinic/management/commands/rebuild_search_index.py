@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from clinic import fuzzy, search
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text search documents for users, appointments and testimonials, '
+        'and the fuzzy patient lookup keys. '
+        'Migrating fills an empty index; run this after bulk writes that bypass post_save.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search.DEFAULT_BATCH_SIZE,
+            help='Documents written per statement',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = search.rebuild(batch_size=max(1, options['batch_size']))
+        patients = fuzzy.rebuild(batch_size=max(1, options['batch_size']))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSEARCH INDEX SUMMARY:\n"
+                f"Backend: {type(search.get_backend()).__name__}\n"
+                + ''.join(f"{kind.capitalize()} documents: {count}\n" for kind, count in counts.items())
+                + f"Patient lookup keys: {patients}\n"
+                + f"Lookup backend: {type(fuzzy.get_backend()).__name__}\n"
+                + f"Time: {elapsed:.2f}s"
+            )
+        )
@@ -1,15 +1,22 @@
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
 from django.utils.html import strip_tags
 from django.utils import timezone
 from django.conf import settings
 from clinic.models import Appointment
-from datetime import timedelta
+from clinic import timewindows
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+REMINDER_TEMPLATE = 'emails/appointment_reminder.html'
+
+
 class Command(BaseCommand):
     help = 'Send appointment reminder emails to patients and guests one day before their appointments'
 
@@ -29,133 +36,209 @@ class Command(BaseCommand):
             type=str,
             help='Email address for test reminder',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=getattr(settings, 'REMINDER_CHUNK_SIZE', 100),
+            help='Number of reminders sent per SMTP connection and marked per UPDATE',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of threads sending chunks in parallel, each with its own connection',
+        )
 
     def handle(self, *args, **options):
+        # Compile the template once; every reminder reuses it
+        self.template = get_template(REMINDER_TEMPLATE)
+        # One email connection per sending thread, reused across chunks
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
         if options['test']:
             self.send_test_reminder(options['email'])
             return
 
         if options['dry_run']:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No emails will be sent'))
-        
-        # Get appointments scheduled for tomorrow
-        tomorrow = timezone.now().date() + timedelta(days=1)
+
+        # Get appointments scheduled for tomorrow that have not been reminded yet
+        tomorrow = timezone.localdate() + timedelta(days=1)
         appointments = Appointment.objects.filter(
-            date__date=tomorrow,
-            status='scheduled'
-        ).select_related('user')
-        
-        self.stdout.write(f"Found {appointments.count()} appointments for {tomorrow}")
-        
+            timewindows.q('date', timewindows.tomorrow()),
+            status='scheduled',
+            reminder_sent_at__isnull=True,
+        ).select_related('user').order_by('date', 'id')
+
+        total = appointments.count()
+        self.stdout.write(f"Found {total} appointments for {tomorrow}")
+
+        chunk_size = max(1, options['chunk_size'])
+        chunks = self.iter_chunks(appointments.iterator(chunk_size=chunk_size), chunk_size)
         sent_count = 0
         failed_count = 0
-        
-        for appointment in appointments:
-            try:
-                if self.send_reminder_email(appointment, dry_run=options['dry_run']):
-                    sent_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"✓ Reminder sent for appointment #{appointment.id} - "
-                            f"{appointment.date.strftime('%Y-%m-%d %H:%M')}"
-                        )
-                    )
-                else:
-                    failed_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"✗ Failed to send reminder for appointment #{appointment.id}"
-                        )
-                    )
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Error sending reminder for appointment {appointment.id}: {e}")
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"✗ Error sending reminder for appointment #{appointment.id}: {e}"
-                    )
-                )
-        
+
         if options['dry_run']:
+            for chunk in chunks:
+                for appointment in chunk:
+                    message = self.build_message(appointment)
+                    self.stdout.write(f"Would send reminder to {message.to[0]}")
+                    self.stdout.write(f"Subject: {message.subject}")
+                    sent_count += 1
             self.stdout.write(
                 self.style.WARNING(
                     f"\nDRY RUN SUMMARY:\n"
                     f"Would send reminders: {sent_count}\n"
                     f"Would fail: {failed_count}\n"
-                    f"Total appointments: {appointments.count()}"
+                    f"Total appointments: {total}"
                 )
             )
-        else:
+            return
+
+        # Worker threads only render and send; the database is touched from this thread.
+        # At most two chunks per worker are in flight so the queryset keeps streaming.
+        workers = max(1, options['workers'])
+        pending = deque()
+
+        def collect(future):
+            nonlocal sent_count, failed_count
+            sent_ids, failed_ids = future.result()
+            if sent_ids:
+                Appointment.objects.filter(id__in=sent_ids).update(reminder_sent_at=timezone.now())
+            sent_count += len(sent_ids)
+            failed_count += len(failed_ids)
             self.stdout.write(
-                self.style.SUCCESS(
-                    f"\nREMINDER SUMMARY:\n"
-                    f"Reminders sent: {sent_count}\n"
-                    f"Failed: {failed_count}\n"
-                    f"Total appointments: {appointments.count()}"
-                )
+                f"Chunk done: {len(sent_ids)} sent, {len(failed_ids)} failed "
+                f"({sent_count + failed_count}/{total})"
             )
 
-    def send_reminder_email(self, appointment, dry_run=False):
-        """Send reminder email for a specific appointment"""
         try:
-            # Determine recipient email and name
-            if appointment.is_guest:
-                recipient_email = appointment.guest_email
-                recipient_name = f"{appointment.guest_first_name} {appointment.guest_last_name}"
-                user = None
-            else:
-                recipient_email = appointment.user.email
-                recipient_name = f"{appointment.user.first_name} {appointment.user.last_name}"
-                user = appointment.user
-            
-            # Prepare email context
-            context = {
-                'appointment': appointment,
-                'user': user,
-                'recipient_name': recipient_name,
-            }
-            
-            # Render email templates
-            subject = f"Appointment Reminder - Tomorrow at {appointment.date.strftime('%I:%M %p')}"
-            
-            html_message = render_to_string('emails/appointment_reminder.html', context)
-            plain_message = strip_tags(html_message)
-            
-            if dry_run:
-                self.stdout.write(f"Would send reminder to {recipient_email}")
-                self.stdout.write(f"Subject: {subject}")
-                return True
-            
-            # Send email
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[recipient_email],
-                html_message=html_message,
-                fail_silently=False
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for chunk in chunks:
+                    pending.append(executor.submit(self.send_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        collect(pending.popleft())
+                while pending:
+                    collect(pending.popleft())
+        finally:
+            self.close_connections()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nREMINDER SUMMARY:\n"
+                f"Reminders sent: {sent_count}\n"
+                f"Failed: {failed_count}\n"
+                f"Total appointments: {total}"
             )
-            
-            # Log successful email
-            logger.info(f"Appointment reminder sent to {recipient_email} for appointment {appointment.id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send reminder email for appointment {appointment.id}: {e}")
-            return False
+        )
+
+    @staticmethod
+    def iter_chunks(iterable, size):
+        chunk = []
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def build_message(self, appointment):
+        """Render the reminder for one appointment into an email message"""
+        # Determine recipient email and name
+        if appointment.is_guest:
+            recipient_email = appointment.guest_email
+            recipient_name = f"{appointment.guest_first_name} {appointment.guest_last_name}"
+            user = None
+        else:
+            recipient_email = appointment.user.email
+            recipient_name = f"{appointment.user.first_name} {appointment.user.last_name}"
+            user = appointment.user
+
+        # Prepare email context
+        context = {
+            'appointment': appointment,
+            'user': user,
+            'recipient_name': recipient_name,
+        }
+
+        subject = f"Appointment Reminder - Tomorrow at {appointment.date.strftime('%I:%M %p')}"
+        html_message = self.template.render(context)
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=strip_tags(html_message),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[recipient_email],
+        )
+        message.attach_alternative(html_message, 'text/html')
+        return message
+
+    def get_thread_connection(self):
+        """Return this thread's open email connection, opening it on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def reset_thread_connection(self):
+        """Drop this thread's connection after an error so the next message reconnects"""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close_connections(self):
+        for connection in self._connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self._connections = []
+
+    def send_chunk(self, appointments):
+        """
+        Send one chunk over the calling thread's connection.
+
+        Messages are handed to send_messages() one at a time on the open
+        connection so that a rejected recipient only fails its own reminder
+        and the rest of the chunk is still marked as sent.
+        """
+        sent_ids = []
+        failed_ids = []
+        for appointment in appointments:
+            try:
+                connection = self.get_thread_connection()
+                if connection.send_messages([self.build_message(appointment)]):
+                    sent_ids.append(appointment.id)
+                    logger.info(f"Appointment reminder sent for appointment {appointment.id}")
+                else:
+                    failed_ids.append(appointment.id)
+            except Exception as e:
+                failed_ids.append(appointment.id)
+                logger.error(f"Failed to send reminder email for appointment {appointment.id}: {e}")
+                self.reset_thread_connection()
+        return sent_ids, failed_ids
 
     def send_test_reminder(self, test_email):
         """Send a test reminder email for testing purposes"""
         if not test_email:
             self.stdout.write(self.style.ERROR('Please provide an email address with --email for test mode'))
             return
-        
+
         # Create a mock appointment for testing
-        from datetime import datetime, time
-        tomorrow = timezone.now().date() + timedelta(days=1)
+        tomorrow = timezone.localdate() + timedelta(days=1)
         test_time = time(10, 0)  # 10:00 AM
         test_datetime = timezone.make_aware(datetime.combine(tomorrow, test_time))
-        
+
         # Create a mock appointment object
         class MockAppointment:
             def __init__(self):
@@ -169,18 +252,20 @@ class Command(BaseCommand):
                 self.service_type = "manual-therapy"
                 self.duration = 60
                 self.status = "scheduled"
-            
+
             def get_service_type_display(self):
                 return "Manual Therapy"
-            
+
             def get_status_display(self):
                 return "Scheduled"
-        
+
         mock_appointment = MockAppointment()
-        
+
         self.stdout.write(f"Sending test reminder to {test_email}")
-        
-        if self.send_reminder_email(mock_appointment, dry_run=False):
+
+        sent_ids, _ = self.send_chunk([mock_appointment])
+        self.close_connections()
+        if sent_ids:
             self.stdout.write(
                 self.style.SUCCESS(f"✓ Test reminder sent successfully to {test_email}")
             )
@@ -1,9 +1,18 @@
 from django.core.management.base import BaseCommand
+from clinic.bulk import DEFAULT_BATCH_SIZE, verify_users
 from clinic.models import CustomUser
 
 class Command(BaseCommand):
     help = 'Verify all users for development purposes'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Users updated per UPDATE statement',
+        )
+
     def handle(self, *args, **options):
         # Get all unverified users
         unverified_users = CustomUser.objects.filter(is_email_verified=False)
@@ -14,14 +23,8 @@ class Command(BaseCommand):
             )
             return
         
-        # Verify all users
-        updated_count = 0
-        for user in unverified_users:
-            user.is_email_verified = True
-            user.is_active = True
-            user.save()
-            updated_count += 1
-            self.stdout.write(f'Verified user: {user.username} ({user.email})')
+        # Verify all users with set-based updates instead of one save() per user
+        updated_count = verify_users(unverified_users, batch_size=max(1, options['batch_size']))
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully verified {updated_count} users!')
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:14
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each day's counter after the highest guest ID already issued"""
+    Appointment = apps.get_model('clinic', 'Appointment')
+    GuestIdSequence = apps.get_model('clinic', 'GuestIdSequence')
+
+    highest = {}
+    guest_ids = Appointment.objects.filter(guest_id__startswith='GUEST-').values_list('guest_id', flat=True)
+    for guest_id in guest_ids.iterator():
+        try:
+            _, day, number = guest_id.split('-')
+            day = datetime.strptime(day, '%Y%m%d').date()
+            number = int(number)
+        except ValueError:
+            continue
+        highest[day] = max(highest.get(day, 0), number)
+
+    GuestIdSequence.objects.bulk_create(
+        [GuestIdSequence(day=day, last_value=number) for day, number in highest.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0008_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clinic', '0009_guestidsequence'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='clinic_appo_date_b83698_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='treatmentplan',
+            name='clinic_trea_created_35cb09_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'id'], name='clinic_appo_date_35de6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['created_at', 'id'], name='clinic_cust_created_25eb6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatmentplan',
+            index=models.Index(fields=['created_at', 'id'], name='clinic_trea_created_36d6ff_idx'),
+        ),
+    ]
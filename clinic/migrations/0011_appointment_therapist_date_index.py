@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0010_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='duration',
+            field=models.IntegerField(default=60, validators=[django.core.validators.MinValueValidator(15), django.core.validators.MaxValueValidator(480)]),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['therapist', 'date'], name='clinic_appo_therapi_67b002_idx'),
+        ),
+    ]
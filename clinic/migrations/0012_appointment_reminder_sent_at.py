@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0011_appointment_therapist_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When the day-before reminder was sent', null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0012_appointment_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailVerificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verification_id', models.BigIntegerField(unique=True)),
+                ('verification_type', models.CharField(choices=[('registration', 'Registration Verification'), ('password_reset', 'Password Reset'), ('email_change', 'Email Change Verification')], max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('created_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('is_used', models.BooleanField(default=False)),
+                ('used_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='emailverification',
+            name='clinic_emai_verific_51f84d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['verification_code', 'verification_type', 'email'], name='emailverif_open_code_idx'),
+        ),
+        migrations.AddField(
+            model_name='emailverificationarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_email_verifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='emailverificationarchive',
+            index=models.Index(fields=['user', 'verification_type'], name='clinic_emai_user_id_e6af67_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailverificationarchive',
+            index=models.Index(fields=['archived_at'], name='clinic_emai_archive_58b50d_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0013_email_verification_open_code_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emailverification',
+            name='clinic_emai_token_a4a7d1_idx',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+from django.db import migrations
+from django.db.models import Case, F, When
+
+
+def backfill_progress(apps, schema_editor):
+    """Recompute progress for plans whose stored value went stale before save() maintained it"""
+    TreatmentPlan = apps.get_model('clinic', 'TreatmentPlan')
+    TreatmentPlan.objects.filter(total_sessions__gt=0).update(
+        progress_percentage=Case(
+            When(total_sessions__gt=0, then=F('completed_sessions') * 100 / F('total_sessions')),
+            default=F('progress_percentage'),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0014_drop_redundant_verification_token_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
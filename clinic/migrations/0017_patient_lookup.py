@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TRGM_TABLE = 'clinic_patientlookup_trgm'
+PG_INDEX = 'patientlookup_key_trgm'
+
+# FTS5 trigram index over the lookup keys (SQLite 3.34+): MATCH phrases become
+# substring tests answered from the index. Triggers keep it in step with the table.
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE {TRGM_TABLE} USING fts5(
+        key, content='clinic_patientlookup', content_rowid='user_id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER clinic_patientlookup_ai AFTER INSERT ON clinic_patientlookup BEGIN
+        INSERT INTO {TRGM_TABLE}(rowid, key) VALUES (new.user_id, new.key);
+    END""",
+    f"""CREATE TRIGGER clinic_patientlookup_ad AFTER DELETE ON clinic_patientlookup BEGIN
+        INSERT INTO {TRGM_TABLE}({TRGM_TABLE}, rowid, key) VALUES ('delete', old.user_id, old.key);
+    END""",
+    f"""CREATE TRIGGER clinic_patientlookup_au AFTER UPDATE ON clinic_patientlookup BEGIN
+        INSERT INTO {TRGM_TABLE}({TRGM_TABLE}, rowid, key) VALUES ('delete', old.user_id, old.key);
+        INSERT INTO {TRGM_TABLE}(rowid, key) VALUES (new.user_id, new.key);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS clinic_patientlookup_ai',
+    'DROP TRIGGER IF EXISTS clinic_patientlookup_ad',
+    'DROP TRIGGER IF EXISTS clinic_patientlookup_au',
+    f'DROP TABLE IF EXISTS {TRGM_TABLE}',
+]
+PG_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX {PG_INDEX} ON clinic_patientlookup USING gin (key gin_trgm_ops)',
+]
+PG_DROP = [
+    f'DROP INDEX IF EXISTS {PG_INDEX}',
+]
+
+
+def create_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            has_fts5 = 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+        if not has_fts5 or schema_editor.connection.Database.sqlite_version_info < (3, 34):
+            # clinic.fuzzy scores every key in process without the trigram table
+            return
+        for statement in SQLITE_CREATE:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for statement in PG_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for statement in PG_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0016_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientLookup',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='patient_lookup', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('key', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0017_patient_lookup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='clinic_appo_guest_i_208ae8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('is_guest', True)), fields=['guest_id', 'guest_email'], name='appointment_guest_lookup'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, F, Q, When
+from django.db.models.functions import Least
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
@@ -65,6 +67,12 @@ class CustomUser(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def get_session_auth_hash(self):
+        # Users from the profile cache carry this value instead of their password hash
+        if 'password' not in self.__dict__ and '_session_auth_hash' in self.__dict__:
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
@@ -72,6 +80,7 @@ class CustomUser(AbstractUser):
             models.Index(fields=['username']),
             models.Index(fields=['email']),
             models.Index(fields=['role']),
+            models.Index(fields=['created_at', 'id']),  # keyset pagination
         ]
         # Add unique constraint for email
         constraints = [
@@ -114,8 +123,9 @@ class Appointment(models.Model):
     service_type = models.CharField(max_length=50, choices=SERVICE_TYPE_CHOICES, default='consultation')
     note = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
-    duration = models.IntegerField(default=60, validators=[MinValueValidator(15)])  # minutes
+    duration = models.IntegerField(default=60, validators=[MinValueValidator(15), MaxValueValidator(480)])  # minutes
     therapist = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_appointments', limit_choices_to={'role': 'therapist'})
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, help_text="When the day-before reminder was sent")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -123,10 +133,14 @@ class Appointment(models.Model):
         ordering = ['-date']
         indexes = [
             models.Index(fields=['user', 'date']),
+            models.Index(fields=['therapist', 'date']),  # availability range scans
             models.Index(fields=['status']),
-            models.Index(fields=['date']),
+            models.Index(fields=['date', 'id']),  # keyset pagination
             models.Index(fields=['is_guest']),
-            models.Index(fields=['guest_id']),
+            # Exactly the guest lookup (guest_id, guest_email, is_guest); guest_id alone is covered by its unique index
+            models.Index(fields=['guest_id', 'guest_email'], condition=models.Q(is_guest=True), name='appointment_guest_lookup'),
+            # Guest history: every appointment booked under one email, newest first
+            models.Index(fields=['guest_email', 'date'], condition=models.Q(is_guest=True), name='appointment_guest_history'),
         ]
 
     def __str__(self):
@@ -141,21 +155,23 @@ class Appointment(models.Model):
         # Generate guest ID if this is a guest appointment and doesn't have one
         if self.is_guest and not self.guest_id:
             self.guest_id = self.generate_guest_id()
+        if self.reminder_sent_at and self.pk and self.date_changed():
+            # A reminder sent for the old time must not stop the one for the new time
+            self.reminder_sent_at = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'reminder_sent_at'}
         super().save(*args, **kwargs)
 
+    def date_changed(self):
+        """Whether `date` differs from the stored row (one query; only asked when a reminder was sent)"""
+        stored = Appointment.objects.filter(pk=self.pk).values_list('date', flat=True).first()
+        return stored is not None and stored != self.date
+
     def generate_guest_id(self):
         """Generate a unique guest ID in format GUEST-YYYYMMDD-XXX"""
-        from datetime import datetime
-        today = datetime.now().strftime('%Y%m%d')
-        
-        # Find the next available number for today
-        existing_today = Appointment.objects.filter(
-            guest_id__startswith=f'GUEST-{today}-',
-            is_guest=True
-        ).count()
-        
-        next_number = existing_today + 1
-        return f'GUEST-{today}-{next_number:03d}'
+        today = timezone.localdate()
+        return GuestIdSequence.format_guest_id(today, GuestIdSequence.allocate(day=today))
 
     @property
     def patient_name(self):
@@ -189,6 +205,40 @@ class Appointment(models.Model):
         if self.date < timezone.now():
             raise ValidationError("Appointment date cannot be in the past.")
 
+class GuestIdSequence(models.Model):
+    """Per-day counter backing GUEST-YYYYMMDD-NNN guest IDs"""
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day:%Y%m%d} - {self.last_value}"
+
+    @staticmethod
+    def format_guest_id(day, number):
+        return f'GUEST-{day:%Y%m%d}-{number:03d}'
+
+    @classmethod
+    def allocate(cls, count=1, day=None):
+        """
+        Reserve `count` consecutive numbers for `day` and return the first one.
+
+        The increment is a single UPDATE, so the row lock serializes concurrent
+        bookings and the cost does not depend on how many guests booked today.
+        """
+        day = day or timezone.localdate()
+        with transaction.atomic():
+            updated = cls.objects.filter(day=day).update(last_value=F('last_value') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(day=day, last_value=count)
+                    return 1
+                except IntegrityError:
+                    # Another booking created today's counter first
+                    cls.objects.filter(day=day).update(last_value=F('last_value') + count)
+            last_value = cls.objects.filter(day=day).values_list('last_value', flat=True).get()
+        return last_value - count + 1
+
 class TreatmentPlan(models.Model):
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='treatment_plans')
     plan_details = models.TextField()
@@ -204,7 +254,7 @@ class TreatmentPlan(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['appointment']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id']),  # keyset pagination
         ]
 
     def __str__(self):
@@ -215,10 +265,64 @@ class TreatmentPlan(models.Model):
         else:
             return f"Plan for Anonymous Patient"
 
+    def save(self, *args, **kwargs):
+        # progress_percentage is derived; keep it in step with the session counts on every write
+        self.calculate_progress()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'completed_sessions', 'total_sessions'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'progress_percentage'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def compute_progress(completed_sessions, total_sessions, default=0):
+        """Completed sessions as a whole percentage of the total, truncated at 100"""
+        if total_sessions > 0:
+            return min(completed_sessions, total_sessions) * 100 // total_sessions
+        return default
+
+    @staticmethod
+    def progress_expression(completed_sessions=None):
+        """
+        The same calculation as a SQL expression, for queryset updates.
+        `completed_sessions` may be an expression such as F('completed_sessions') + 1.
+        """
+        if completed_sessions is None:
+            completed_sessions = F('completed_sessions')
+        return Case(
+            When(total_sessions__gt=0, then=Least(completed_sessions, F('total_sessions')) * 100 / F('total_sessions')),
+            default=F('progress_percentage'),
+        )
+
     def calculate_progress(self):
-        if self.total_sessions > 0:
-            self.progress_percentage = int((self.completed_sessions / self.total_sessions) * 100)
-            self.save()
+        self.progress_percentage = self.compute_progress(
+            self.completed_sessions, self.total_sessions, self.progress_percentage
+        )
+        return self.progress_percentage
+
+    def record_session(self, count=1):
+        """
+        Record `count` completed sessions with a single UPDATE that increments
+        the counter in the database and recomputes progress from the new value,
+        so concurrent check-ins never overwrite each other. The counter stops
+        at total_sessions; a total of 0 means the plan length is still open.
+        """
+        if count < 1:
+            raise ValueError('count must be a positive number of sessions')
+        completed = Case(
+            When(total_sessions__gt=0, then=Least(F('completed_sessions') + count, F('total_sessions'))),
+            default=F('completed_sessions') + count,
+        )
+        TreatmentPlan.objects.filter(pk=self.pk).update(
+            completed_sessions=completed,
+            progress_percentage=self.progress_expression(completed),
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['completed_sessions', 'progress_percentage', 'updated_at'])
+
+        # update() sends no post_save
+        from .caching import bump_version
+        from . import stats
+        bump_version(stats.CACHE_NAMESPACE)
         return self.progress_percentage
 
 class Testimonial(models.Model):
@@ -348,9 +452,15 @@ class EmailVerification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # `token` is unique and therefore already indexed
         indexes = [
-            models.Index(fields=['token']),
-            models.Index(fields=['verification_code']),
+            # Only open codes are ever looked up, so the index covers just those rows
+            # and stays small however many used verifications accumulate
+            models.Index(
+                fields=['verification_code', 'verification_type', 'email'],
+                condition=Q(is_used=False),
+                name='emailverif_open_code_idx',
+            ),
             models.Index(fields=['user', 'verification_type']),
             models.Index(fields=['expires_at']),
         ]
@@ -431,16 +541,14 @@ class EmailVerification(models.Model):
             print(f"📧 Email template rendered successfully. HTML length: {len(html_message)}")
             
             # Send email
-            result = send_mail(
+            result = OutboundEmail.enqueue(
                 subject=subject,
-                message=text_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[self.email],
-                html_message=html_message,
-                fail_silently=False,
+                to_email=self.email,
+                body_text=text_message,
+                body_html=html_message,
             )
             
-            print(f"✅ Registration verification email sent successfully to {self.email}. Result: {result}")
+            print(f"✅ Registration verification email queued for {self.email}. Queue ID: {result.id}")
             return True
             
         except Exception as e:
@@ -471,16 +579,14 @@ class EmailVerification(models.Model):
             
             print(f"📧 Email template rendered successfully. HTML length: {len(html_message)}")
             
-            result = send_mail(
+            result = OutboundEmail.enqueue(
                 subject=subject,
-                message=text_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[self.email],
-                html_message=html_message,
-                fail_silently=False,
+                to_email=self.email,
+                body_text=text_message,
+                body_html=html_message,
             )
             
-            print(f"✅ Password reset email sent successfully to {self.email}. Result: {result}")
+            print(f"✅ Password reset email queued for {self.email}. Queue ID: {result.id}")
             return True
             
         except Exception as e:
@@ -512,16 +618,14 @@ class EmailVerification(models.Model):
             
             print(f"📧 Email template rendered successfully. HTML length: {len(html_message)}")
             
-            result = send_mail(
+            result = OutboundEmail.enqueue(
                 subject=subject,
-                message=text_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[self.email],
-                html_message=html_message,
-                fail_silently=False,
+                to_email=self.email,
+                body_text=text_message,
+                body_html=html_message,
             )
             
-            print(f"✅ Email change verification sent successfully to {self.email}. Result: {result}")
+            print(f"✅ Email change verification queued for {self.email}. Queue ID: {result.id}")
             return True
             
         except Exception as e:
@@ -552,3 +656,270 @@ class EmailVerification(models.Model):
         )
         
         return verification
+    
+    @classmethod
+    def find_open(cls, verification_type, email=None, verification_code=None, token=None):
+        """
+        Return the newest unused verification matching the token, or the code
+        for the given email address, or None.
+
+        Six-digit codes collide between users, so a code is only ever looked
+        up together with its email; both lookups are served by an index.
+        """
+        verifications = cls.objects.filter(verification_type=verification_type, is_used=False)
+        if token:
+            verifications = verifications.filter(token=token)
+        elif email and verification_code:
+            verifications = verifications.filter(verification_code=verification_code, email=email)
+        else:
+            return None
+        return verifications.select_related('user').order_by('-created_at', '-id').first()
+    
+    @classmethod
+    def stale(cls, now=None):
+        """Used verifications and those that have expired, oldest expiry first"""
+        now = now or timezone.now()
+        return cls.objects.filter(Q(is_used=True) | Q(expires_at__lt=now)).order_by('expires_at', 'id')
+    
+    @classmethod
+    def purge_stale(cls, now=None, batch_size=1000, limit=None, archive=True):
+        """
+        Remove used and expired verifications in batches of `batch_size`,
+        copying them to EmailVerificationArchive first unless `archive` is
+        False. Each batch is its own transaction. Returns the number removed.
+        """
+        now = now or timezone.now()
+        stale = cls.stale(now)
+        removed = 0
+        while limit is None or removed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - removed)
+            with transaction.atomic():
+                batch = list(stale.values(
+                    'id', 'user_id', 'verification_type', 'email',
+                    'created_at', 'expires_at', 'is_used', 'used_at',
+                )[:size])
+                if not batch:
+                    break
+                ids = [row.pop('id') for row in batch]
+                if archive:
+                    EmailVerificationArchive.objects.bulk_create([
+                        EmailVerificationArchive(verification_id=verification_id, archived_at=now, **row)
+                        for verification_id, row in zip(ids, batch)
+                    ])
+                cls.objects.filter(id__in=ids).delete()
+            removed += len(ids)
+        return removed
+
+
+class EmailVerificationArchive(models.Model):
+    """Used and expired verifications moved out of the hot EmailVerification table"""
+    
+    verification_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_email_verifications')
+    verification_type = models.CharField(max_length=20, choices=EmailVerification.VERIFICATION_TYPES)
+    email = models.EmailField()
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(null=True, blank=True)
+    is_used = models.BooleanField(default=False)
+    used_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'verification_type']),
+            models.Index(fields=['archived_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.verification_type} - archived {self.archived_at:%Y-%m-%d}"
+
+
+class OutboundEmail(models.Model):
+    """Persistent outbound mail queue drained by the process_email_queue command"""
+    
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('dead', 'Dead Letter'),
+    )
+    
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255)
+    to_email = models.EmailField()
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5, validators=[MinValueValidator(1)])
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
+    
+    @classmethod
+    def enqueue(cls, subject, to_email, body_text, body_html='', from_email=None):
+        """Store a rendered message for background delivery"""
+        return cls.objects.create(
+            subject=subject,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to_email=to_email,
+            body_text=body_text,
+            body_html=body_html,
+            max_attempts=getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5),
+        )
+    
+    @classmethod
+    def enqueue_template(cls, subject, template_name, context, to_email, from_email=None):
+        """Render an email template and queue the HTML and plain text versions"""
+        html_message = render_to_string(template_name, context)
+        return cls.enqueue(
+            subject=subject,
+            to_email=to_email,
+            body_text=strip_tags(html_message),
+            body_html=html_message,
+            from_email=from_email,
+        )
+    
+    @classmethod
+    def claim_batch(cls, batch_size):
+        """Lock a batch of due messages for this worker and return them"""
+        from django.db import transaction
+        
+        now = timezone.now()
+        lock_timeout = timezone.timedelta(minutes=getattr(settings, 'EMAIL_QUEUE_LOCK_TIMEOUT_MINUTES', 10))
+        due = models.Q(status__in=['queued', 'failed'], next_attempt_at__lte=now)
+        # Messages left in "sending" by a crashed worker become due again
+        due |= models.Q(status='sending', locked_at__lt=now - lock_timeout)
+        
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(due)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            cls.objects.filter(id__in=ids).update(status='sending', locked_at=now)
+        return list(cls.objects.filter(id__in=ids).order_by('next_attempt_at'))
+    
+    @classmethod
+    def send_batch(cls, batch_size=50, connection=None):
+        """Deliver one batch of due messages over a single SMTP connection"""
+        messages = cls.claim_batch(batch_size)
+        results = {'sent': 0, 'failed': 0, 'dead': 0}
+        if not messages:
+            return results
+        
+        connection = connection or get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Provider unreachable: push the whole batch back with backoff
+            for message in messages:
+                message.attempts += 1
+                results[message.record_failure(e)] += 1
+            return results
+        
+        try:
+            for message in messages:
+                results[message.deliver(connection)] += 1
+        finally:
+            connection.close()
+        return results
+    
+    def deliver(self, connection):
+        """Send this message on an open connection and record the outcome"""
+        email = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body_text,
+            from_email=self.from_email,
+            to=[self.to_email],
+            connection=connection,
+        )
+        if self.body_html:
+            email.attach_alternative(self.body_html, 'text/html')
+        
+        self.attempts += 1
+        try:
+            email.send(fail_silently=False)
+        except Exception as e:
+            return self.record_failure(e)
+        
+        self.status = 'sent'
+        self.sent_at = timezone.now()
+        self.locked_at = None
+        self.last_error = ''
+        self.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'sent_at'])
+        return self.status
+    
+    def record_failure(self, error):
+        """Schedule a retry with exponential backoff, or dead-letter the message"""
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.locked_at = None
+        if self.attempts >= self.max_attempts:
+            self.status = 'dead'
+        else:
+            # Backoff doubles with every attempt: base, 2x base, 4x base, ...
+            base = getattr(settings, 'EMAIL_QUEUE_RETRY_BACKOFF_SECONDS', 60)
+            self.status = 'failed'
+            self.next_attempt_at = timezone.now() + timezone.timedelta(seconds=base * 2 ** (self.attempts - 1))
+        self.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at'])
+        return self.status
+
+
+class SearchDocument(models.Model):
+    """
+    Flattened search text for one user, appointment or testimonial, kept in
+    sync by signals and indexed by clinic.search: an FTS5 table maintained by
+    triggers on SQLite, a GIN index over the tsvector on PostgreSQL.
+    """
+    
+    KIND_CHOICES = (
+        ('user', 'User'),
+        ('appointment', 'Appointment'),
+        ('testimonial', 'Testimonial'),
+    )
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    # Patients only see public documents and their own
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='search_documents')
+    is_public = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdoc_kind_object_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class PatientLookup(models.Model):
+    """
+    Normalized name, email and phone key for one patient, kept in sync by
+    signals and searched by clinic.fuzzy through a trigram index: an FTS5
+    trigram table on SQLite, a pg_trgm GIN index on PostgreSQL.
+    """
+    
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='patient_lookup')
+    key = models.TextField()
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.key.strip()}"
@@ -0,0 +1,121 @@
+"""
+Keyset Pagination
+Cursor pagination that seeks on the full ordering tuple instead of using OFFSET
+"""
+import json
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over a composite ordering such as (-date, -id).
+
+    DRF's CursorPagination seeks on the first ordering field only and falls
+    back to an offset for ties; here the cursor stores the value of every
+    ordering column of the boundary row, so each page is a single indexed
+    range query no matter how deep it is. The primary key is always appended
+    as a tie-breaker so that the ordering is unique.
+    """
+    ordering = ('-created_at',)
+    invalid_position_message = 'Invalid cursor position'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor is not None and self.cursor.position is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, self._decode_position(self.cursor.position)))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        # A cursor always points at an existing row, so the direction we came
+        # from has more rows; the other direction is known from the extra row
+        if reverse:
+            self.has_next = self.cursor.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None and self.cursor.position is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = self.model._meta.get_field(order.lstrip('-'))
+            values.append(field.value_to_string(instance))
+        return json.dumps(values, separators=(',', ':'))
+
+    def _decode_position(self, position):
+        try:
+            raw_values = json.loads(position)
+            if not isinstance(raw_values, list) or len(raw_values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.model._meta.get_field(order.lstrip('-')).to_python(raw)
+                for order, raw in zip(self.ordering, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_position_message)
+
+    def _seek_filter(self, ordering, values):
+        """
+        Rows strictly after the boundary row in `ordering`:
+        (a > x) OR (a = x AND b > y) OR ... with < for descending columns
+        """
+        clauses = []
+        for index, order in enumerate(ordering):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): values[i] for i in range(index)}
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+        return reduce(lambda left, right: left | right, clauses)
+
+
+class AppointmentCursorPagination(KeysetCursorPagination):
+    ordering = ('-date', '-id')
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class GuestHistoryCursorPagination(AppointmentCursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
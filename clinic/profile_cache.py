@@ -0,0 +1,64 @@
+"""
+User Profile Cache
+Per-user snapshots of the authenticated user and their serialized profile,
+so session checks and dashboard boots are served without touching the
+database. Each user has their own versioned namespace, bumped whenever the
+user is saved or deleted; bulk updates bump the shared ALL_USERS_NAMESPACE.
+"""
+from django.conf import settings
+
+from .caching import bump_version, get_or_compute, get_version
+from .models import CustomUser
+from .serializers import UserProfileSerializer
+
+ALL_USERS_NAMESPACE = 'users'
+
+
+def _namespace(user_id):
+    return f'user:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 900)
+
+
+def _session_user(user_id):
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is not None:
+        # Keep the password hash out of the shared cache; session checks only
+        # need the hash derived from it, and reading user.password loads it
+        user._session_auth_hash = user.get_session_auth_hash()
+        del user.password
+    return user
+
+
+def get_cached_user(user_id):
+    """
+    The CustomUser with this id, from the cache when possible; None if it does
+    not exist. The copy has its password deferred, so save() leaves it alone.
+    """
+    return get_or_compute(
+        _namespace(user_id),
+        ('user', get_version(ALL_USERS_NAMESPACE)),
+        lambda: _session_user(user_id),
+        _timeout(),
+    )
+
+
+def get_profile(user):
+    """The UserProfileSerializer data for a user, from the cache when possible"""
+    return get_or_compute(
+        _namespace(user.pk),
+        ('profile', get_version(ALL_USERS_NAMESPACE)),
+        lambda: dict(UserProfileSerializer(user).data),
+        _timeout(),
+    )
+
+
+def invalidate(user_id):
+    bump_version(_namespace(user_id))
+
+
+def invalidate_all():
+    """For queryset updates that change users without sending post_save"""
+    bump_version(ALL_USERS_NAMESPACE)
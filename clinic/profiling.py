@@ -0,0 +1,163 @@
+"""
+Request Profiling
+Per-request query counts, SQL time and duplicate-query detection, logged as
+JSON lines to the `performance` logger and summarized by `profile_report`.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('performance')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize a SQL statement so repeats that differ only in parameters compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Database execute wrapper that times every statement"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Structured data passed as `extra={'profile': {...}}`
+    is merged into the object instead of being quoted inside the message.
+    """
+
+    def format(self, record):
+        payload = {
+            'timestamp': self.formatTime(record),
+            'level': record.levelname,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'profile', {}))
+        return json.dumps(payload, default=str)
+
+
+class QueryProfilerMiddleware:
+    """
+    Record view name, wall time, query count, SQL time and repeated query
+    fingerprints for each request. Enabled with QUERY_PROFILER_ENABLED;
+    QUERY_PROFILER_SAMPLE_RATE profiles only a fraction of requests.
+
+    A fingerprint repeated QUERY_PROFILER_N_PLUS_ONE_THRESHOLD times or more
+    in one request is flagged as a likely N+1 pattern.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            return self.get_response(request)
+        if random.random() >= getattr(settings, 'QUERY_PROFILER_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        logger.info('request profile', extra={'profile': self.build_profile(request, response, recorder, elapsed)})
+        return response
+
+    def build_profile(self, request, response, recorder, elapsed):
+        threshold = getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 5)
+        counts = Counter(fingerprint(sql) for sql, _ in recorder.queries)
+        duplicates = [
+            {'fingerprint': sql, 'count': count}
+            for sql, count in counts.most_common()
+            if count > 1
+        ]
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': len(recorder.queries),
+            'db_time_ms': round(sum(duration for _, duration in recorder.queries) * 1000, 2),
+            'duplicate_queries': duplicates[:10],
+            'n_plus_one': any(item['count'] >= threshold for item in duplicates),
+        }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(lines):
+    """
+    Group profile records by (method, view) and return one row per endpoint
+    with request count, latency and query-count percentiles, sorted by p95.
+    """
+    groups = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if 'duration_ms' not in record:
+            continue
+        key = (record.get('method'), record.get('view') or record.get('path'))
+        group = groups.setdefault(key, {'durations': [], 'queries': [], 'n_plus_one': 0, 'repeated': Counter()})
+        group['durations'].append(record['duration_ms'])
+        group['queries'].append(record.get('db_queries', 0))
+        if record.get('n_plus_one'):
+            group['n_plus_one'] += 1
+            top = record.get('duplicate_queries') or [{}]
+            group['repeated'][top[0].get('fingerprint')] += 1
+
+    rows = []
+    for (method, view), group in groups.items():
+        durations = sorted(group['durations'])
+        queries = sorted(group['queries'])
+        rows.append({
+            'method': method,
+            'view': view,
+            'requests': len(durations),
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'p99_ms': percentile(durations, 99),
+            'p95_queries': percentile(queries, 95),
+            'n_plus_one': group['n_plus_one'],
+            'top_repeated_query': group['repeated'].most_common(1)[0][0] if group['repeated'] else None,
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows
@@ -0,0 +1,308 @@
+"""
+Full-Text Search
+Users, appointments and testimonials are flattened into SearchDocument rows
+(by signals, and in bulk by rebuild_search_index) and searched through a
+backend chosen for the database:
+
+- PostgreSQL: a weighted tsvector over title/body, served by a GIN index
+- SQLite: the FTS5 table created by migration 0016, ranked with bm25
+- anything else, or SQLite without FTS5: AND-ed icontains on the documents
+
+Every term is a prefix match, so "moh" finds "Mohammed". Set SEARCH_BACKEND
+to 'postgres', 'sqlite_fts' or 'basic' to override the automatic choice.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import FullResultSet
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Appointment, CustomUser, SearchDocument, Testimonial
+
+FTS_TABLE = 'clinic_searchdocument_fts'
+SEARCH_CONFIG = 'simple'
+MAX_TERMS = 8
+DEFAULT_BATCH_SIZE = 500
+
+# Letters and digits in any script; underscores and punctuation separate terms
+_TERM = re.compile(r'[^\W_]+')
+
+
+def terms(query):
+    return _TERM.findall((query or '').lower())[:MAX_TERMS]
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def user_document(user):
+    return {
+        'title': user.get_full_name() or user.username,
+        'body': _join(user.username, user.email, user.first_name, user.last_name, user.phone_number, user.role),
+        'owner_id': user.pk,
+        'is_public': False,
+    }
+
+
+def appointment_document(appointment):
+    therapist = appointment.therapist
+    return {
+        'title': f"{appointment.patient_name} - {appointment.date:%Y-%m-%d %H:%M}",
+        'body': _join(
+            appointment.patient_name,
+            appointment.patient_email,
+            appointment.user.username if appointment.user_id else None,
+            appointment.guest_id,
+            appointment.guest_phone,
+            appointment.get_service_type_display(),
+            appointment.status,
+            appointment.note,
+            therapist.get_full_name() if therapist else None,
+        ),
+        'owner_id': appointment.user_id,
+        'is_public': False,
+    }
+
+
+def testimonial_document(testimonial):
+    return {
+        'title': f"{testimonial.get_display_name()} - {testimonial.condition}",
+        'body': _join(
+            # Anonymous testimonials must not be findable by the author's name
+            None if testimonial.anonymous else testimonial.full_name,
+            None if testimonial.anonymous else testimonial.email,
+            testimonial.condition,
+            testimonial.get_treatment_type_display(),
+            testimonial.before_condition,
+            testimonial.treatment_experience,
+            testimonial.results,
+            testimonial.testimonial_text,
+        ),
+        'owner_id': testimonial.user_id,
+        'is_public': testimonial.is_approved,
+    }
+
+
+# model -> (kind, document builder, fields the document depends on)
+INDEXED_MODELS = {
+    CustomUser: ('user', user_document, {'username', 'email', 'first_name', 'last_name', 'phone_number', 'role'}),
+    Appointment: ('appointment', appointment_document, {
+        'user', 'therapist', 'date', 'is_guest', 'guest_id', 'guest_first_name', 'guest_last_name',
+        'guest_email', 'guest_phone', 'service_type', 'status', 'note',
+    }),
+    Testimonial: ('testimonial', testimonial_document, {
+        'user', 'full_name', 'email', 'condition', 'treatment_type', 'before_condition',
+        'treatment_experience', 'results', 'testimonial_text', 'anonymous', 'is_approved',
+    }),
+}
+KINDS = tuple(kind for kind, _, _ in INDEXED_MODELS.values())
+
+
+def index_objects(objects, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert or refresh the documents for model instances in one statement per batch"""
+    documents = []
+    for obj in objects:
+        kind, build, _ = INDEXED_MODELS[type(obj)]
+        documents.append(SearchDocument(kind=kind, object_id=obj.pk, **build(obj)))
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'body', 'owner', 'is_public', 'updated_at'],
+        )
+    return len(documents)
+
+
+def index(instance, update_fields=None, created=False):
+    """Refresh the document for a saved instance; saves that touch no indexed field are skipped"""
+    kind, _, fields = INDEXED_MODELS[type(instance)]
+    if update_fields is not None and not set(update_fields) & fields:
+        return
+    index_objects([instance])
+    if kind == 'user' and not created:
+        # Appointment documents carry the patient's and therapist's names
+        index_queryset(Appointment.objects.filter(Q(user=instance) | Q(therapist=instance)))
+
+
+def remove(instance):
+    kind = INDEXED_MODELS[type(instance)][0]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def index_queryset(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Refresh documents for every row of a queryset, for writes that bypass post_save"""
+    if queryset.model is Appointment:
+        queryset = queryset.select_related('user', 'therapist')
+    indexed = 0
+    batch = []
+    for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            indexed += index_objects(batch, batch_size)
+            batch = []
+    return indexed + index_objects(batch, batch_size)
+
+
+def rebuild(batch_size=DEFAULT_BATCH_SIZE):
+    """Re-index every model and drop documents whose object is gone; returns counts per kind"""
+    counts = {}
+    for model, (kind, _, _) in INDEXED_MODELS.items():
+        counts[kind] = index_queryset(model.objects.all(), batch_size)
+        SearchDocument.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+    return counts
+
+
+class BasicBackend:
+    """LIKE queries on the flattened documents; correct everywhere, fast nowhere"""
+
+    def matches(self, search_terms, scope):
+        condition = Q()
+        for term in search_terms:
+            condition &= Q(title__icontains=term) | Q(body__icontains=term)
+        return SearchDocument.objects.filter(condition).filter(scope)
+
+    def rank(self, search_terms, scope, offset, limit):
+        page = list(self.matches(search_terms, scope).order_by('-updated_at', '-id')[offset:offset + limit])
+        for document in page:
+            document.rank = 0.0
+        return page
+
+
+class SQLiteFTSBackend:
+    """
+    FTS5 MATCH with bm25 ranking; title hits weigh ten times body hits.
+    The scope conditions are joined inside the FTS query so SQLite always
+    starts from the full-text index and looks documents up by rowid, rather
+    than walking every document of a kind and probing the index for each.
+    """
+
+    def expression(self, search_terms):
+        return ' '.join(f'"{term}"*' for term in search_terms)
+
+    def joined(self, search_terms, scope):
+        query = SearchDocument.objects.filter(scope).query
+        try:
+            where, params = query.get_compiler(connection=connection).compile(query.where)
+        except FullResultSet:
+            where, params = '', []
+        sql = (
+            # CROSS JOIN makes SQLite keep the FTS table as the outer loop
+            f'FROM {FTS_TABLE} CROSS JOIN clinic_searchdocument ON clinic_searchdocument.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        if where:
+            sql += f' AND ({where})'
+        return sql, [self.expression(search_terms), *params]
+
+    def matches(self, search_terms, scope):
+        sql, params = self.joined(search_terms, scope)
+        return SearchDocument.objects.filter(id__in=RawSQL(f'SELECT clinic_searchdocument.id {sql}', params))
+
+    def rank(self, search_terms, scope, offset, limit):
+        sql, params = self.joined(search_terms, scope)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT clinic_searchdocument.id, bm25({FTS_TABLE}, 10.0, 1.0) {sql} '
+                f'ORDER BY 2, 1 LIMIT %s OFFSET %s',
+                [*params, limit, offset],
+            )
+            ranks = cursor.fetchall()
+        by_id = SearchDocument.objects.in_bulk([row_id for row_id, _ in ranks])
+        page = []
+        for row_id, score in ranks:
+            document = by_id[row_id]
+            # bm25 scores are negative, lower is better
+            document.rank = round(-score, 4)
+            page.append(document)
+        return page
+
+
+class PostgresBackend:
+    """Weighted tsvector matched with to_tsquery prefixes and ranked with ts_rank"""
+
+    def vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        # Must match the GIN index expression created in migration 0016
+        return (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+        )
+
+    def query(self, search_terms):
+        from django.contrib.postgres.search import SearchQuery
+
+        return SearchQuery(' & '.join(f'{term}:*' for term in search_terms), search_type='raw', config=SEARCH_CONFIG)
+
+    def matches(self, search_terms, scope):
+        return SearchDocument.objects.annotate(document=self.vector()).filter(document=self.query(search_terms)).filter(scope)
+
+    def rank(self, search_terms, scope, offset, limit):
+        from django.contrib.postgres.search import SearchRank
+
+        ranked = self.matches(search_terms, scope).annotate(rank=SearchRank(self.vector(), self.query(search_terms)))
+        return list(ranked.order_by('-rank', 'id')[offset:offset + limit])
+
+
+BACKENDS = {
+    'basic': BasicBackend,
+    'sqlite_fts': SQLiteFTSBackend,
+    'postgres': PostgresBackend,
+}
+_fts_tables = {}
+
+
+def _has_fts_table():
+    name = str(connection.settings_dict['NAME'])
+    if name not in _fts_tables:
+        _fts_tables[name] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[name]
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        if connection.vendor == 'postgresql':
+            name = 'postgres'
+        elif connection.vendor == 'sqlite' and _has_fts_table():
+            name = 'sqlite_fts'
+        else:
+            name = 'basic'
+    return BACKENDS[name]()
+
+
+def matching_ids(kind, query):
+    """Subquery of the object ids of `kind` whose document matches every term"""
+    search_terms = terms(query)
+    if not search_terms:
+        return SearchDocument.objects.none().values('object_id')
+    return get_backend().matches(search_terms, Q(kind=kind)).values('object_id')
+
+
+def visible_to(user):
+    """Staff, admins and therapists search everything; others see public documents and their own"""
+    if user is not None and user.is_authenticated and (user.is_staff or user.role in ('admin', 'therapist')):
+        return Q()
+    if user is not None and user.is_authenticated:
+        return Q(is_public=True) | Q(owner_id=user.pk)
+    return Q(is_public=True)
+
+
+def search(query, user=None, kinds=None, offset=0, limit=20):
+    """Return (total, page) of ranked SearchDocuments matching `query` that `user` may see"""
+    search_terms = terms(query)
+    if not search_terms:
+        return 0, []
+    backend = get_backend()
+    scope = visible_to(user)
+    if kinds:
+        scope &= Q(kind__in=kinds)
+    total = backend.matches(search_terms, scope).count()
+    if not total or offset >= total:
+        return total, []
+    return total, backend.rank(search_terms, scope, offset, limit)
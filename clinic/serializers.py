@@ -1,8 +1,22 @@
+import copy
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
 from drf_yasg.utils import swagger_serializer_method
 from .models import CustomUser, Appointment, TreatmentPlan, Testimonial, EmailVerification
+from . import booking
+
+class DynamicFieldsMixin:
+    """
+    Lets callers trim a serializer's output with a `fields` argument,
+    e.g. AppointmentListSerializer(qs, many=True, fields=['id', 'date']).
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
 class CustomUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -90,7 +104,59 @@ class CustomUserReadSerializer(serializers.ModelSerializer):
                  'created_at', 'updated_at')
         read_only_fields = fields
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    Profile returned by login and profile. ModelSerializer introspects the
+    model every time it is instantiated; here the fields are built once per
+    process and copied, which roughly halves the cost of each response.
+    """
+    _field_cache = None
+
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'username', 'email', 'first_name', 'last_name',
+                 'phone_number', 'gender', 'date_of_birth', 'address', 'city',
+                 'blood_type', 'emergency_contact', 'medical_history',
+                 'treatment_reason', 'condition_description', 'role', 'created_at')
+        read_only_fields = fields
+
+    def get_fields(self):
+        cls = type(self)
+        if cls._field_cache is None:
+            cls._field_cache = super().get_fields()
+        return copy.deepcopy(cls._field_cache)
+
+class AppointmentListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Compact appointment representation for list views: flat patient and therapist references"""
+    EXPANDABLE_FIELDS = ('user', 'therapist')
+    
+    patient_id = serializers.IntegerField(source='user_id', read_only=True)
+    patient_name = serializers.CharField(read_only=True)
+    patient_email = serializers.EmailField(read_only=True)
+    therapist_id = serializers.IntegerField(read_only=True)
+    therapist_name = serializers.SerializerMethodField()
+    service_type_display = serializers.CharField(source='get_service_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Appointment
+        fields = ('id', 'patient_id', 'patient_name', 'patient_email', 'therapist_id', 'therapist_name',
+                 'date', 'service_type', 'service_type_display', 'note', 'status', 'status_display',
+                 'duration', 'is_guest', 'guest_id', 'created_at', 'updated_at')
+        read_only_fields = fields
+    
+    def __init__(self, *args, **kwargs):
+        expand = kwargs.pop('expand', None) or ()
+        super().__init__(*args, **kwargs)
+        # ?expand=user,therapist swaps in the full nested profiles on request
+        for field_name in self.EXPANDABLE_FIELDS:
+            if field_name in expand:
+                self.fields[field_name] = CustomUserReadSerializer(read_only=True)
+    
+    def get_therapist_name(self, obj):
+        return obj.therapist.get_full_name() if obj.therapist_id else None
+
+class AppointmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = CustomUserReadSerializer(read_only=True)
     therapist = CustomUserReadSerializer(read_only=True)
     service_type_display = serializers.CharField(source='get_service_type_display', read_only=True)
@@ -154,11 +220,10 @@ class AppointmentSerializer(serializers.ModelSerializer):
             # For guest appointments, ensure user is None
             validated_data['user'] = None
             
-            # Validate guest-specific required fields
-            guest_required = ['guest_first_name', 'guest_last_name', 'guest_email', 'guest_phone']
-            for field in guest_required:
-                if not validated_data.get(field):
-                    raise serializers.ValidationError(f"Guest appointments require {field}")
+            # Same guest rules as the public booking form
+            _, errors = booking.GUEST_DETAILS.validate(validated_data)
+            if errors:
+                raise serializers.ValidationError(errors)
         
         # Create the appointment
         appointment = super().create(validated_data)
@@ -207,6 +272,9 @@ class TreatmentPlanSerializer(serializers.ModelSerializer):
             'completed_sessions': {'help_text': 'Number of sessions completed'},
         }
 
+class RecordSessionSerializer(serializers.Serializer):
+    count = serializers.IntegerField(default=1, min_value=1, max_value=50, help_text="Number of sessions completed (default 1)")
+
 class TestimonialSerializer(serializers.ModelSerializer):
     user = CustomUserReadSerializer(read_only=True)
     display_name = serializers.CharField(source='get_display_name', read_only=True)
@@ -236,6 +304,32 @@ class TestimonialSerializer(serializers.ModelSerializer):
             'consent': {'required': True, 'help_text': 'Consent to use testimonial'},
         }
 
+class PublicTestimonialSerializer(serializers.ModelSerializer):
+    """Public success-story representation: no contact details or account data"""
+    display_name = serializers.CharField(source='get_display_name', read_only=True)
+    treatment_type_display = serializers.CharField(source='get_treatment_type_display', read_only=True)
+    rating_display = serializers.CharField(source='get_rating_display', read_only=True)
+    recommend_display = serializers.CharField(source='get_recommend_display', read_only=True)
+
+    class Meta:
+        model = Testimonial
+        fields = ('id', 'display_name', 'age', 'condition', 'treatment_type', 'treatment_type_display',
+                  'treatment_duration', 'specialist', 'before_condition', 'treatment_experience', 'results',
+                  'testimonial_text', 'rating', 'rating_display', 'recommend', 'recommend_display',
+                  'media_file', 'is_featured', 'created_at')
+        read_only_fields = fields
+
+class GuestAppointmentSerializer(serializers.ModelSerializer):
+    """A guest's own appointment, as shown by the guest lookup page"""
+    date = serializers.DateTimeField(format='%Y-%m-%d %H:%M', read_only=True)
+    created_at = serializers.DateTimeField(format='%Y-%m-%d %H:%M', read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = ('id', 'guest_id', 'guest_first_name', 'guest_last_name', 'guest_email', 'guest_phone',
+                  'guest_age', 'guest_gender', 'date', 'service_type', 'status', 'note', 'created_at')
+        read_only_fields = fields
+
 # Response Serializers for API Documentation
 class LoginResponseSerializer(serializers.Serializer):
     success = serializers.BooleanField()
@@ -260,7 +354,12 @@ class EmailVerificationSerializer(serializers.ModelSerializer):
 class VerifyEmailSerializer(serializers.Serializer):
     verification_code = serializers.CharField(max_length=6, min_length=6, help_text="6-digit verification code")
     token = serializers.CharField(required=False, help_text="Verification token (optional)")
-    email = serializers.EmailField(required=False, help_text="Email address (optional, used for verification)")
+    email = serializers.EmailField(required=False, help_text="Email address the code was sent to (required unless a token is given)")
+
+    def validate(self, attrs):
+        if not attrs.get('token') and not attrs.get('email'):
+            raise serializers.ValidationError({"email": "Email address is required to verify a code."})
+        return attrs
 
 class RequestPasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField(help_text="Email address associated with your account")
@@ -268,6 +367,7 @@ class RequestPasswordResetSerializer(serializers.Serializer):
 class PasswordResetSerializer(serializers.Serializer):
     verification_code = serializers.CharField(max_length=6, min_length=6, help_text="6-digit verification code")
     token = serializers.CharField(required=False, help_text="Verification token (optional)")
+    email = serializers.EmailField(required=False, help_text="Email address the code was sent to (required unless a token is given)")
     new_password = serializers.CharField(
         write_only=True,
         validators=[validate_password],
@@ -281,6 +381,8 @@ class PasswordResetSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['confirm_password']:
             raise serializers.ValidationError({"confirm_password": "Passwords don't match."})
+        if not attrs.get('token') and not attrs.get('email'):
+            raise serializers.ValidationError({"email": "Email address is required to verify a code."})
         return attrs
 
 class ResendVerificationSerializer(serializers.Serializer):
@@ -0,0 +1,85 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from .caching import bump_version
+from .models import CustomUser, Appointment, TreatmentPlan, Testimonial, PatientLookup, SearchDocument
+from . import fuzzy, guest_lookup, profile_cache, search, stats, testimonial_feed
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=TreatmentPlan)
+@receiver([post_save, post_delete], sender=Testimonial)
+def invalidate_stats(sender, **kwargs):
+    """Drop cached dashboard aggregates whenever the underlying rows change"""
+    bump_version(stats.CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_stats(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no aggregate depends on
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_version(stats.CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=Testimonial)
+def invalidate_testimonial_feed(sender, **kwargs):
+    """Approval, featuring and edits all change what the public feed shows"""
+    bump_version(testimonial_feed.CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_guest_lookup(sender, instance, **kwargs):
+    """Guest updates, status changes and staff edits all change what the guest sees"""
+    if instance.guest_id:
+        guest_lookup.invalidate(instance.guest_id)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_profile(sender, instance, update_fields=None, **kwargs):
+    """Cached session users and profiles must never outlive a change to the row"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    profile_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Testimonial)
+def update_search_document(sender, instance, created=False, update_fields=None, **kwargs):
+    search.index(instance, update_fields=update_fields, created=created)
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Testimonial)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def update_patient_lookup(sender, instance, update_fields=None, **kwargs):
+    """Re-key the fuzzy lookup row; users who stop being patients lose theirs"""
+    fuzzy.index(instance, update_fields=update_fields)
+
+
+@receiver(post_migrate)
+def backfill_search_index(sender, using=DEFAULT_DB_ALIAS, apps=None, **kwargs):
+    """
+    post_save only indexes rows written after the search tables exist, so the
+    first migrate over an existing clinic indexes what is already there.
+    Afterwards the tables are never empty and this is two EXISTS queries.
+    """
+    if sender.label != 'clinic' or using != DEFAULT_DB_ALIAS or apps is None:
+        return
+    try:
+        # Absent when migrating back past 0016/0017
+        apps.get_model('clinic', 'SearchDocument')
+        apps.get_model('clinic', 'PatientLookup')
+    except LookupError:
+        return
+
+    if not SearchDocument.objects.exists() and any(model.objects.exists() for model in search.INDEXED_MODELS):
+        search.rebuild()
+    if not PatientLookup.objects.exists() and CustomUser.objects.filter(role='patient').exists():
+        fuzzy.rebuild()
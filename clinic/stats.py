@@ -0,0 +1,138 @@
+"""
+Dashboard Statistics
+Aggregates for the admin dashboard and reports, computed in the database
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Q
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import timewindows
+from .caching import get_or_compute
+from .models import Appointment, CustomUser, Testimonial, TreatmentPlan
+
+CACHE_NAMESPACE = 'stats'
+
+
+def parse_range(start=None, end=None, default_days=30):
+    """
+    Turn optional YYYY-MM-DD bounds into an aware half-open [start, end) range.
+    Raises ValueError for malformed dates.
+    """
+    today = timezone.localdate()
+    end_day = datetime.strptime(end, '%Y-%m-%d').date() if end else today
+    start_day = datetime.strptime(start, '%Y-%m-%d').date() if start else end_day - timedelta(days=default_days)
+    if start_day > end_day:
+        raise ValueError('start must not be after end')
+    return timewindows.days(start_day, end_day)
+
+
+def _counts(queryset, field):
+    return {row[field]: row['count'] for row in queryset.values(field).annotate(count=Count('id')).order_by(field)}
+
+
+def appointment_stats(start, end):
+    appointments = timewindows.within(Appointment.objects.all(), 'date', (start, end))
+    by_day = (
+        appointments.annotate(day=TruncDate('date'))
+        .values('day')
+        .annotate(count=Count('id'))
+        .order_by('day')
+    )
+    return {
+        'total': appointments.count(),
+        'by_status': _counts(appointments, 'status'),
+        'by_service_type': _counts(appointments, 'service_type'),
+        'by_day': [{'day': row['day'].isoformat(), 'count': row['count']} for row in by_day],
+        'guests': appointments.filter(is_guest=True).count(),
+    }
+
+
+def user_stats(start, end):
+    new_users = CustomUser.objects.filter(created_at__gte=start, created_at__lt=end)
+    by_week = (
+        new_users.annotate(week=TruncWeek('created_at'))
+        .values('week')
+        .annotate(count=Count('id'))
+        .order_by('week')
+    )
+    return {
+        'total': CustomUser.objects.count(),
+        'by_role': _counts(CustomUser.objects.all(), 'role'),
+        'new_total': new_users.count(),
+        'new_by_role': _counts(new_users, 'role'),
+        'new_by_week': [{'week': row['week'].date().isoformat(), 'count': row['count']} for row in by_week],
+    }
+
+
+def testimonial_stats(start, end):
+    testimonials = Testimonial.objects.filter(created_at__gte=start, created_at__lt=end)
+    summary = testimonials.aggregate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(is_approved=True)),
+        featured=Count('id', filter=Q(is_featured=True)),
+        average_rating=Avg('rating'),
+    )
+    summary['average_rating'] = round(summary['average_rating'] or 0, 2)
+    summary['by_rating'] = _counts(testimonials, 'rating')
+    return summary
+
+
+def treatment_plan_stats(start, end):
+    plans = TreatmentPlan.objects.filter(created_at__gte=start, created_at__lt=end)
+    summary = plans.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(total_sessions__gt=0, completed_sessions__gte=F('total_sessions'))),
+        average_progress=Avg('progress_percentage'),
+    )
+    summary['average_progress'] = round(summary['average_progress'] or 0, 1)
+    summary['completion_rate'] = round(summary['completed'] * 100 / summary['total'], 1) if summary['total'] else 0
+    return summary
+
+
+def totals(start, end):
+    """All-time figures for the dashboard counters; the range does not apply"""
+    appointments = Appointment.objects.all()
+    by_month = (
+        appointments.annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(count=Count('id'))
+        .order_by('month')
+    )
+    return {
+        'appointments': {
+            'total': appointments.count(),
+            'today': timewindows.within(appointments, 'date', timewindows.today()).count(),
+            'by_status': _counts(appointments, 'status'),
+            'by_service_type': _counts(appointments, 'service_type'),
+            'by_month': [{'month': row['month'].strftime('%Y-%m'), 'count': row['count']} for row in by_month],
+        },
+        'users': CustomUser.objects.count(),
+        'testimonials': Testimonial.objects.count(),
+    }
+
+
+SECTIONS = {
+    'totals': totals,
+    'appointments': appointment_stats,
+    'users': user_stats,
+    'testimonials': testimonial_stats,
+    'treatment_plans': treatment_plan_stats,
+}
+
+
+def get_stats(section, start, end):
+    """Return one section (or 'overview' for all of them), cached until the next write"""
+    def compute():
+        if section == 'overview':
+            return {name: builder(start, end) for name, builder in SECTIONS.items()}
+        return SECTIONS[section](start, end)
+
+    timeout = getattr(settings, 'STATS_CACHE_TIMEOUT', 300)
+    data = get_or_compute(CACHE_NAMESPACE, (section, start.isoformat(), end.isoformat()), compute, timeout)
+    date_range = {'start': start.date().isoformat(), 'end': (end - timedelta(days=1)).date().isoformat()}
+    if section == 'overview':
+        return {'range': date_range, **data}
+    return {'range': date_range, section: data}
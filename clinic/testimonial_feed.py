@@ -0,0 +1,46 @@
+"""
+Public Testimonial Feed
+The approved success stories shown on the public site, cached until a
+testimonial is saved, deleted, approved or (un)featured.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .caching import get_or_compute
+from .models import Testimonial
+from .serializers import PublicTestimonialSerializer
+
+CACHE_NAMESPACE = 'testimonials'
+
+
+def build_feed(featured=False, treatment_type=None):
+    """Serialize the feed and fingerprint it for conditional requests"""
+    testimonials = Testimonial.objects.filter(is_approved=True)
+    if featured:
+        testimonials = testimonials.filter(is_featured=True)
+    if treatment_type:
+        testimonials = testimonials.filter(treatment_type=treatment_type)
+    limit = getattr(settings, 'TESTIMONIAL_FEED_LIMIT', 100)
+    testimonials = testimonials.order_by('-is_featured', '-created_at', '-id')[:limit]
+
+    data = PublicTestimonialSerializer(testimonials, many=True).data
+    body = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return {
+        'data': data,
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+        # Built right after an invalidation, so it never predates the change it reflects
+        'last_modified': timezone.now().timestamp(),
+    }
+
+
+def get_feed(featured=False, treatment_type=None):
+    timeout = getattr(settings, 'TESTIMONIAL_FEED_CACHE_TIMEOUT', 3600)
+    return get_or_compute(
+        CACHE_NAMESPACE,
+        (bool(featured), treatment_type or ''),
+        lambda: build_feed(featured, treatment_type),
+        timeout,
+    )
@@ -2,7 +2,7 @@ import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
-from clinic.models import CustomUser, Appointment, TreatmentPlan
+from clinic.models import CustomUser, Appointment, TreatmentPlan, Testimonial
 from factory import Faker
 from factory.django import DjangoModelFactory
 from datetime import datetime, timedelta
@@ -51,6 +51,24 @@ class TreatmentPlanFactory(DjangoModelFactory):
     ]
     duration_weeks = Faker('random_int', min=1, max=12)
 
+class TestimonialFactory(DjangoModelFactory):
+    class Meta:
+        model = Testimonial
+    
+    full_name = Faker('name')
+    email = Faker('email')
+    phone = '+966 555 000 111'
+    condition = 'Back pain'
+    treatment_type = 'manual-therapy'
+    before_condition = Faker('sentence')
+    treatment_experience = Faker('sentence')
+    results = Faker('sentence')
+    testimonial_text = Faker('paragraph')
+    rating = 5
+    recommend = 'definitely-yes'
+    consent = True
+    is_approved = True
+
 # Fixtures
 @pytest.fixture
 def api_client():
@@ -114,6 +132,11 @@ def treatment_plan(patient_appointment):
     """Create a treatment plan for an appointment"""
     return TreatmentPlanFactory(appointment=patient_appointment)
 
+@pytest.fixture
+def testimonial():
+    """Create an approved testimonial"""
+    return TestimonialFactory()
+
 @pytest.fixture
 def multiple_patients():
     """Create multiple patient users"""
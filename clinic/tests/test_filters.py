@@ -1,6 +1,8 @@
 import pytest
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import connection
+from clinic import timewindows
 from clinic.filters import AppointmentFilter, TreatmentPlanFilter, CustomUserFilter
 from clinic.models import CustomUser, Appointment, TreatmentPlan
 
@@ -67,15 +69,15 @@ class TestAppointmentFilter:
 
     def test_filter_today(self, patient_user):
         """Test filtering appointments for today"""
-        today = timezone.now().date()
+        today = timezone.localdate()
         today_appointment = Appointment.objects.create(
             user=patient_user,
-            date=today.replace(hour=10, minute=0, second=0, microsecond=0),
+            date=timezone.make_aware(datetime.combine(today, time(10, 0))),
             status='scheduled'
         )
         tomorrow_appointment = Appointment.objects.create(
             user=patient_user,
-            date=today + timedelta(days=1),
+            date=timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min)),
             status='scheduled'
         )
         
@@ -150,6 +152,53 @@ class TestAppointmentFilter:
         assert long_appointment in filtered_qs
         assert short_appointment not in filtered_qs
 
+    def test_filter_tomorrow_and_week(self, patient_user):
+        """Test the tomorrow and week filters use half-open local-day bounds"""
+        today = timezone.localdate()
+        midnight = timewindows.day_start(today + timedelta(days=1))
+        late_today = Appointment.objects.create(user=patient_user, date=midnight - timedelta(microseconds=1))
+        at_midnight = Appointment.objects.create(user=patient_user, date=midnight)
+
+        tomorrow = AppointmentFilter({'tomorrow': True}, queryset=Appointment.objects.all()).qs
+        assert list(tomorrow) == [at_midnight]
+
+        this_week = AppointmentFilter({'week_of': today.isoformat()}, queryset=Appointment.objects.all()).qs
+        assert late_today in this_week
+        assert (at_midnight in this_week) == (today.weekday() != 6)
+
+    def test_filter_by_day(self, patient_user):
+        """Test that date__date still selects one calendar day"""
+        day = timezone.localdate() + timedelta(days=3)
+        inside = Appointment.objects.create(user=patient_user, date=timewindows.day_start(day) + timedelta(hours=9))
+        Appointment.objects.create(user=patient_user, date=timewindows.day_start(day + timedelta(days=1)))
+
+        filtered_qs = AppointmentFilter({'date__date': day.isoformat()}, queryset=Appointment.objects.all()).qs
+        assert list(filtered_qs) == [inside]
+
+    @pytest.mark.parametrize('params', [
+        {'today': True},
+        {'tomorrow': True},
+        {'this_week': True},
+        {'week_of': '2026-03-02'},
+        {'date__date': '2026-03-02'},
+    ])
+    def test_day_filters_use_date_index(self, params):
+        """Test via EXPLAIN that calendar filters are index range scans, not casts of the column"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        plan = AppointmentFilter(params, queryset=Appointment.objects.all()).qs.explain()
+        assert 'SEARCH clinic_appointment USING INDEX' in plan
+        assert '(date>? AND date<?)' in plan
+
+    @pytest.mark.parametrize('params, bound', [({'upcoming': True}, '(date>?)'), ({'past': True}, '(date<?)')])
+    def test_relative_filters_use_date_index(self, params, bound):
+        """Test via EXPLAIN that upcoming and past are one-sided index range scans"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        plan = AppointmentFilter(params, queryset=Appointment.objects.all()).qs.explain()
+        assert 'SEARCH clinic_appointment USING INDEX' in plan
+        assert bound in plan
+
 
 @pytest.mark.django_db
 @pytest.mark.unit
@@ -382,4 +431,47 @@ class TestCustomUserFilter:
         assert filtered_qs.count() == 1
         assert active_patient in filtered_qs
         assert inactive_patient not in filtered_qs
-        assert active_therapist not in filtered_qs 
\ No newline at end of file
+        assert active_therapist not in filtered_qs 
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestTimeWindows:
+    """Test cases for the timewindows range helpers"""
+
+    def test_day_is_half_open_local_range(self):
+        """Test that a day window runs from local midnight to the next local midnight"""
+        with timezone.override('Asia/Riyadh'):
+            start, end = timewindows.day(datetime(2026, 3, 2).date())
+            assert timezone.localtime(start).hour == 0
+            assert start.utcoffset() == timedelta(hours=3)
+            assert end - start == timedelta(days=1)
+
+    def test_day_across_dst_change(self):
+        """Test that the bounds stay on local midnight when the day is 23 hours long"""
+        with timezone.override('Europe/Berlin'):
+            start, end = timewindows.day(datetime(2026, 3, 29).date())
+            # Aware datetimes in the same zone subtract as wall time; compare in UTC
+            assert end.astimezone(dt_timezone.utc) - start.astimezone(dt_timezone.utc) == timedelta(hours=23)
+            assert timezone.localtime(end).hour == 0
+
+    def test_week_starts_on_monday(self):
+        """Test that week windows cover Monday to Sunday"""
+        start, end = timewindows.week(datetime(2026, 3, 5).date())
+        assert timezone.localtime(start).date() == datetime(2026, 3, 2).date()
+        assert timezone.localtime(end).date() == datetime(2026, 3, 9).date()
+
+    def test_open_bounds(self):
+        """Test that relative windows only constrain one side"""
+        now = timezone.now()
+        assert timewindows.q('date', timewindows.upcoming(now)).children == [('date__gte', now)]
+        assert timewindows.q('date', timewindows.past(now)).children == [('date__lt', now)]
+
+    def test_created_on_uses_range(self, patient_appointment):
+        """Test that the treatment plan created_at__date filter is a range on created_at"""
+        plan = TreatmentPlan.objects.create(appointment=patient_appointment, plan_details='Plan')
+        day = timezone.localdate()
+        filtered_qs = TreatmentPlanFilter({'created_at__date': day.isoformat()}, queryset=TreatmentPlan.objects.all()).qs
+        assert list(filtered_qs) == [plan]
+        assert 'created_at__date' not in str(filtered_qs.query)
+        assert 'django_datetime_cast_date' not in str(filtered_qs.query)
\ No newline at end of file
@@ -2,10 +2,11 @@ import pytest
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from io import StringIO
-from clinic.models import CustomUser, Appointment, TreatmentPlan
+from clinic.models import CustomUser, Appointment, TreatmentPlan, OutboundEmail, EmailVerification, EmailVerificationArchive, PatientLookup, SearchDocument
 
 
 @pytest.mark.django_db
@@ -230,4 +231,534 @@ class TestOptimizeDbCommand:
         
         # Check that verbose output contains more details
         assert 'Cleaning up old data...' in output
-        assert 'Cleared all cache' in output 
\ No newline at end of file
+        assert 'Cleared all cache' in output 
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestProcessEmailQueueCommand:
+    """Test cases for process_email_queue management command"""
+
+    def test_drains_queue_in_batches(self, mailoutbox):
+        """Test that the command sends every queued message in batches"""
+        for i in range(5):
+            OutboundEmail.enqueue(subject=f'Message {i}', to_email=f'user{i}@example.com', body_text='Body')
+
+        out = StringIO()
+        call_command('process_email_queue', '--batch-size', '2', stdout=out)
+        output = out.getvalue()
+
+        assert len(mailoutbox) == 5
+        assert not OutboundEmail.objects.exclude(status='sent').exists()
+        assert 'Batch 3' in output
+        assert 'Sent: 5' in output
+
+    def test_empty_queue(self, mailoutbox):
+        """Test that the command exits cleanly with nothing to send"""
+        out = StringIO()
+        call_command('process_email_queue', stdout=out)
+
+        assert len(mailoutbox) == 0
+        assert 'Sent: 0' in out.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestSendAppointmentRemindersCommand:
+    """Test cases for send_appointment_reminders management command"""
+
+    @pytest.fixture
+    def tomorrow_appointments(self):
+        from datetime import datetime, time
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        appointments = []
+        for i in range(7):
+            appointments.append(Appointment.objects.create(
+                is_guest=True,
+                guest_first_name='Guest',
+                guest_last_name=str(i),
+                guest_email=f'guest{i}@example.com',
+                date=timezone.make_aware(datetime.combine(tomorrow, time(9 + i))),
+                status='scheduled',
+            ))
+        return appointments
+
+    def test_sends_each_reminder_once(self, mailoutbox, tomorrow_appointments, patient_user):
+        """Test that reminders are sent, recorded, and not repeated on a rerun"""
+        Appointment.objects.create(user=patient_user, date=timezone.now() + timedelta(days=3), status='scheduled')
+
+        out = StringIO()
+        call_command('send_appointment_reminders', '--chunk-size', '3', stdout=out)
+
+        assert len(mailoutbox) == 7
+        assert 'Reminders sent: 7' in out.getvalue()
+        assert not Appointment.objects.filter(id__in=[a.id for a in tomorrow_appointments], reminder_sent_at__isnull=True).exists()
+
+        out = StringIO()
+        call_command('send_appointment_reminders', stdout=out)
+        assert len(mailoutbox) == 7
+        assert 'Found 0 appointments' in out.getvalue()
+
+    def test_workers_send_every_reminder(self, mailoutbox, tomorrow_appointments):
+        """Test that the thread pool mode sends every reminder exactly once"""
+        call_command('send_appointment_reminders', '--workers', '3', '--chunk-size', '2', stdout=StringIO())
+
+        recipients = sorted(message.to[0] for message in mailoutbox)
+        assert recipients == sorted(a.guest_email for a in tomorrow_appointments)
+
+    def test_reuses_one_connection(self, mailoutbox, tomorrow_appointments, monkeypatch):
+        """Test that a single-worker run opens one email connection for all chunks"""
+        from clinic.management.commands import send_appointment_reminders
+        opened = []
+        real_get_connection = send_appointment_reminders.get_connection
+
+        def counting_get_connection(*args, **kwargs):
+            opened.append(1)
+            return real_get_connection(*args, **kwargs)
+
+        monkeypatch.setattr(send_appointment_reminders, 'get_connection', counting_get_connection)
+        call_command('send_appointment_reminders', '--chunk-size', '2', stdout=StringIO())
+
+        assert len(mailoutbox) == 7
+        assert len(opened) == 1
+
+    def test_dry_run(self, mailoutbox, tomorrow_appointments):
+        """Test that dry run neither sends nor records reminders"""
+        out = StringIO()
+        call_command('send_appointment_reminders', '--dry-run', stdout=out)
+
+        assert len(mailoutbox) == 0
+        assert 'Would send reminders: 7' in out.getvalue()
+        assert not Appointment.objects.filter(reminder_sent_at__isnull=False).exists()
+
+
+@pytest.mark.unit
+class TestProfileReportCommand:
+    """Test cases for profile_report management command"""
+
+    def write_log(self, path, records):
+        import json
+        path.write_text('\n'.join(json.dumps(record) for record in records) + '\nnot json\n')
+
+    def test_percentiles_per_endpoint(self, tmp_path):
+        """Test that each endpoint gets p50/p95/p99 rows and N+1 flags"""
+        log = tmp_path / 'performance.log'
+        records = [
+            {'method': 'GET', 'view': 'appointment-list', 'duration_ms': float(ms), 'db_queries': 3, 'n_plus_one': False}
+            for ms in range(1, 101)
+        ]
+        records += [
+            {'method': 'GET', 'view': 'testimonial-list', 'duration_ms': 500.0, 'db_queries': 40, 'n_plus_one': True,
+             'duplicate_queries': [{'fingerprint': 'SELECT ... WHERE id = ?', 'count': 38}]}
+        ]
+        self.write_log(log, records)
+
+        out = StringIO()
+        call_command('profile_report', '--file', str(log), '--json', stdout=out)
+        import json
+        rows = {row['view']: row for row in json.loads(out.getvalue())}
+
+        assert rows['appointment-list']['requests'] == 100
+        assert rows['appointment-list']['p50_ms'] == 50.0
+        assert rows['appointment-list']['p95_ms'] == 95.0
+        assert rows['appointment-list']['p99_ms'] == 99.0
+        assert rows['testimonial-list']['n_plus_one'] == 1
+        assert rows['testimonial-list']['top_repeated_query'] == 'SELECT ... WHERE id = ?'
+
+    def test_table_output(self, tmp_path):
+        """Test the human-readable table"""
+        log = tmp_path / 'performance.log'
+        self.write_log(log, [{'method': 'GET', 'view': 'health_check', 'duration_ms': 2.0, 'db_queries': 1}])
+
+        out = StringIO()
+        call_command('profile_report', '--file', str(log), stdout=out)
+
+        assert 'GET health_check' in out.getvalue()
+        assert 'Summarized 1 requests across 1 endpoints' in out.getvalue()
+
+    def test_missing_file(self, tmp_path):
+        """Test that an unreadable log raises a command error"""
+        with pytest.raises(CommandError):
+            call_command('profile_report', '--file', str(tmp_path / 'missing.log'))
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestImportAppointmentsCommand:
+    """Test cases for import_appointments management command"""
+
+    def test_bulk_import_in_batches(self, tmp_path, patient_user, django_assert_max_num_queries):
+        """Test that a large file is inserted with a bounded number of queries"""
+        import json
+        start = timezone.now() + timedelta(days=10)
+        path = tmp_path / 'legacy.ndjson'
+        with path.open('w') as legacy:
+            for i in range(1000):
+                row = {'date': (start + timedelta(minutes=i)).isoformat(), 'service_type': 'consultation'}
+                if i % 2:
+                    row.update(is_guest=True, guest_first_name='G', guest_last_name=str(i), guest_email=f'g{i}@example.com')
+                else:
+                    row['user_id'] = patient_user.id
+                legacy.write(json.dumps(row) + '\n')
+
+        out = StringIO()
+        with django_assert_max_num_queries(60):
+            call_command('import_appointments', str(path), '--batch-size', '250', stdout=out)
+
+        assert 'Created: 1000' in out.getvalue()
+        assert Appointment.objects.count() == 1000
+        guest_ids = Appointment.objects.filter(is_guest=True).values_list('guest_id', flat=True)
+        assert len(set(guest_ids)) == 500
+
+    def test_dry_run(self, tmp_path, patient_user):
+        """Test that dry run validates without inserting"""
+        path = tmp_path / 'legacy.csv'
+        path.write_text(f"date,user_id\n{(timezone.now() + timedelta(days=1)).isoformat()},{patient_user.id}\n")
+
+        out = StringIO()
+        call_command('import_appointments', str(path), '--dry-run', stdout=out)
+
+        assert 'Valid rows: 1' in out.getvalue()
+        assert Appointment.objects.count() == 0
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file raises a command error"""
+        with pytest.raises(CommandError):
+            call_command('import_appointments', str(tmp_path / 'missing.csv'))
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestBenchmarkVerificationLookupCommand:
+    """Test the benchmark_verification_lookup command"""
+
+    def test_reports_timings_and_rolls_back(self):
+        """Test that timings are printed per table size and nothing is kept"""
+        out = StringIO()
+        call_command('benchmark_verification_lookup', rows=1500, lookups=5, batch_size=500, stdout=out)
+
+        output = out.getvalue()
+        assert 'VERIFICATION LOOKUP BENCHMARK SUMMARY' in output
+        assert 'Historical rows: 1500' in output
+        assert EmailVerification.objects.count() == 0
+        assert not CustomUser.objects.filter(username__startswith='verification-benchmark-').exists()
+
+
+@pytest.mark.unit
+class TestBenchmarkBookingValidationCommand:
+    """Test the benchmark_booking_validation command"""
+
+    def test_reports_every_payload(self):
+        """Test that both implementations are timed and agree on every payload"""
+        out = StringIO()
+        call_command('benchmark_booking_validation', iterations=20, repeats=1, stdout=out)
+
+        output = out.getvalue()
+        assert 'BOOKING VALIDATION BENCHMARK SUMMARY' in output
+        assert 'Payloads: 4' in output
+        assert 'disagree' not in output
+        for payload in ('valid', 'invalid_fields', 'invalid_schedule', 'missing_fields'):
+            assert payload in output
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestPurgeEmailVerificationsCommand:
+    """Test the purge_email_verifications command"""
+
+    @pytest.fixture
+    def verifications(self, patient_user):
+        def make(**kwargs):
+            return EmailVerification.objects.create(
+                user=patient_user, verification_type='registration', email=patient_user.email, **kwargs
+            )
+        return {
+            'used': [make(is_used=True, used_at=timezone.now()) for _ in range(3)],
+            'expired': [make(expires_at=timezone.now() - timedelta(hours=2)) for _ in range(2)],
+            'open': make(),
+        }
+
+    def test_dry_run_changes_nothing(self, verifications):
+        """Test that dry run reports the stale rows and keeps them"""
+        out = StringIO()
+        call_command('purge_email_verifications', dry_run=True, stdout=out)
+
+        output = out.getvalue()
+        assert 'Would purge: 5' in output
+        assert 'Used: 3' in output
+        assert 'Expired unused: 2' in output
+        assert EmailVerification.objects.count() == 6
+        assert EmailVerificationArchive.objects.count() == 0
+
+    def test_archives_in_batches(self, verifications):
+        """Test that stale rows are archived batch by batch and open rows are kept"""
+        out = StringIO()
+        call_command('purge_email_verifications', batch_size=2, stdout=out)
+
+        output = out.getvalue()
+        assert 'Batch 3: archived 1' in output
+        assert 'Archived: 5' in output
+        assert list(EmailVerification.objects.all()) == [verifications['open']]
+        assert EmailVerificationArchive.objects.count() == 5
+
+    def test_delete_mode_and_max_batches(self, verifications):
+        """Test that --delete skips the archive and --max-batches bounds the run"""
+        out = StringIO()
+        call_command('purge_email_verifications', batch_size=2, max_batches=1, delete=True, stdout=out)
+
+        assert 'Deleted: 2' in out.getvalue()
+        assert EmailVerification.objects.count() == 4
+        assert EmailVerificationArchive.objects.count() == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestFixEmailVerificationsCommand:
+    """Test the fix_email_verifications command"""
+
+    def test_nothing_to_fix(self, patient_user):
+        """Test that verifications with an expiry are left alone"""
+        verification = EmailVerification.objects.create(
+            user=patient_user, verification_type='registration', email=patient_user.email
+        )
+        out = StringIO()
+        call_command('fix_email_verifications', stdout=out)
+
+        assert 'No records with null expires_at found' in out.getvalue()
+        verification.refresh_from_db()
+        assert verification.expires_at is not None
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestVerifyAllUsersCommand:
+    """Test the verify_all_users command"""
+
+    def test_verifies_in_batches(self, multiple_patients, django_assert_max_num_queries):
+        """Test that users are verified with a few UPDATE statements, not one save() each"""
+        CustomUser.objects.update(is_email_verified=False, is_active=False)
+        out = StringIO()
+        # exists(), then per batch of 2: SELECT ids + UPDATE, plus the final empty SELECT
+        with django_assert_max_num_queries(2 + 2 * ((len(multiple_patients) + 1) // 2)):
+            call_command('verify_all_users', batch_size=2, stdout=out)
+
+        assert f'Successfully verified {len(multiple_patients)} users!' in out.getvalue()
+        assert not CustomUser.objects.filter(Q(is_email_verified=False) | Q(is_active=False)).exists()
+
+    def test_nothing_to_verify(self, patient_user):
+        """Test the message when every user is verified"""
+        CustomUser.objects.update(is_email_verified=True)
+        out = StringIO()
+        call_command('verify_all_users', stdout=out)
+
+        assert 'All users are already verified!' in out.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestRebuildSearchIndexCommand:
+    """Test the rebuild_search_index command"""
+
+    def test_rebuild_after_bulk_update(self, patient_user, patient_appointment):
+        """Test that documents missed by queryset updates are rebuilt"""
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+
+        assert 'SEARCH INDEX SUMMARY' in out.getvalue()
+        assert 'User documents: 1' in out.getvalue()
+        assert 'Appointment documents: 1' in out.getvalue()
+        assert SearchDocument.objects.filter(kind='appointment', object_id=patient_appointment.pk).exists()
+
+    def test_rebuild_restores_patient_lookups(self, patient_user):
+        """Test that the fuzzy patient lookup keys are rebuilt too"""
+        PatientLookup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        assert 'Patient lookup keys: 1' in out.getvalue()
+        assert PatientLookup.objects.filter(user=patient_user).exists()
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestLoadTest:
+    """Test the load-test harness behind the loadtest command"""
+
+    def result(self, p95_ms, queries_p95):
+        return {'endpoints': {'guest_lookup': {'p95_ms': p95_ms, 'queries_p95': queries_p95}}}
+
+    def test_run_reports_each_endpoint(self):
+        """Test that a small inline run hits the real endpoints without errors"""
+        from clinic import loadtest
+
+        context = loadtest.seed(users=2, appointments=3, plans=1, testimonials=2, guests=2)
+        report = loadtest.run(context, endpoints=('guest_lookup', 'testimonials', 'booking'), requests=4)
+
+        assert set(report['endpoints']) == {'guest_lookup', 'testimonials', 'booking'}
+        for result in report['endpoints'].values():
+            assert result['requests'] == 4
+            assert result['errors'] == 0
+            assert result['p95_ms'] >= result['p50_ms'] > 0
+        assert report['endpoints']['guest_lookup']['queries_p95'] >= 1
+        assert Appointment.objects.filter(guest_email__startswith='lt-booking-').count() == 4
+
+    def test_run_endpoint_samples_failed_responses(self):
+        """Test that unexpected statuses are counted and a few of them kept with their bodies"""
+        from clinic import loadtest
+
+        context = {'guests': [('missing-guest-id', 'nobody@loadtest.invalid')]}
+        result = loadtest.run_endpoint('guest_lookup', context, requests=loadtest.ERROR_SAMPLES + 2)
+
+        assert result['errors'] == loadtest.ERROR_SAMPLES + 2
+        assert len(result['error_samples']) == loadtest.ERROR_SAMPLES
+        assert result['error_samples'][0]['status'] != 200
+        assert result['error_samples'][0]['body']
+
+    def test_compare_flags_failed_requests(self):
+        """Test that a run with failed requests is a regression even when it is faster"""
+        from clinic.loadtest import compare
+
+        current = self.result(5.0, 1)
+        current['endpoints']['guest_lookup']['errors'] = 3
+        assert compare(self.result(10.0, 1), current) == ['guest_lookup: 3 failed requests']
+
+    def test_command_refuses_to_record_a_failed_run(self, monkeypatch, tmp_path):
+        """Test that --output is not written when any request failed"""
+        from clinic.management.commands import loadtest as command
+
+        report = {'endpoints': {'login': {
+            'requests': 2, 'errors': 1, 'error_samples': [{'status': 500, 'body': 'boom'}],
+            'throughput_rps': 1, 'p50_ms': 1, 'p95_ms': 1, 'p99_ms': 1, 'queries_p50': 1, 'queries_p95': 1,
+        }}}
+        monkeypatch.setattr(command.Command, 'run_in_test_database', lambda self, endpoints, options: report)
+        out = StringIO()
+        output = tmp_path / 'baseline.json'
+
+        with pytest.raises(CommandError, match='1 requests failed'):
+            call_command('loadtest', endpoints='login', output=str(output), stdout=out)
+        assert not output.exists()
+        assert 'HTTP 500: boom' in out.getvalue()
+
+    def test_command_keeps_load_test_data_out_of_the_real_cache(self, monkeypatch):
+        """Test that seeding and load run against a private cache that is cleared afterwards"""
+        from django.core.cache import cache
+        from clinic import loadtest
+        from clinic.management.commands import loadtest as command
+
+        monkeypatch.setattr(command, 'setup_test_environment', lambda: None)
+        monkeypatch.setattr(command, 'teardown_test_environment', lambda: None)
+        monkeypatch.setattr(command.connection.creation, 'create_test_db', lambda **kwargs: 'test')
+        monkeypatch.setattr(command.connection.creation, 'destroy_test_db', lambda *args, **kwargs: None)
+        monkeypatch.setattr(loadtest, 'seed', lambda **kwargs: cache.set('user:1:profile', 'load test user'))
+
+        seen = {}
+
+        def run(context, **kwargs):
+            seen['during'] = cache.get('user:1:profile')
+            return {'endpoints': {}}
+
+        monkeypatch.setattr(loadtest, 'run', run)
+        cache.set('user:1:profile', 'real user')
+        options = {'users': 1, 'appointments': 1, 'plans': 1, 'testimonials': 1, 'guests': 1, 'requests': 1, 'concurrency': 1}
+        command.Command().run_in_test_database(('login',), options)
+
+        assert seen['during'] == 'load test user'
+        assert cache.get('user:1:profile') == 'real user'
+        cache.delete('user:1:profile')
+
+    def test_command_never_reuses_the_test_suite_database(self, monkeypatch):
+        """Test that the load test seeds a private SQLite file, not the configured test database"""
+        from clinic import loadtest
+        from clinic.management.commands import loadtest as command
+
+        test_settings = command.connection.settings_dict.setdefault('TEST', {})
+        configured = test_settings.get('NAME')
+        used = {}
+
+        def create_test_db(**kwargs):
+            used['name'] = test_settings['NAME']
+            return 'test'
+
+        monkeypatch.setattr(command, 'setup_test_environment', lambda: None)
+        monkeypatch.setattr(command, 'teardown_test_environment', lambda: None)
+        monkeypatch.setattr(command.connection.creation, 'create_test_db', create_test_db)
+        monkeypatch.setattr(command.connection.creation, 'destroy_test_db', lambda *args, **kwargs: None)
+        monkeypatch.setattr(loadtest, 'seed', lambda **kwargs: {})
+        monkeypatch.setattr(loadtest, 'run', lambda context, **kwargs: {'endpoints': {}})
+        options = {'users': 1, 'appointments': 1, 'plans': 1, 'testimonials': 1, 'guests': 1, 'requests': 1, 'concurrency': 1}
+        command.Command().run_in_test_database(('login',), options)
+
+        assert used['name'] != configured
+        assert 'clinic-loadtest-' in used['name']
+        assert test_settings.get('NAME') == configured
+
+    def test_compare_flags_latency_and_query_regressions(self):
+        """Test that compare reports p95 and query-count regressions beyond the thresholds"""
+        from clinic.loadtest import compare
+
+        baseline = self.result(10.0, 2)
+        assert compare(baseline, self.result(11.5, 2)) == []
+        assert compare(baseline, self.result(10.5, 3), query_threshold=1) == []
+
+        regressions = compare(baseline, self.result(15.0, 3))
+        assert len(regressions) == 2
+        assert 'p95 10.0ms -> 15.0ms' in regressions[0]
+        assert 'p95 queries 2 -> 3' in regressions[1]
+
+    def test_compare_ignores_small_absolute_changes(self):
+        """Test that sub-millisecond noise on fast endpoints is not a regression"""
+        from clinic.loadtest import compare
+
+        assert compare(self.result(1.0, 1), self.result(2.0, 1)) == []
+        assert compare(self.result(1.0, 1), self.result(2.0, 1), min_latency_delta_ms=0.5)
+        assert compare(self.result(1.0, 1), {'endpoints': {'login': {'p95_ms': 99, 'queries_p95': 9}}}) == []
+
+    def test_command_rejects_unknown_endpoint(self):
+        """Test that unknown scenarios fail before any database is created"""
+        with pytest.raises(CommandError, match='Unknown endpoints: checkout'):
+            call_command('loadtest', endpoints='login,checkout', stdout=StringIO())
+
+    def test_command_rejects_unreadable_baseline(self, tmp_path):
+        """Test that a missing baseline file is reported as a command error"""
+        with pytest.raises(CommandError, match='Could not read baseline'):
+            call_command('loadtest', compare=str(tmp_path / 'missing.json'), stdout=StringIO())
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestLinkGuestAppointmentsCommand:
+    """Test cases for link_guest_appointments command"""
+
+    @pytest.fixture
+    def guest_visits(self):
+        return [
+            Appointment.objects.create(
+                is_guest=True, guest_first_name='Sara', guest_last_name='Ahmed', guest_email=email,
+                date=timezone.now() + timedelta(days=n + 1),
+            )
+            for n, email in enumerate(['sara@example.com', 'sara@example.com', 'other@example.com'])
+        ]
+
+    def test_links_guest_visits_to_verified_account(self, guest_visits):
+        """Test that visits booked under a verified email are attached to that account"""
+        sara = CustomUser.objects.create_user(username='sara', email='sara@example.com', password='x', is_email_verified=True)
+        out = StringIO()
+        call_command('link_guest_appointments', batch_size=1, stdout=out)
+
+        assert 'Linked: 2' in out.getvalue()
+        assert set(sara.appointments.values_list('pk', flat=True)) == {guest_visits[0].pk, guest_visits[1].pk}
+        assert Appointment.objects.get(pk=guest_visits[0].pk).is_guest is True
+        assert SearchDocument.objects.get(kind='appointment', object_id=guest_visits[0].pk).owner_id == sara.pk
+
+    def test_unverified_accounts_and_dry_run_link_nothing(self, guest_visits):
+        """Test that unverified emails are ignored and --dry-run only counts"""
+        CustomUser.objects.create_user(username='other', email='other@example.com', password='x', is_email_verified=False)
+        CustomUser.objects.create_user(username='sara', email='sara@example.com', password='x', is_email_verified=True)
+        out = StringIO()
+        call_command('link_guest_appointments', dry_run=True, stdout=out)
+
+        assert 'Would link: 2' in out.getvalue()
+        assert not Appointment.objects.filter(user__isnull=False).exists()
+
+        call_command('link_guest_appointments', email='other@example.com', stdout=StringIO())
+        assert not Appointment.objects.filter(user__isnull=False).exists()
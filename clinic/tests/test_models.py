@@ -3,7 +3,20 @@ from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import datetime, timedelta
-from clinic.models import CustomUser, Appointment, TreatmentPlan
+from clinic.models import (
+    CustomUser, Appointment, TreatmentPlan, OutboundEmail, GuestIdSequence,
+    EmailVerification, EmailVerificationArchive, PatientLookup, SearchDocument,
+)
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.apps import apps
+from django.core.management.sql import emit_post_migrate_signal
+from clinic.bulk import update_in_batches, update_progress, verify_users
+from clinic import fuzzy, profile_cache, search, throttling
+from django.core.cache import cache
+from clinic.tests.conftest import TestimonialFactory
+import os
+import redis
 
 
 @pytest.mark.django_db
@@ -173,6 +186,33 @@ class TestAppointmentModel:
         assert appointment.user == patient_user
         assert appointment in patient_user.appointments.all()
 
+    def test_moving_the_date_clears_the_sent_reminder(self, patient_user):
+        """Test that any save moving the appointment, admin edits included, re-arms its reminder"""
+        appointment = Appointment.objects.create(
+            user=patient_user, date=timezone.now() + timedelta(days=1), reminder_sent_at=timezone.now()
+        )
+
+        appointment.note = 'Bring X-rays'
+        appointment.save()
+        appointment.refresh_from_db()
+        assert appointment.reminder_sent_at is not None
+
+        appointment.date += timedelta(days=2)
+        appointment.save(update_fields=['date'])
+        appointment.refresh_from_db()
+        assert appointment.reminder_sent_at is None
+
+    def test_guest_lookup_is_an_index_search(self):
+        """Test that the guest lookup seeks by guest ID instead of scanning appointments"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        plan = Appointment.objects.filter(
+            guest_id='GUEST-20260101-001', guest_email='sara@example.com', is_guest=True,
+        ).order_by('pk')[:1].explain()
+        # Either the unique guest_id index or the partial appointment_guest_lookup index
+        assert 'SEARCH clinic_appointment USING INDEX' in plan
+        assert 'guest_id=?' in plan
+
 
 @pytest.mark.django_db
 class TestTreatmentPlanModel:
@@ -267,6 +307,77 @@ class TestTreatmentPlanModel:
         assert plan.exercises[0]['name'] == 'Exercise 1'
         assert plan.exercises[1]['name'] == 'Exercise 2'
 
+    def test_progress_maintained_on_save(self, patient_appointment):
+        """Test that saving session counts keeps progress_percentage in step"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan',
+            total_sessions=100, completed_sessions=29
+        )
+        assert plan.progress_percentage == 29
+
+        plan.completed_sessions = 50
+        plan.save(update_fields=['completed_sessions'])
+        plan.refresh_from_db()
+        assert plan.progress_percentage == 50
+
+    def test_calculate_progress_does_not_save(self, patient_appointment, django_assert_num_queries):
+        """Test that calculate_progress is a pure calculation"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=4
+        )
+        plan.completed_sessions = 1
+        with django_assert_num_queries(0):
+            assert plan.calculate_progress() == 25
+
+    def test_record_session_single_update(self, patient_appointment, django_assert_num_queries):
+        """Test that a check-in is one UPDATE plus the refresh"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=3
+        )
+        with django_assert_num_queries(2):
+            assert plan.record_session() == 33
+        assert plan.completed_sessions == 1
+
+    def test_record_session_stale_instances_do_not_lose_updates(self, patient_appointment):
+        """Test that two copies loaded before either check-in both count"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=10
+        )
+        first = TreatmentPlan.objects.get(pk=plan.pk)
+        second = TreatmentPlan.objects.get(pk=plan.pk)
+
+        first.record_session()
+        second.record_session(2)
+
+        plan.refresh_from_db()
+        assert plan.completed_sessions == 3
+        assert plan.progress_percentage == 30
+
+    def test_record_session_stops_at_the_plan_total(self, patient_appointment):
+        """Test that check-ins past the last session do not push progress over 100"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=3, completed_sessions=2
+        )
+        assert plan.record_session(5) == 100
+        assert plan.completed_sessions == 3
+        assert plan.record_session() == 100
+        assert plan.completed_sessions == 3
+
+    def test_record_session_without_a_total_keeps_counting(self, patient_appointment):
+        """Test that an open-ended plan counts every check-in"""
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=0
+        )
+        plan.record_session(2)
+        assert plan.completed_sessions == 2
+        assert plan.progress_percentage == 0
+
+    def test_record_session_rejects_non_positive(self, patient_appointment):
+        """Test that a zero or negative count is refused"""
+        plan = TreatmentPlan.objects.create(appointment=patient_appointment, plan_details='Test plan')
+        with pytest.raises(ValueError):
+            plan.record_session(0)
+
 
 @pytest.mark.django_db
 class TestModelRelationships:
@@ -331,4 +442,577 @@ class TestModelRelationships:
         patient_appointment.delete()
 
         # Check that treatment plan is deleted
-        assert TreatmentPlan.objects.count() == 0 
\ No newline at end of file
+        assert TreatmentPlan.objects.count() == 0 
+
+
+@pytest.mark.django_db
+class TestOutboundEmailModel:
+    """Test cases for the OutboundEmail queue"""
+
+    def test_enqueue_does_not_send(self, mailoutbox):
+        """Test that queueing stores the message without contacting SMTP"""
+        message = OutboundEmail.enqueue(
+            subject='Hello',
+            to_email='guest@example.com',
+            body_text='Plain body',
+            body_html='<p>Plain body</p>'
+        )
+        assert message.status == 'queued'
+        assert message.attempts == 0
+        assert len(mailoutbox) == 0
+
+    def test_send_batch_delivers_due_messages(self, mailoutbox):
+        """Test that a batch is delivered and marked as sent"""
+        for i in range(3):
+            OutboundEmail.enqueue(subject=f'Message {i}', to_email=f'user{i}@example.com', body_text='Body')
+
+        results = OutboundEmail.send_batch(batch_size=10)
+
+        assert results == {'sent': 3, 'failed': 0, 'dead': 0}
+        assert len(mailoutbox) == 3
+        assert OutboundEmail.objects.filter(status='sent', sent_at__isnull=False).count() == 3
+
+    def test_send_batch_skips_messages_not_yet_due(self, mailoutbox):
+        """Test that messages waiting for a retry are not sent early"""
+        message = OutboundEmail.enqueue(subject='Later', to_email='later@example.com', body_text='Body')
+        message.next_attempt_at = timezone.now() + timedelta(minutes=5)
+        message.save()
+
+        results = OutboundEmail.send_batch()
+
+        assert results == {'sent': 0, 'failed': 0, 'dead': 0}
+        assert len(mailoutbox) == 0
+
+    def test_failed_delivery_backs_off_then_dead_letters(self, settings, monkeypatch):
+        """Test retry scheduling and dead-lettering after max attempts"""
+        settings.EMAIL_QUEUE_RETRY_BACKOFF_SECONDS = 60
+        message = OutboundEmail.enqueue(subject='Flaky', to_email='flaky@example.com', body_text='Body')
+        message.max_attempts = 2
+        message.save()
+
+        def broken_send(self, fail_silently=False):
+            raise ConnectionError('SMTP unavailable')
+        monkeypatch.setattr('django.core.mail.EmailMultiAlternatives.send', broken_send)
+
+        assert OutboundEmail.send_batch() == {'sent': 0, 'failed': 1, 'dead': 0}
+        message.refresh_from_db()
+        assert message.status == 'failed'
+        assert message.attempts == 1
+        assert 'SMTP unavailable' in message.last_error
+        assert message.next_attempt_at > timezone.now() + timedelta(seconds=50)
+
+        message.next_attempt_at = timezone.now()
+        message.save()
+        assert OutboundEmail.send_batch() == {'sent': 0, 'failed': 0, 'dead': 1}
+        message.refresh_from_db()
+        assert message.status == 'dead'
+        assert message.attempts == 2
+
+    def test_stale_sending_messages_are_reclaimed(self, mailoutbox):
+        """Test that messages locked by a crashed worker are picked up again"""
+        message = OutboundEmail.enqueue(subject='Stuck', to_email='stuck@example.com', body_text='Body')
+        OutboundEmail.objects.filter(id=message.id).update(
+            status='sending', locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        assert OutboundEmail.send_batch()['sent'] == 1
+        assert len(mailoutbox) == 1
+
+
+@pytest.mark.django_db
+class TestEmailVerificationModel:
+    """Test cases for verification lookup and archival"""
+
+    def make_verification(self, user, code='123456', **kwargs):
+        return EmailVerification.objects.create(
+            user=user, verification_type='registration', email=user.email,
+            verification_code=code, **kwargs
+        )
+
+    def test_find_open_scopes_code_to_email(self, patient_user, therapist_user):
+        """Test that two users holding the same code each get their own verification"""
+        mine = self.make_verification(patient_user)
+        theirs = self.make_verification(therapist_user)
+
+        assert EmailVerification.find_open('registration', email=patient_user.email, verification_code='123456') == mine
+        assert EmailVerification.find_open('registration', email=therapist_user.email, verification_code='123456') == theirs
+        assert EmailVerification.find_open('registration', verification_code='123456') is None
+
+    def test_find_open_ignores_used_and_other_types(self, patient_user):
+        """Test that used codes and codes of another type are not matched"""
+        self.make_verification(patient_user, is_used=True)
+        EmailVerification.objects.create(
+            user=patient_user, verification_type='password_reset',
+            email=patient_user.email, verification_code='123456'
+        )
+
+        assert EmailVerification.find_open('registration', email=patient_user.email, verification_code='123456') is None
+
+    def test_find_open_by_token(self, patient_user):
+        """Test lookup by token without an email"""
+        verification = self.make_verification(patient_user)
+        assert EmailVerification.find_open('registration', token=verification.token) == verification
+
+    def test_code_lookup_uses_partial_index(self, patient_user):
+        """Test that the scoped code lookup is an index search, not a table scan"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        plan = EmailVerification.objects.filter(
+            verification_type='registration', is_used=False,
+            verification_code='123456', email=patient_user.email,
+        ).explain()
+        assert 'emailverif_open_code_idx' in plan
+
+    def test_purge_stale_moves_used_and_expired(self, patient_user):
+        """Test that used and expired rows move to the archive and open rows stay"""
+        used = self.make_verification(patient_user, is_used=True, used_at=timezone.now())
+        expired = self.make_verification(patient_user, expires_at=timezone.now() - timedelta(hours=1))
+        open_verification = self.make_verification(patient_user)
+
+        assert EmailVerification.purge_stale(batch_size=1) == 2
+
+        assert list(EmailVerification.objects.all()) == [open_verification]
+        archived = EmailVerificationArchive.objects.order_by('verification_id')
+        assert [row.verification_id for row in archived] == [used.id, expired.id]
+        assert archived[0].is_used is True
+        assert archived[1].expires_at == expired.expires_at
+
+    def test_purge_stale_respects_limit(self, patient_user):
+        """Test that a limit caps how many rows are archived in one run"""
+        for _ in range(3):
+            self.make_verification(patient_user, is_used=True)
+
+        assert EmailVerification.purge_stale(batch_size=2, limit=2) == 2
+        assert EmailVerification.objects.count() == 1
+
+    def test_purge_stale_without_archive(self, patient_user):
+        """Test that rows are deleted outright when archiving is off"""
+        self.make_verification(patient_user, is_used=True)
+
+        assert EmailVerification.purge_stale(archive=False) == 1
+        assert EmailVerification.objects.count() == 0
+        assert EmailVerificationArchive.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestGuestIdAllocation:
+    """Test cases for per-day guest ID allocation"""
+
+    def _guest_appointment(self, **kwargs):
+        return Appointment.objects.create(
+            is_guest=True,
+            guest_first_name='Guest',
+            guest_last_name='User',
+            guest_email='guest@example.com',
+            date=timezone.now() + timedelta(days=1),
+            **kwargs
+        )
+
+    def test_guest_ids_are_sequential_per_day(self):
+        """Test that guest IDs count up from 001 for the current day"""
+        today = timezone.localdate()
+        first = self._guest_appointment()
+        second = self._guest_appointment()
+
+        assert first.guest_id == f'GUEST-{today:%Y%m%d}-001'
+        assert second.guest_id == f'GUEST-{today:%Y%m%d}-002'
+        assert GuestIdSequence.objects.get(day=today).last_value == 2
+
+    def test_allocation_does_not_count_appointments(self, django_assert_max_num_queries):
+        """Test that allocation cost is independent of the day's booking volume"""
+        GuestIdSequence.objects.create(day=timezone.localdate(), last_value=5000)
+        with django_assert_max_num_queries(4):
+            number = GuestIdSequence.allocate()
+        assert number == 5001
+
+    def test_block_allocation(self):
+        """Test reserving a block of consecutive numbers"""
+        day = timezone.localdate()
+        assert GuestIdSequence.allocate(count=10, day=day) == 1
+        assert GuestIdSequence.allocate(count=5, day=day) == 11
+        assert GuestIdSequence.allocate(day=day) == 16
+
+    def test_deleted_guest_ids_are_not_reused(self):
+        """Test that deleting an appointment does not hand its ID out again"""
+        first = self._guest_appointment()
+        second = self._guest_appointment()
+        first.delete()
+
+        third = self._guest_appointment()
+        assert third.guest_id not in (first.guest_id, second.guest_id)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGuestIdAllocationConcurrency:
+    """Stress test for guest ID allocation under parallel bookings"""
+
+    def test_parallel_allocations_never_collide(self):
+        """Test that concurrent workers never receive the same number"""
+        # Shared-cache in-memory SQLite raises table locks instead of waiting; fail rather than skip
+        assert not (connection.vendor == 'sqlite' and connection.is_in_memory_db()), \
+            "needs a file-backed test database (DATABASES['default']['TEST']['NAME'])"
+
+        workers = 8
+        per_worker = 25
+
+        def allocate_many():
+            try:
+                return [GuestIdSequence.allocate() for _ in range(per_worker)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(lambda _: allocate_many(), range(workers)))
+
+        numbers = [number for batch in batches for number in batch]
+        assert len(numbers) == workers * per_worker
+        assert sorted(numbers) == list(range(1, workers * per_worker + 1))
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRecordSessionConcurrency:
+    """Stress test for concurrent session check-ins"""
+
+    def test_parallel_check_ins_are_all_counted(self, patient_appointment):
+        """Test that simultaneous check-ins never overwrite each other"""
+        assert not (connection.vendor == 'sqlite' and connection.is_in_memory_db()), \
+            "needs a file-backed test database (DATABASES['default']['TEST']['NAME'])"
+
+        plan = TreatmentPlan.objects.create(
+            appointment=patient_appointment, plan_details='Test plan', total_sessions=200
+        )
+        workers = 8
+        per_worker = 10
+
+        def check_in():
+            try:
+                copy = TreatmentPlan.objects.get(pk=plan.pk)
+                for _ in range(per_worker):
+                    copy.record_session()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda _: check_in(), range(workers)))
+
+        plan.refresh_from_db()
+        assert plan.completed_sessions == workers * per_worker
+        assert plan.progress_percentage == 40
+
+
+@pytest.mark.django_db
+class TestBulkOperations:
+    """Test cases for the set-based helpers in clinic.bulk"""
+
+    def make_plans(self, appointment, sessions):
+        return [
+            TreatmentPlan.objects.create(
+                appointment=appointment, plan_details='Plan',
+                total_sessions=total, completed_sessions=completed
+            )
+            for total, completed in sessions
+        ]
+
+    def test_update_progress_matches_calculate_progress(self, patient_appointment):
+        """Test that the SQL expression truncates like the Python calculation"""
+        plans = self.make_plans(patient_appointment, [(10, 3), (3, 1), (7, 7), (6, 0)])
+        TreatmentPlan.objects.update(progress_percentage=99)
+
+        assert update_progress(TreatmentPlan.objects.all(), batch_size=3) == 4
+
+        for plan in plans:
+            expected = plan.calculate_progress()
+            plan.refresh_from_db()
+            assert plan.progress_percentage == expected
+
+    def test_update_progress_is_set_based(self, patient_appointment, django_assert_max_num_queries):
+        """Test that the statement count depends on batches, not rows"""
+        self.make_plans(patient_appointment, [(10, n) for n in range(10)])
+        TreatmentPlan.objects.update(progress_percentage=0)
+
+        # One SELECT of ids and one UPDATE per batch, plus the final empty SELECT
+        with django_assert_max_num_queries(5):
+            update_progress(TreatmentPlan.objects.all(), batch_size=5)
+        assert sorted(TreatmentPlan.objects.values_list('progress_percentage', flat=True)) == list(range(0, 100, 10))
+
+    def test_update_in_batches_only_touches_queryset(self, multiple_patients, patient_user):
+        """Test that rows outside the filtered queryset are left alone"""
+        CustomUser.objects.update(is_email_verified=False)
+        updated = update_in_batches(
+            CustomUser.objects.exclude(pk=patient_user.pk), batch_size=2, is_email_verified=True
+        )
+
+        assert updated == len(multiple_patients)
+        patient_user.refresh_from_db()
+        assert patient_user.is_email_verified is False
+
+    def test_verify_users_invalidates_cached_users(self, patient_user):
+        """Test that a queryset update still drops cached session users"""
+        CustomUser.objects.filter(pk=patient_user.pk).update(is_email_verified=False)
+        assert profile_cache.get_cached_user(patient_user.pk).is_email_verified is False
+
+        verify_users(CustomUser.objects.filter(pk=patient_user.pk))
+
+        assert profile_cache.get_cached_user(patient_user.pk).is_email_verified is True
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestSearchIndex:
+    """Test cases for the search documents and backends in clinic.search"""
+
+    def test_saves_keep_documents_in_sync(self, patient_user, therapist_user):
+        """Test that saving and deleting users and appointments updates their documents"""
+        appointment = Appointment.objects.create(
+            user=patient_user, therapist=therapist_user, date=timezone.now() + timedelta(days=1), note='Shoulder stiffness'
+        )
+        document = SearchDocument.objects.get(kind='appointment', object_id=appointment.pk)
+        assert 'Shoulder stiffness' in document.body
+        assert document.owner_id == patient_user.pk
+
+        therapist_user.first_name = 'Yousef'
+        therapist_user.save()
+        assert 'Yousef' in SearchDocument.objects.get(kind='appointment', object_id=appointment.pk).body
+        assert list(search.matching_ids('user', 'yousef').values_list('object_id', flat=True)) == [therapist_user.pk]
+
+        appointment_id = appointment.pk
+        appointment.delete()
+        assert not SearchDocument.objects.filter(kind='appointment', object_id=appointment_id).exists()
+
+    def test_login_saves_skip_reindexing(self, patient_user, django_assert_num_queries):
+        """Test that saves touching no indexed field do not write the document"""
+        patient_user.last_login = timezone.now()
+        with django_assert_num_queries(1):
+            patient_user.save(update_fields=['last_login'])
+
+    def test_first_migrate_indexes_existing_rows(self, patient_user, patient_appointment):
+        """Test that migrating over rows written before the search tables existed indexes them"""
+        SearchDocument.objects.all().delete()
+        PatientLookup.objects.all().delete()
+
+        # What `migrate` sends once the last migration is applied
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default', apps=apps)
+
+        assert SearchDocument.objects.filter(kind='appointment', object_id=patient_appointment.pk).exists()
+        assert SearchDocument.objects.filter(kind='user', object_id=patient_user.pk).exists()
+        assert PatientLookup.objects.filter(user=patient_user).exists()
+
+    def test_anonymous_testimonial_hides_author(self):
+        """Test that anonymous testimonials cannot be found by the author's name"""
+        testimonial = TestimonialFactory(full_name='Layla Hassan', testimonial_text='Great rehabilitation', anonymous=True)
+        document = SearchDocument.objects.get(kind='testimonial', object_id=testimonial.pk)
+
+        assert 'Layla' not in document.title + document.body
+        assert document.is_public is True
+        assert not search.matching_ids('testimonial', 'layla').exists()
+        assert search.matching_ids('testimonial', 'rehab').exists()
+
+    def test_terms_are_prefixes_and_all_required(self, patient_user):
+        """Test that every word must match, each as a prefix, across scripts"""
+        patient_user.first_name = 'محمد'
+        patient_user.last_name = 'Haddad'
+        patient_user.save()
+
+        assert search.matching_ids('user', 'hadd').exists()
+        assert search.matching_ids('user', 'محمد hadd').exists()
+        assert not search.matching_ids('user', 'hadd nobody').exists()
+        assert not search.matching_ids('user', '"*:&').exists()
+
+    def test_rebuild_repairs_bulk_writes(self, patient_user, multiple_patients):
+        """Test that rebuild re-indexes rows changed by queryset updates and drops orphans"""
+        CustomUser.objects.filter(pk=patient_user.pk).update(last_name='Qasim')
+        SearchDocument.objects.create(kind='user', object_id=999999, title='Ghost')
+        assert not search.matching_ids('user', 'qasim').exists()
+
+        counts = search.rebuild(batch_size=2)
+
+        assert counts['user'] == len(multiple_patients) + 1
+        assert search.matching_ids('user', 'qasim').exists()
+        assert not SearchDocument.objects.filter(object_id=999999).exists()
+
+    def test_basic_backend_matches_fts(self, patient_user, settings):
+        """Test that the LIKE fallback finds the same documents as the index"""
+        indexed = set(search.matching_ids('user', patient_user.username[:4]).values_list('object_id', flat=True))
+        settings.SEARCH_BACKEND = 'basic'
+        assert isinstance(search.get_backend(), search.BasicBackend)
+        assert set(search.matching_ids('user', patient_user.username[:4]).values_list('object_id', flat=True)) == indexed
+
+    def test_fts_lookup_uses_virtual_table_index(self):
+        """Test that SQLite searches go through the FTS5 index, not a scan of the documents"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        assert isinstance(search.get_backend(), search.SQLiteFTSBackend)
+        plan = search.matching_ids('testimonial', 'knee').explain()
+        assert 'SCAN clinic_searchdocument_fts VIRTUAL TABLE INDEX' in plan
+        # Documents are fetched by rowid from the matches, never walked by kind
+        assert '(kind=?)' not in plan
+        assert 'USING INTEGER PRIMARY KEY (rowid=?)' in plan
+
+
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestPatientLookup:
+    """Test cases for the fuzzy patient lookup in clinic.fuzzy"""
+
+    @pytest.fixture
+    def patients(self):
+        def patient(username, first_name, last_name, phone_number=None):
+            return CustomUser.objects.create_user(
+                username=username, email=f'{username}@example.com', password='x',
+                first_name=first_name, last_name=last_name, phone_number=phone_number, role='patient',
+            )
+        return {
+            'mohammed': patient('mharbi', 'Mohammed', 'Al-Harbi', '+966 555 123 456'),
+            'arabic': patient('m.h', 'مُحَمَّد', 'الحربي'),
+            'fatima': patient('fzahra', 'Fatima', 'Zahra', '0501112233'),
+            'ali': patient('ali1', 'Ali', 'Saleh'),
+            'alina': patient('alina1', 'Alina', 'Petrova'),
+        }
+
+    def found(self, query):
+        return [user.username for user, _ in fuzzy.lookup(query)]
+
+    def test_skeletons_meet_across_scripts(self):
+        """Test that Arabic and English spellings of a name share a skeleton"""
+        for english, arabic in [('Mohammed', 'محمد'), ('Mohamed', 'مُحَمَّد'), ('Youssef', 'يوسف'),
+                                ('Fatima', 'فاطمة'), ('Omar', 'عمر'), ('Khaled', 'خالد'), ('Hassan', 'حسن')]:
+            assert fuzzy.skeleton(fuzzy.words(english)[0]) == fuzzy.skeleton(fuzzy.words(arabic)[0])
+        assert fuzzy.words('٠٥٥٥ ١٢٣') == ['555', '123']
+
+    def test_saves_keep_lookup_in_sync(self, patient_user, therapist_user, django_assert_num_queries):
+        """Test that patients are keyed on save, and non-patients and login saves are not"""
+        assert PatientLookup.objects.filter(user=patient_user).exists()
+        assert not PatientLookup.objects.filter(user=therapist_user).exists()
+
+        patient_user.last_login = timezone.now()
+        with django_assert_num_queries(1):
+            patient_user.save(update_fields=['last_login'])
+
+        patient_user.first_name = 'Zainab'
+        patient_user.save()
+        assert ' zainab ' in PatientLookup.objects.get(user=patient_user).key
+
+        patient_user.role = 'therapist'
+        patient_user.save()
+        assert not PatientLookup.objects.filter(user=patient_user).exists()
+
+    def test_typos_and_transliterations(self, patients, therapist_user):
+        """Test that misspelt, prefix and other-script queries find the patient"""
+        assert set(self.found('mohamed harbi')[:2]) == {'mharbi', 'm.h'}
+        assert set(self.found('محمد الحربي')[:2]) == {'mharbi', 'm.h'}
+        assert self.found('fatma')[0] == 'fzahra'
+        assert self.found('zahr')[0] == 'fzahra'
+        assert self.found('mohamnd')[0] in ('mharbi', 'm.h')
+        assert self.found('ali')[:2] == ['ali1', 'alina1']
+        assert self.found('xqzv') == []
+
+        therapist_user.first_name = 'Fatima'
+        therapist_user.save()
+        assert therapist_user.username not in self.found('fatima')
+
+    def test_phone_and_email(self, patients):
+        """Test lookups by local or international phone number and by email"""
+        assert self.found('0555123456')[0] == 'mharbi'
+        assert self.found('+966555123456')[0] == 'mharbi'
+        assert self.found('501112233')[0] == 'fzahra'
+        assert self.found('fzahra@example')[0] == 'fzahra'
+
+    def test_scores_are_ranked(self, patients):
+        """Test that results come best first and an exact name scores 1"""
+        results = fuzzy.lookup('fatima zahra')
+        scores = [score for _, score in results]
+        assert scores == sorted(scores, reverse=True)
+        assert results[0] == (patients['fatima'], 1.0)
+
+    def test_scan_backend_matches_index(self, patients, monkeypatch):
+        """Test that the in-process fallback returns the same patients as the index"""
+        queries = ['mohamed harbi', 'fatma', 'ali', '0555123456']
+        indexed = [self.found(query) for query in queries]
+        monkeypatch.setattr(fuzzy, 'get_backend', fuzzy.ScanBackend)
+        assert [self.found(query) for query in queries] == indexed
+
+    def test_rebuild_repairs_bulk_writes(self, patient_user, therapist_user):
+        """Test that rebuild re-keys rows changed by queryset updates and drops non-patients"""
+        CustomUser.objects.filter(pk=patient_user.pk).update(last_name='Qasim')
+        PatientLookup.objects.create(user=therapist_user, key=' ghost ')
+
+        assert fuzzy.rebuild(batch_size=1) == 1
+        assert ' qasim ' in PatientLookup.objects.get(user=patient_user).key
+        assert not PatientLookup.objects.filter(user=therapist_user).exists()
+
+    def test_lookup_uses_trigram_index(self):
+        """Test that SQLite lookups are answered by the FTS5 trigram index"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        backend = fuzzy.get_backend()
+        assert isinstance(backend, fuzzy.SQLiteTrigramBackend)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {backend.SQL}', [backend.expression(['mohamed'], fuzzy=True), 10])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'SCAN clinic_patientlookup_trgm VIRTUAL TABLE INDEX' in plan
+
+
+@pytest.mark.unit
+class TestSlidingWindowRateLimit:
+    """Test cases for the sliding-window counters in clinic.throttling"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def bucket(self, rate='3/minute', value='203.0.113.7'):
+        return throttling.Bucket('test', 'ip', value, rate)
+
+    def test_limit_and_retry_after(self):
+        """Test that the request over the limit is refused with the time until one fits"""
+        bucket = self.bucket()
+        assert [throttling.check([bucket], now=600 + n) for n in range(3)] == [None, None, None]
+        # Nothing slides out until the window closes, then the previous count fades by 1/20 per second
+        assert throttling.check([bucket], now=603) == 57 + 20
+
+    def test_previous_window_slides_out(self):
+        """Test that the previous window counts in proportion to its overlap"""
+        bucket = self.bucket()
+        for n in range(3):
+            throttling.check([bucket], now=650 + n)
+        assert throttling.check([bucket], now=661) == 19
+        assert throttling.check([bucket], now=680) is None
+        assert throttling.check([bucket], now=681) is not None
+
+    def test_refused_requests_are_not_counted(self):
+        """Test that a flood does not extend its own lockout"""
+        bucket = self.bucket(rate='1/minute')
+        throttling.check([bucket], now=600)
+        for n in range(100):
+            throttling.check([bucket], now=601 + n * 0.5)
+        assert throttling.check([bucket], now=720) is None
+
+    def test_all_buckets_must_allow(self):
+        """Test that one full bucket refuses the request without counting it in the others"""
+        shared, own = self.bucket(rate='1/minute', value='shared'), self.bucket(rate='5/minute', value='own')
+        throttling.check([shared], now=600)
+        assert throttling.check([own, shared], now=601) is not None
+        assert [throttling.check([own], now=602 + n) for n in range(5)] == [None] * 5
+
+    def test_lua_script_matches_cache_fallback(self):
+        """Test that the Redis script and the cache fallback agree request for request"""
+        client = redis.Redis.from_url(os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/15'))
+        try:
+            client.ping()
+        except redis.ConnectionError:
+            pytest.skip('Redis is not running')
+
+        class Backend:
+            make_key = staticmethod(lambda key: f'clinic-test:{key}')
+
+        buckets = [self.bucket(rate='3/minute'), throttling.Bucket('test', 'email', 'sara@example.com', '5/minute')]
+        timeline = [1000 + n * 7 for n in range(40)]
+        try:
+            over_redis = [throttling._check_redis(Backend, client, buckets, now) for now in timeline]
+        finally:
+            client.delete(*client.keys('clinic-test:*') or ['clinic-test:none'])
+        assert over_redis == [throttling._check_cache(buckets, now) for now in timeline]
@@ -1,10 +1,17 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import timedelta
-from clinic.models import CustomUser, Appointment, TreatmentPlan
+from clinic import idempotency
+from clinic.models import CustomUser, Appointment, TreatmentPlan, OutboundEmail, Testimonial, EmailVerification
+from clinic.tests.conftest import TestimonialFactory
 
 
 @pytest.mark.django_db
@@ -88,6 +95,118 @@ class TestCustomUserViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['username'] == patient_user.username
 
+    def test_login_fetches_user_once(self, api_client, patient_user):
+        """Test that login loads the user with a single query and returns the shared profile"""
+        url = reverse('customuser-login')
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(url, {'username': patient_user.username, 'password': 'testpass123'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        user_selects = [q for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'clinic_customuser' in q['sql']]
+        assert len(user_selects) == 1
+
+        profile = api_client.get(reverse('customuser-profile'))
+        assert response.data['user'] == profile.data['user']
+        assert len(response.data['user']) == 17
+
+    def test_login_rehashes_to_configured_work_factor(self, api_client, patient_user, settings):
+        """Test that a changed iteration count is applied on the next successful login"""
+        settings.PASSWORD_HASH_ITERATIONS = 700000
+        url = reverse('customuser-login')
+        response = api_client.post(url, {'username': patient_user.username, 'password': 'testpass123'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        patient_user.refresh_from_db()
+        assert patient_user.password.startswith('pbkdf2_sha256$700000$')
+        assert patient_user.check_password('testpass123')
+
+    def test_login_work_factor_has_a_floor(self, api_client, patient_user, settings):
+        """Test that tuning cannot lower the iteration count below the minimum"""
+        settings.PASSWORD_HASH_ITERATIONS = 1000
+        url = reverse('customuser-login')
+        api_client.post(url, {'username': patient_user.username, 'password': 'testpass123'}, format='json')
+
+        patient_user.refresh_from_db()
+        assert patient_user.password.startswith('pbkdf2_sha256$600000$')
+
+    def test_login_wrong_password(self, api_client, patient_user):
+        """Test login with a wrong password for an existing user"""
+        url = reverse('customuser-login')
+        response = api_client.post(url, {'username': patient_user.username, 'password': 'wrong-pass'}, format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert 'error' in response.data
+
+    def test_login_wrong_password_checks_the_hash_once(self, api_client, patient_user, monkeypatch):
+        """Test that a failed login is not retried by the fallback ModelBackend"""
+        checks = []
+        check_password = CustomUser.check_password
+        monkeypatch.setattr(CustomUser, 'check_password', lambda user, raw: checks.append(raw) or check_password(user, raw))
+
+        url = reverse('customuser-login')
+        response = api_client.post(url, {'username': patient_user.username, 'password': 'wrong-pass'}, format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert checks == ['wrong-pass']
+
+    def test_cached_session_user_has_no_password(self, api_client, patient_user, settings):
+        """Test that the cached session user leaves the password hash out of the cache"""
+        from clinic import profile_cache
+        settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+        api_client.force_login(patient_user)
+        url = reverse('customuser-validate-session')
+        api_client.get(url)
+
+        cached = profile_cache.get_cached_user(patient_user.pk)
+        assert 'password' in cached.get_deferred_fields()
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    def test_validate_session_include_profile_without_queries(self, api_client, patient_user, settings, django_assert_num_queries):
+        """Test that a warm dashboard boot is served entirely from the session and profile caches"""
+        settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+        api_client.force_login(patient_user)
+        url = reverse('customuser-validate-session')
+        api_client.get(url, {'include': 'profile'})
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, {'include': 'profile'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['user_id'] == patient_user.id
+        assert response.data['profile'] == api_client.get(reverse('customuser-profile')).data['user']
+
+    def test_validate_session_without_include(self, api_client, patient_user):
+        """Test that the profile is only added when asked for"""
+        api_client.force_login(patient_user)
+        response = api_client.get(reverse('customuser-validate-session'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'profile' not in response.data
+
+    def test_profile_cache_invalidated_on_save(self, api_client, patient_user):
+        """Test that saving the user drops the cached session user and profile"""
+        api_client.force_login(patient_user)
+        url = reverse('customuser-validate-session')
+        api_client.get(url, {'include': 'profile'})
+
+        patient_user.first_name = 'Renamed'
+        patient_user.save()
+        response = api_client.get(url, {'include': 'profile'})
+
+        assert response.data['first_name'] == 'Renamed'
+        assert response.data['profile']['first_name'] == 'Renamed'
+
+    def test_cached_session_user_respects_deactivation(self, api_client, patient_user):
+        """Test that a deactivated user is logged out even though their row was cached"""
+        api_client.force_login(patient_user)
+        url = reverse('customuser-validate-session')
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        patient_user.is_active = False
+        patient_user.save()
+
+        assert api_client.get(url).status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
     def test_login_invalid_credentials(self, api_client):
         """Test login with invalid credentials"""
         url = reverse('customuser-login')
@@ -142,6 +261,60 @@ class TestCustomUserViewSet:
         for user_data in response.data['results']:
             assert user_data['role'] == 'patient'
 
+    def test_verify_email_with_colliding_code(self, api_client, patient_user, therapist_user):
+        """Test that a code shared by two users only verifies the one whose email is given"""
+        for user in (patient_user, therapist_user):
+            EmailVerification.objects.create(
+                user=user, verification_type='registration', email=user.email, verification_code='424242'
+            )
+        url = reverse('customuser-verify-email')
+        response = api_client.post(url, {'verification_code': '424242', 'email': therapist_user.email}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['user_id'] == therapist_user.id
+        assert EmailVerification.objects.filter(user=patient_user, is_used=False).exists()
+
+    def test_verify_email_requires_email_or_token(self, api_client, patient_user):
+        """Test that a bare code is rejected instead of matched against every user"""
+        EmailVerification.objects.create(
+            user=patient_user, verification_type='registration', email=patient_user.email, verification_code='424242'
+        )
+        url = reverse('customuser-verify-email')
+        response = api_client.post(url, {'verification_code': '424242'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'email' in response.data
+
+    def test_verify_email_wrong_email(self, api_client, patient_user):
+        """Test that a valid code sent with another email is not found"""
+        EmailVerification.objects.create(
+            user=patient_user, verification_type='registration', email=patient_user.email, verification_code='424242'
+        )
+        url = reverse('customuser-verify-email')
+        response = api_client.post(url, {'verification_code': '424242', 'email': 'someone@example.com'}, format='json')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_reset_password_scoped_by_email(self, api_client, patient_user, therapist_user):
+        """Test that a password reset code is matched together with its email"""
+        for user in (patient_user, therapist_user):
+            EmailVerification.objects.create(
+                user=user, verification_type='password_reset', email=user.email, verification_code='515151'
+            )
+        url = reverse('customuser-reset-password')
+        response = api_client.post(url, {
+            'verification_code': '515151',
+            'email': patient_user.email,
+            'new_password': 'N3w-secure-pass!',
+            'confirm_password': 'N3w-secure-pass!',
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        patient_user.refresh_from_db()
+        therapist_user.refresh_from_db()
+        assert patient_user.check_password('N3w-secure-pass!')
+        assert not therapist_user.check_password('N3w-secure-pass!')
+
 
 @pytest.mark.django_db
 @pytest.mark.api
@@ -268,6 +441,55 @@ class TestAppointmentViewSet:
         assert len(response.data['results']) == 1
 
 
+    def test_list_appointments_compact_representation(self, authenticated_patient_client, patient_appointment, therapist_user):
+        """Test that list rows carry flat patient and therapist references"""
+        patient_appointment.therapist = therapist_user
+        patient_appointment.save()
+
+        url = reverse('appointment-list')
+        response = authenticated_patient_client.get(url)
+        row = response.data['results'][0]
+
+        assert 'user' not in row
+        assert 'therapist' not in row
+        assert row['patient_id'] == patient_appointment.user_id
+        assert row['patient_name'] == patient_appointment.user.get_full_name()
+        assert row['therapist_id'] == therapist_user.id
+        assert row['therapist_name'] == therapist_user.get_full_name()
+
+    def test_list_appointments_query_count_is_constant(self, authenticated_patient_client, multiple_patients,
+                                                        therapist_user, django_assert_max_num_queries):
+        """Test that a page of appointments does not issue per-row user queries"""
+        for patient in multiple_patients:
+            for day in range(4):
+                Appointment.objects.create(
+                    user=patient,
+                    therapist=therapist_user,
+                    date=timezone.now() + timedelta(days=day + 1)
+                )
+
+        url = reverse('appointment-list')
+        with django_assert_max_num_queries(3):
+            response = authenticated_patient_client.get(url, {'expand': 'user,therapist'})
+        assert len(response.data['results']) == 20
+        assert response.data['results'][0]['user']['id'] is not None
+        assert response.data['results'][0]['therapist']['id'] == therapist_user.id
+
+    def test_list_appointments_fields_selector(self, authenticated_patient_client, patient_appointment):
+        """Test trimming list rows with ?fields="""
+        url = reverse('appointment-list')
+        response = authenticated_patient_client.get(url, {'fields': 'id,date,status'})
+
+        assert set(response.data['results'][0]) == {'id', 'date', 'status'}
+
+    def test_retrieve_appointment_keeps_nested_users(self, authenticated_patient_client, patient_appointment):
+        """Test that detail views still return the full nested profile"""
+        url = reverse('appointment-detail', kwargs={'pk': patient_appointment.pk})
+        response = authenticated_patient_client.get(url)
+
+        assert response.data['user']['username'] == patient_appointment.user.username
+
+
 @pytest.mark.django_db
 @pytest.mark.api
 class TestTreatmentPlanViewSet:
@@ -361,6 +583,30 @@ class TestTreatmentPlanViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data['results']) == 1
 
+    def test_record_session_therapist(self, authenticated_therapist_client, treatment_plan):
+        """Test that a therapist check-in increments sessions and progress together"""
+        TreatmentPlan.objects.filter(pk=treatment_plan.pk).update(total_sessions=8, completed_sessions=1, progress_percentage=12)
+        url = reverse('treatmentplan-record-session', kwargs={'pk': treatment_plan.pk})
+        response = authenticated_therapist_client.post(url, {'count': 2}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['treatment_plan']['completed_sessions'] == 3
+        assert response.data['treatment_plan']['progress_percentage'] == 37
+
+    def test_record_session_patient_forbidden(self, authenticated_patient_client, treatment_plan):
+        """Test that patients cannot check in their own sessions"""
+        url = reverse('treatmentplan-record-session', kwargs={'pk': treatment_plan.pk})
+        response = authenticated_patient_client.post(url, {}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_record_session_invalid_count(self, authenticated_therapist_client, treatment_plan):
+        """Test that a non-positive count is rejected"""
+        url = reverse('treatmentplan-record-session', kwargs={'pk': treatment_plan.pk})
+        response = authenticated_therapist_client.post(url, {'count': 0}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 @pytest.mark.django_db
 @pytest.mark.api
@@ -423,7 +669,7 @@ class TestAPIPagination:
         response = authenticated_patient_client.get(url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert 'count' in response.data
+        assert 'count' not in response.data  # Cursor pagination never counts the table
         assert 'next' in response.data
         assert 'previous' in response.data
         assert 'results' in response.data
@@ -435,7 +681,6 @@ class TestAPIPagination:
         response = authenticated_patient_client.get(url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert 'count' in response.data
         assert 'next' in response.data
         assert 'previous' in response.data
         assert 'results' in response.data
@@ -453,10 +698,73 @@ class TestAPIPagination:
         response = authenticated_patient_client.get(url)
         
         assert response.status_code == status.HTTP_200_OK
-        assert 'count' in response.data
-        assert response.data['count'] == 25
         assert len(response.data['results']) == 20  # Page size
         assert response.data['next'] is not None  # Should have next page
+        assert response.data['previous'] is None
+
+        response = authenticated_patient_client.get(response.data['next'])
+        assert len(response.data['results']) == 5
+        assert response.data['next'] is None
+        assert response.data['previous'] is not None
+
+    def test_cursor_walks_every_appointment_once(self, api_client, patient_user):
+        """Test that following next links visits each appointment exactly once, even with equal dates"""
+        same_date = timezone.now() + timedelta(days=3)
+        created = [
+            Appointment.objects.create(user=patient_user, date=same_date if i % 2 else same_date + timedelta(hours=i), service_type='assessment')
+            for i in range(45)
+        ]
+
+        url = reverse('appointment-list')
+        seen = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        assert sorted(seen) == sorted(apt.id for apt in created)
+        assert len(seen) == len(set(seen))
+
+    def test_cursor_previous_link_returns_prior_page(self, api_client, patient_user):
+        """Test that the previous link of the second page returns the first page"""
+        for i in range(25):
+            Appointment.objects.create(user=patient_user, date=timezone.now() + timedelta(days=i), service_type='assessment')
+
+        first = api_client.get(reverse('appointment-list'))
+        second = api_client.get(first.data['next'])
+        back = api_client.get(second.data['previous'])
+
+        assert [row['id'] for row in back.data['results']] == [row['id'] for row in first.data['results']]
+
+    def test_cursor_page_cost_is_constant(self, api_client, patient_user, django_assert_max_num_queries):
+        """Test that a deep page is fetched with a single query and no COUNT"""
+        for i in range(45):
+            Appointment.objects.create(user=patient_user, date=timezone.now() + timedelta(days=i), service_type='assessment')
+
+        first = api_client.get(reverse('appointment-list'))
+        second = api_client.get(first.data['next'])
+        with django_assert_max_num_queries(1) as captured:
+            api_client.get(second.data['next'])
+        assert not any('COUNT(' in query['sql'].upper() for query in captured.captured_queries)
+
+    def test_count_action_totals_the_filtered_list(self, api_client, patient_user, therapist_user):
+        """Test that list filters apply to the count, which needs no paging"""
+        for i in range(25):
+            Appointment.objects.create(user=patient_user, date=timezone.now() + timedelta(days=i), status='completed' if i % 5 else 'cancelled')
+        Appointment.objects.create(user=therapist_user, date=timezone.now(), service_type='assessment')
+
+        response = api_client.get(reverse('appointment-count'), {'user': patient_user.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'count': 25, 'by_status': {'completed': 20, 'cancelled': 5}}
+        assert api_client.get(reverse('appointment-count'), {'service_type': 'assessment'}).data['count'] == 1
+
+    def test_invalid_cursor(self, api_client):
+        """Test that a tampered cursor is rejected"""
+        response = api_client.get(reverse('appointment-list'), {'cursor': 'cD1nYXJiYWdl'})  # p=garbage
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
 @pytest.mark.django_db
@@ -492,4 +800,964 @@ class TestAPICaching:
         assert response2.status_code == status.HTTP_200_OK
         
         # Both responses should be identical
-        assert response1.data == response2.data 
\ No newline at end of file
+        assert response1.data == response2.data 
+
+
+@pytest.fixture
+def booking_data():
+    """Valid public booking payload"""
+    appointment_day = (timezone.localdate() + timedelta(days=3)).isoformat()
+    return {
+        'firstname': 'Sara',
+        'lastname': 'Ahmed',
+        'email': 'sara@example.com',
+        'phone': '+966 555 123 456',
+        'age': 34,
+        'gender': 'female',
+        'service_type': 'Manual Therapy',
+        'appointment_date': appointment_day,
+        'appointment_time': '10:30',
+        'symptoms': 'Lower back pain',
+        'is_guest': True,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestPublicAppointmentBooking:
+    """Test cases for the public booking endpoint"""
+
+    def test_guest_booking_queues_confirmation(self, api_client, booking_data, mailoutbox):
+        """Test that booking queues the confirmation instead of sending it inline"""
+        url = reverse('public_appointment_booking')
+        response = api_client.post(url, booking_data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['guest_id'].startswith('GUEST-')
+        assert len(mailoutbox) == 0
+
+        queued = OutboundEmail.objects.get()
+        assert queued.to_email == 'sara@example.com'
+        assert queued.status == 'queued'
+        assert queued.body_html
+
+    def test_patient_booking_queues_confirmation(self, api_client, booking_data, mailoutbox):
+        """Test that registered-patient bookings also go through the queue"""
+        booking_data['is_guest'] = False
+        url = reverse('public_appointment_booking')
+        response = api_client.post(url, booking_data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(mailoutbox) == 0
+        assert OutboundEmail.objects.filter(to_email='sara@example.com').count() == 1
+
+    def test_overlapping_guest_booking_rejected(self, api_client, booking_data):
+        """Test that a second booking overlapping the first one for the same guest is rejected"""
+        url = reverse('public_appointment_booking')
+        assert api_client.post(url, booking_data, format='json').status_code == status.HTTP_201_CREATED
+
+        booking_data['appointment_time'] = '11:00'
+        response = api_client.post(url, booking_data, format='json')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert Appointment.objects.filter(guest_email='sara@example.com').count() == 1
+
+        booking_data['appointment_time'] = '11:30'
+        response = api_client.post(url, booking_data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_all_errors_reported_in_one_response(self, api_client, booking_data):
+        """Test that field errors are collected in a single pass and nothing is booked"""
+        booking_data.update({'email': 'not-an-email', 'phone': '123', 'age': 'old', 'firstname': '  '})
+        response = api_client.post(reverse('public_appointment_booking'), booking_data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['validation_errors'] == [
+            'First Name is required',
+            'Please enter a valid email address',
+            'Please enter a valid phone number (minimum 10 digits)',
+            'Age must be a valid number',
+        ]
+        assert not Appointment.objects.exists()
+
+    def test_schedule_rules(self, api_client, booking_data):
+        """Test that past, far-future and out-of-hours slots are rejected"""
+        url = reverse('public_appointment_booking')
+        for date_value, time_value, error in [
+            ((timezone.localdate() - timedelta(days=1)).isoformat(), '10:00', 'Appointment date and time must be in the future'),
+            ((timezone.localdate() + timedelta(days=200)).isoformat(), '10:00', 'Appointment cannot be scheduled more than 6 months in advance'),
+            (booking_data['appointment_date'], '21:00', 'Appointments are only available between 8:00 AM and 8:00 PM'),
+            ('2026-02-30', '10:00', 'Invalid date/time format. Please use YYYY-MM-DD for date and HH:MM for time (24-hour format)'),
+            ('30/01/2026', '10:00', 'Appointment date must be in YYYY-MM-DD format'),
+        ]:
+            payload = dict(booking_data, appointment_date=date_value, appointment_time=time_value)
+            response = api_client.post(url, payload, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response.data['validation_errors'] == [error]
+
+    def test_form_encoded_booking(self, api_client, booking_data):
+        """Test that form posts are accepted although their data cannot be modified in place"""
+        booking_data['is_guest'] = 'true'
+        response = api_client.post(reverse('public_appointment_booking'), booking_data)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        appointment = Appointment.objects.get()
+        assert appointment.service_type == 'manual-therapy'
+        assert appointment.is_guest is True
+        assert appointment.note.startswith('Symptoms: Lower back pain')
+
+    def test_guest_update_is_validated(self, api_client, booking_data):
+        """Test that guest updates check the phone number and change nothing when it is invalid"""
+        created = api_client.post(reverse('public_appointment_booking'), booking_data, format='json')
+        url = reverse('guest_appointment_update')
+        lookup = {'guest_id': created.data['guest_id'], 'email': booking_data['email']}
+
+        response = api_client.post(url, {**lookup, 'guest_phone': 'abc', 'note': 'Changed'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Appointment.objects.get().note != 'Changed'
+
+        response = api_client.post(url, {**lookup, 'guest_phone': '+966 500 000 000', 'note': 'Changed'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        appointment = Appointment.objects.get()
+        assert (appointment.guest_phone, appointment.note) == ('+966 500 000 000', 'Changed')
+
+    def test_api_guest_appointments_share_the_rules(self, authenticated_admin_client):
+        """Test that guest appointments created through the API are held to the booking rules"""
+        payload = {
+            'date': (timezone.now() + timedelta(days=2)).isoformat(), 'service_type': 'consultation', 'is_guest': True,
+            'guest_first_name': 'Sara', 'guest_last_name': 'Ahmed', 'guest_email': 'sara@example.com', 'guest_phone': '12',
+        }
+        response = authenticated_admin_client.post(reverse('appointment-list'), payload, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'Please enter a valid phone number (minimum 10 digits)' in str(response.data)
+
+        payload['guest_phone'] = '+966 555 123 456'
+        response = authenticated_admin_client.post(reverse('appointment-list'), payload, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestTherapistAvailability:
+    """Test cases for the therapist availability endpoint"""
+
+    @pytest.fixture
+    def day(self):
+        return timezone.localdate() + timedelta(days=2)
+
+    def at(self, day, hour, minute=0):
+        from datetime import datetime, time
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_free_slots_skip_busy_intervals(self, api_client, patient_user, therapist_user, day):
+        """Test that slots overlapping [date, date + duration) are not offered"""
+        Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, 9), duration=90)
+        Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, 10), duration=60)
+        Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, 14), duration=60, status='cancelled')
+
+        response = api_client.get(reverse('therapist_availability'), {'therapist': therapist_user.id, 'date': day.isoformat()})
+
+        assert response.status_code == status.HTTP_200_OK
+        starts = [slot['start'] for slot in response.data['slots']]
+        assert self.at(day, 8).isoformat() in starts
+        assert self.at(day, 8, 30).isoformat() not in starts  # would run into 9:00
+        assert self.at(day, 10, 30).isoformat() not in starts
+        assert self.at(day, 11).isoformat() in starts
+        assert self.at(day, 14).isoformat() in starts  # cancelled appointments free their slot
+        assert starts[-1] == self.at(day, 19).isoformat()
+        assert response.data['busy'] == [{'start': self.at(day, 9).isoformat(), 'end': self.at(day, 11).isoformat()}]
+
+    def test_appointment_from_previous_evening_blocks_morning(self, api_client, patient_user, therapist_user, day):
+        """Test that a long appointment starting before business hours still blocks the overlap"""
+        Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, 7), duration=120)
+
+        response = api_client.get(reverse('therapist_availability'), {'therapist': therapist_user.id, 'date': day.isoformat()})
+
+        assert response.data['slots'][0]['start'] == self.at(day, 9).isoformat()
+
+    def test_query_count_is_constant(self, api_client, patient_user, therapist_user, day, django_assert_num_queries):
+        """Test that availability is computed from a single range query"""
+        for hour in range(8, 20):
+            Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, hour), duration=30)
+
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('therapist_availability'), {'therapist': therapist_user.id, 'date': day.isoformat(), 'duration': 30})
+        assert len(response.data['slots']) == 12
+
+    def test_missing_parameters(self, api_client):
+        """Test that therapist and date are required"""
+        response = api_client.get(reverse('therapist_availability'), {'date': '2030-01-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_therapist(self, api_client, patient_user):
+        """Test that a non-therapist user is rejected"""
+        response = api_client.get(reverse('therapist_availability'), {'therapist': patient_user.id, 'date': '2030-01-01'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_reschedule_rejects_therapist_overlap(self, authenticated_admin_client, patient_user, therapist_user, day):
+        """Test that rescheduling into another patient's session with the same therapist is rejected"""
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x', role='patient')
+        Appointment.objects.create(user=other, therapist=therapist_user, date=self.at(day, 10), duration=60)
+        appointment = Appointment.objects.create(user=patient_user, therapist=therapist_user, date=self.at(day, 15), duration=60)
+
+        url = reverse('appointment-reschedule', kwargs={'pk': appointment.id})
+        response = authenticated_admin_client.post(url, {'new_date': f'{day.isoformat()}T10:30:00', 'reschedule_reason': 'test'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = authenticated_admin_client.post(url, {'new_date': f'{day.isoformat()}T11:00:00', 'reschedule_reason': 'test'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_reschedule_validates_the_new_duration(self, authenticated_admin_client, patient_user, day):
+        """Test that a bad duration is a 400 and a good one is saved as a number"""
+        appointment = Appointment.objects.create(user=patient_user, date=self.at(day, 15), duration=60)
+        url = reverse('appointment-reschedule', kwargs={'pk': appointment.id})
+
+        for bad in ('abc', 5, 600):
+            response = authenticated_admin_client.post(url, {'new_date': f'{day.isoformat()}T11:00:00', 'new_duration': bad}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = authenticated_admin_client.post(url, {'new_date': f'{day.isoformat()}T11:00:00', 'new_duration': '90'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.duration == 90
+
+    def test_moving_an_appointment_rearms_its_reminder(self, authenticated_admin_client, patient_user, therapist_user, day):
+        """Test that rescheduling or editing the date clears reminder_sent_at, and other edits keep it"""
+        appointment = Appointment.objects.create(
+            user=patient_user, therapist=therapist_user, date=self.at(day, 9), duration=60, reminder_sent_at=timezone.now(),
+        )
+        detail = reverse('appointment-detail', kwargs={'pk': appointment.id})
+
+        response = authenticated_admin_client.patch(detail, {'note': 'Bring X-rays'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.reminder_sent_at is not None
+
+        url = reverse('appointment-reschedule', kwargs={'pk': appointment.id})
+        response = authenticated_admin_client.post(url, {'new_date': f'{day.isoformat()}T12:00:00'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.reminder_sent_at is None
+
+        Appointment.objects.filter(pk=appointment.pk).update(reminder_sent_at=timezone.now())
+        response = authenticated_admin_client.patch(detail, {'date': self.at(day, 16).isoformat()}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.reminder_sent_at is None
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestDashboardStats:
+    """Test cases for the dashboard statistics endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_overview_aggregates(self, authenticated_admin_client, patient_user, therapist_user):
+        """Test that the overview returns grouped appointment and user counts"""
+        yesterday = timezone.now() - timedelta(days=1)
+        Appointment.objects.create(user=patient_user, date=yesterday, service_type='manual-therapy', status='scheduled')
+        Appointment.objects.create(user=patient_user, date=yesterday, service_type='manual-therapy', status='completed')
+        Appointment.objects.create(user=patient_user, date=yesterday, service_type='assessment', status='completed')
+
+        response = authenticated_admin_client.get(reverse('dashboard_stats'))
+
+        assert response.status_code == status.HTTP_200_OK
+        appointments = response.data['appointments']
+        assert appointments['total'] == 3
+        assert appointments['by_status'] == {'completed': 2, 'scheduled': 1}
+        assert appointments['by_service_type'] == {'assessment': 1, 'manual-therapy': 2}
+        assert sum(day['count'] for day in appointments['by_day']) == 3
+        assert response.data['users']['by_role']['patient'] == 1
+        assert response.data['users']['by_role']['therapist'] == 1
+        assert 'testimonials' in response.data
+        assert 'treatment_plans' in response.data
+
+    def test_section_endpoint(self, authenticated_admin_client, patient_appointment):
+        """Test fetching a single statistics section"""
+        response = authenticated_admin_client.get(reverse('dashboard_stats_section', kwargs={'section': 'treatment-plans'}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {'range', 'treatment_plans'}
+
+    def test_results_are_cached_until_a_write(self, authenticated_admin_client, patient_user, django_assert_num_queries):
+        """Test that repeat requests skip the database and writes invalidate the cache"""
+        url = reverse('dashboard_stats_section', kwargs={'section': 'appointments'})
+        yesterday = timezone.now() - timedelta(days=1)
+        Appointment.objects.create(user=patient_user, date=yesterday)
+        assert authenticated_admin_client.get(url).data['appointments']['total'] == 1
+
+        with django_assert_num_queries(0):
+            assert authenticated_admin_client.get(url).data['appointments']['total'] == 1
+
+        Appointment.objects.create(user=patient_user, date=yesterday)
+        assert authenticated_admin_client.get(url).data['appointments']['total'] == 2
+
+    def test_totals_ignore_the_range(self, authenticated_admin_client, patient_user):
+        """Test that the dashboard totals count every appointment, not just the last 30 days"""
+        Appointment.objects.create(user=patient_user, date=timezone.now() - timedelta(days=400), status='completed')
+        Appointment.objects.create(user=patient_user, date=timezone.now(), status='scheduled')
+
+        response = authenticated_admin_client.get(reverse('dashboard_stats_section', kwargs={'section': 'totals'}))
+
+        assert response.status_code == status.HTTP_200_OK
+        appointments = response.data['totals']['appointments']
+        assert appointments['total'] == 2
+        assert appointments['today'] == 1
+        assert appointments['by_status'] == {'completed': 1, 'scheduled': 1}
+        assert sum(month['count'] for month in appointments['by_month']) == 2
+        assert response.data['totals']['users'] == CustomUser.objects.count()
+
+    def test_invalid_range(self, authenticated_admin_client):
+        """Test that malformed or inverted ranges are rejected"""
+        url = reverse('dashboard_stats')
+        assert authenticated_admin_client.get(url, {'start': 'yesterday'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert authenticated_admin_client.get(url, {'start': '2025-02-01', 'end': '2025-01-01'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_section(self, authenticated_admin_client):
+        """Test that unknown sections return 404"""
+        response = authenticated_admin_client.get(reverse('dashboard_stats_section', kwargs={'section': 'payroll'}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_restricted_to_administrators(self, api_client, authenticated_patient_client, therapist_user):
+        """Test that anonymous callers, patients and therapists cannot read clinic-wide figures"""
+        url = reverse('dashboard_stats')
+        assert APIClient().get(url).status_code == status.HTTP_403_FORBIDDEN
+        assert authenticated_patient_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+        therapist_client = APIClient()
+        therapist_client.force_authenticate(user=therapist_user)
+        assert therapist_client.get(reverse('dashboard_stats_section', kwargs={'section': 'users'})).status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestQueryProfilerMiddleware:
+    """Test cases for the request query profiler"""
+
+    def profiles(self, caplog):
+        return [record.profile for record in caplog.records if record.name == 'performance']
+
+    def test_disabled_by_default(self, api_client, settings, caplog):
+        """Test that nothing is logged unless the profiler is enabled"""
+        settings.QUERY_PROFILER_ENABLED = False
+        with caplog.at_level('INFO', logger='performance'):
+            api_client.get(reverse('appointment-list'))
+
+        assert self.profiles(caplog) == []
+
+    def test_records_request_profile(self, api_client, settings, caplog, multiple_appointments):
+        """Test that view name, timings and query counts are recorded"""
+        settings.QUERY_PROFILER_ENABLED = True
+        with caplog.at_level('INFO', logger='performance'):
+            api_client.get(reverse('appointment-list'))
+
+        [profile] = self.profiles(caplog)
+        assert profile['view'] == 'appointment-list'
+        assert profile['method'] == 'GET'
+        assert profile['status'] == 200
+        assert profile['db_queries'] >= 1
+        assert profile['duration_ms'] >= profile['db_time_ms'] >= 0
+        assert profile['n_plus_one'] is False
+
+    def test_flags_repeated_queries(self, settings):
+        """Test that a statement repeated past the threshold is flagged as N+1"""
+        from clinic.profiling import QueryProfilerMiddleware, QueryRecorder
+        from django.test import RequestFactory
+        settings.QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = 3
+
+        recorder = QueryRecorder()
+        recorder.queries = [('SELECT * FROM clinic_appointment', 0.001)] + [
+            (f'SELECT * FROM clinic_customuser WHERE id = {user_id}', 0.001) for user_id in range(4)
+        ]
+        request = RequestFactory().get('/api/testimonials/')
+        response = type('Response', (), {'status_code': 200})()
+
+        profile = QueryProfilerMiddleware(lambda r: None).build_profile(request, response, recorder, 0.05)
+
+        assert profile['n_plus_one'] is True
+        assert profile['duplicate_queries'] == [
+            {'fingerprint': 'SELECT * FROM clinic_customuser WHERE id = ?', 'count': 4}
+        ]
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestPublicTestimonialFeed:
+    """Test cases for the cached public testimonial feed"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_feed_lists_approved_without_contact_details(self, api_client):
+        """Test that only approved testimonials are public and contact details are hidden"""
+        approved = TestimonialFactory()
+        TestimonialFactory(is_approved=False)
+
+        response = api_client.get(reverse('testimonial-public'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data] == [approved.id]
+        assert 'email' not in response.data[0]
+        assert 'phone' not in response.data[0]
+        assert response['ETag']
+        assert response['Last-Modified']
+
+    def test_repeat_views_hit_cache(self, api_client, testimonial, django_assert_num_queries):
+        """Test that a cached feed is served without database queries"""
+        api_client.get(reverse('testimonial-public'))
+
+        with django_assert_num_queries(0):
+            response = api_client.get(reverse('testimonial-public'))
+        assert len(response.data) == 1
+
+    def test_conditional_get_returns_304(self, api_client, testimonial):
+        """Test If-None-Match and If-Modified-Since revalidation"""
+        first = api_client.get(reverse('testimonial-public'))
+
+        by_etag = api_client.get(reverse('testimonial-public'), HTTP_IF_NONE_MATCH=first['ETag'])
+        assert by_etag.status_code == status.HTTP_304_NOT_MODIFIED
+        assert by_etag['ETag'] == first['ETag']
+
+        by_date = api_client.get(reverse('testimonial-public'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        assert by_date.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_save_invalidates_feed(self, api_client, testimonial):
+        """Test that approving a testimonial changes the feed and its ETag"""
+        pending = TestimonialFactory(is_approved=False)
+        first = api_client.get(reverse('testimonial-public'))
+
+        pending.is_approved = True
+        pending.save()
+
+        response = api_client.get(reverse('testimonial-public'), HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 2
+        assert response['ETag'] != first['ETag']
+
+    def test_admin_actions_invalidate_feed(self, api_client, admin_user, testimonial):
+        """Test that the bulk admin actions, which bypass save signals, invalidate the feed"""
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        assert api_client.get(reverse('testimonial-public'), {'featured': 'true'}).data == []
+
+        request = RequestFactory().post('/admin/')
+        request.user = admin_user
+        model_admin = site._registry[Testimonial]
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.feature_testimonials(request, Testimonial.objects.filter(id=testimonial.id))
+
+        featured = api_client.get(reverse('testimonial-public'), {'featured': 'true'}).data
+        assert [item['id'] for item in featured] == [testimonial.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestAppointmentImportExport:
+    """Test cases for bulk appointment export and import"""
+
+    def test_export_requires_admin(self, authenticated_patient_client):
+        """Test that patients cannot export the appointment table"""
+        response = authenticated_patient_client.get(reverse('appointment-export'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_csv_streams_rows(self, authenticated_admin_client, multiple_appointments):
+        """Test that the CSV export is streamed with a header and one line per appointment"""
+        response = authenticated_admin_client.get(reverse('appointment-export'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        import csv, io
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert rows[0][:4] == ['id', 'date', 'service_type', 'status']
+        assert len(rows) == len(multiple_appointments) + 1
+
+    def test_export_ndjson(self, authenticated_admin_client, multiple_appointments, patient_user):
+        """Test the NDJSON export with flat patient references"""
+        import json
+        response = authenticated_admin_client.get(reverse('appointment-export'), {'output': 'ndjson'})
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert [row['id'] for row in rows] == sorted(a.id for a in multiple_appointments)
+        assert rows[0]['user_email'] == patient_user.email
+
+    def test_import_creates_rows_and_reports_errors(self, authenticated_admin_client, patient_user):
+        """Test that valid rows are inserted, guests get IDs and invalid rows are reported"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        day = (timezone.now() + timedelta(days=5)).replace(microsecond=0).isoformat()
+        csv_body = (
+            'date,service_type,duration,user_email,is_guest,guest_first_name,guest_last_name,guest_email\n'
+            f'{day},manual-therapy,45,{patient_user.email},,,,\n'
+            f'{day},assessment,60,,true,Nora,Ali,nora@example.com\n'
+            f'{day},assessment,60,,true,Omar,Ali,omar@example.com\n'
+            f'not-a-date,assessment,60,{patient_user.email},,,,\n'
+            f'{day},assessment,60,missing@example.com,,,,\n'
+        )
+        upload = SimpleUploadedFile('appointments.csv', csv_body.encode(), content_type='text/csv')
+
+        response = authenticated_admin_client.post(reverse('appointment-bulk-import'), {'file': upload}, format='multipart')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 3
+        assert response.data['invalid'] == 2
+        assert sorted(error['line'] for error in response.data['errors']) == [5, 6]
+        guest_ids = list(Appointment.objects.filter(is_guest=True).values_list('guest_id', flat=True))
+        assert len(set(guest_ids)) == 2
+        assert all(guest_id.startswith('GUEST-') for guest_id in guest_ids)
+        assert Appointment.objects.get(user=patient_user).duration == 45
+
+    def test_export_import_round_trip(self, authenticated_admin_client, multiple_appointments):
+        """Test that an export can be fed back into the importer"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        exported = b''.join(authenticated_admin_client.get(reverse('appointment-export'), {'output': 'ndjson'}).streaming_content)
+        upload = SimpleUploadedFile('appointments.ndjson', exported)
+
+        response = authenticated_admin_client.post(
+            reverse('appointment-bulk-import') + '?dry_run=true', {'file': upload}, format='multipart'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['valid'] == len(multiple_appointments)
+        assert response.data['created'] == 0
+        assert Appointment.objects.count() == len(multiple_appointments)
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestSearchEndpoint:
+    """Test cases for /api/search/ and the indexed ?search= filters"""
+
+    @pytest.fixture
+    def records(self, patient_user, therapist_user):
+        patient_user.first_name, patient_user.last_name = 'Omar', 'Khalil'
+        patient_user.save()
+        other = CustomUser.objects.create_user(username='omarsson', email='o@example.com', password='x', first_name='Sami')
+        appointment = Appointment.objects.create(
+            user=patient_user, therapist=therapist_user, date=timezone.now() + timedelta(days=2), note='Knee rehabilitation'
+        )
+        other_appointment = Appointment.objects.create(
+            user=other, date=timezone.now() + timedelta(days=3), note='Knee swelling'
+        )
+        approved = TestimonialFactory(
+            full_name='Omar K', email='ok@example.com', condition='Knee pain',
+            before_condition='Pain', treatment_experience='Good', results='Better', testimonial_text='Knee is fine now',
+        )
+        return {'other': other, 'appointment': appointment, 'other_appointment': other_appointment, 'testimonial': approved}
+
+    def results(self, response):
+        return [(row['type'], row['id']) for row in response.data['results']]
+
+    def test_admin_approval_makes_testimonial_public(self, api_client, admin_user):
+        """Test that the bulk approve action, which bypasses save signals, reindexes the testimonial"""
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        pending = TestimonialFactory(
+            full_name='Huda N', email='hn@example.com', condition='Shoulder pain',
+            before_condition='Pain', treatment_experience='Good', results='Better', testimonial_text='Shoulder is fine now',
+            is_approved=False,
+        )
+        assert self.results(api_client.get(reverse('search'), {'q': 'shoulder'})) == []
+
+        request = RequestFactory().post('/admin/')
+        request.user = admin_user
+        model_admin = site._registry[Testimonial]
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.approve_testimonials(request, Testimonial.objects.filter(id=pending.id))
+
+        assert self.results(api_client.get(reverse('search'), {'q': 'shoulder'})) == [('testimonial', pending.id)]
+
+    def test_staff_search_is_ranked_across_types(self, authenticated_admin_client, patient_user, records):
+        """Test that staff see every type and that title matches outrank body matches"""
+        response = authenticated_admin_client.get(reverse('search'), {'q': 'omar'})
+
+        assert response.status_code == status.HTTP_200_OK
+        found = self.results(response)
+        assert ('user', patient_user.pk) in found
+        assert ('user', records['other'].pk) in found
+        assert ('appointment', records['appointment'].pk) in found
+        assert ('testimonial', records['testimonial'].pk) in found
+        ranks = [row['rank'] for row in response.data['results']]
+        assert ranks == sorted(ranks, reverse=True)
+        # "Omar Khalil" is in the user title; omarsson only matches through its username in the body
+        assert found.index(('user', patient_user.pk)) < found.index(('user', records['other'].pk))
+
+    def test_patients_only_see_public_and_own_documents(self, authenticated_patient_client, patient_user, records):
+        """Test that a patient's search never returns another patient's records"""
+        response = authenticated_patient_client.get(reverse('search'), {'q': 'knee'})
+
+        found = self.results(response)
+        assert ('appointment', records['appointment'].pk) in found
+        assert ('testimonial', records['testimonial'].pk) in found
+        assert ('appointment', records['other_appointment'].pk) not in found
+        assert response.data['count'] == 2
+
+    def test_anonymous_search_only_returns_public_documents(self, api_client, records):
+        """Test that anonymous callers only find approved testimonials"""
+        response = api_client.get(reverse('search'), {'q': 'knee'})
+
+        assert self.results(response) == [('testimonial', records['testimonial'].pk)]
+
+    def test_type_filter_and_pagination(self, authenticated_admin_client, records):
+        """Test restricting result types and paging through ranked results"""
+        first = authenticated_admin_client.get(reverse('search'), {'q': 'knee', 'type': 'appointment', 'page_size': 1})
+        second = authenticated_admin_client.get(reverse('search'), {'q': 'knee', 'type': 'appointment', 'page_size': 1, 'page': 2})
+
+        assert first.data['count'] == 2
+        assert first.data['has_next'] is True
+        assert second.data['has_next'] is False
+        found = self.results(first) + self.results(second)
+        assert sorted(found) == sorted([
+            ('appointment', records['appointment'].pk), ('appointment', records['other_appointment'].pk),
+        ])
+
+    def test_invalid_requests(self, api_client):
+        """Test that empty queries and unknown types are rejected"""
+        assert api_client.get(reverse('search'), {'q': '  *** '}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(reverse('search'), {'q': 'knee', 'type': 'plans'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(reverse('search'), {'q': 'knee', 'page': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_search_uses_index(self, authenticated_admin_client, records):
+        """Test that ?search= on list endpoints goes through the search documents"""
+        response = authenticated_admin_client.get(reverse('appointment-list'), {'search': 'rehab'})
+        assert [row['id'] for row in response.data['results']] == [records['appointment'].pk]
+
+        response = authenticated_admin_client.get(reverse('testimonial-list'), {'search': 'knee fine'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['id'] for row in response.data['results']] == [records['testimonial'].pk]
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestPatientAutocomplete:
+    """Test cases for /api/users/autocomplete/"""
+
+    @pytest.fixture
+    def patients(self):
+        return [
+            CustomUser.objects.create_user(
+                username=f'patient{n}', email=f'patient{n}@example.com', password='x', role='patient',
+                first_name=first_name, last_name='Khalil', phone_number=f'+96655500{n:04d}',
+            )
+            for n, first_name in enumerate(['Youssef', 'Yousef', 'يوسف', 'Yasmin'])
+        ]
+
+    def test_staff_get_ranked_matches(self, authenticated_therapist_client, patients):
+        """Test that staff find transliterated and misspelt names, best first"""
+        response = authenticated_therapist_client.get(reverse('customuser-autocomplete'), {'q': 'yusuf khalil'})
+
+        assert response.status_code == status.HTTP_200_OK
+        found = [row['id'] for row in response.data['results']]
+        assert set(found[:3]) == {patients[0].pk, patients[1].pk, patients[2].pk}
+        scores = [row['score'] for row in response.data['results']]
+        assert scores == sorted(scores, reverse=True)
+        assert set(response.data['results'][0]) == {'id', 'username', 'full_name', 'email', 'phone_number', 'score'}
+
+    def test_phone_lookup_and_limit(self, authenticated_admin_client, patients):
+        """Test looking up by local phone number and capping the results"""
+        response = authenticated_admin_client.get(reverse('customuser-autocomplete'), {'q': '0555000003'})
+        assert response.data['results'][0]['id'] == patients[3].pk
+
+        response = authenticated_admin_client.get(reverse('customuser-autocomplete'), {'q': 'khalil', 'limit': 2})
+        assert len(response.data['results']) == 2
+
+    def test_only_staff_can_look_up_patients(self, api_client, authenticated_patient_client, patients):
+        """Test that patients and anonymous callers are refused"""
+        for client in (api_client, authenticated_patient_client):
+            response = client.get(reverse('customuser-autocomplete'), {'q': 'youssef'})
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_invalid_requests(self, authenticated_admin_client):
+        """Test that empty queries and non-numeric limits are rejected"""
+        url = reverse('customuser-autocomplete')
+        assert authenticated_admin_client.get(url, {'q': ' - '}).status_code == status.HTTP_400_BAD_REQUEST
+        assert authenticated_admin_client.get(url, {'q': 'ali', 'limit': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestIdempotencyKeys:
+    """Test cases for Idempotency-Key replay on booking endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_retry_replays_the_first_booking(self, api_client, booking_data, django_assert_num_queries):
+        """Test that a retried booking returns the stored response and books nothing new"""
+        url = reverse('public_appointment_booking')
+        first = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+        assert first.status_code == status.HTTP_201_CREATED
+
+        with django_assert_num_queries(0):
+            retry = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert retry.data['guest_id'] == first.data['guest_id']
+        assert Appointment.objects.count() == 1
+        assert OutboundEmail.objects.count() == 1
+
+    def test_key_reused_with_different_payload(self, api_client, booking_data):
+        """Test that a key cannot be replayed for a different request"""
+        url = reverse('public_appointment_booking')
+        api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        booking_data['appointment_time'] = '15:00'
+        response = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Appointment.objects.count() == 1
+
+    def test_key_still_in_progress(self, api_client, booking_data):
+        """Test that a retry racing the first request is told to come back later"""
+        url = reverse('public_appointment_booking')
+        request = APIRequestFactory().post(url, booking_data, format='json')
+        storage_key = idempotency.cache_key('public-booking', request, 'booking-1')
+        fingerprint = idempotency.fingerprint(Request(request, parsers=[JSONParser()]))
+        cache.add(storage_key, {'fingerprint': fingerprint, 'state': idempotency.IN_PROGRESS})
+
+        response = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response['Retry-After'] == '1'
+        assert not Appointment.objects.exists()
+
+    def test_view_never_runs_without_a_claim(self, api_client, booking_data, monkeypatch):
+        """Test that a claim lost to an entry that expires before it can be read is answered with 409"""
+        class RacingCache:
+            def get(self, key):
+                return None
+
+            def add(self, key, value, timeout):
+                return False
+
+        monkeypatch.setattr(idempotency, 'cache', RacingCache())
+        response = api_client.post(reverse('public_appointment_booking'), booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Appointment.objects.exists()
+
+    def test_invalid_key_rejected(self, api_client, booking_data):
+        """Test that empty and oversized keys are rejected before anything is booked"""
+        url = reverse('public_appointment_booking')
+        for key in ['  ', 'k' * 256]:
+            response = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Appointment.objects.exists()
+
+    def test_failed_validation_is_replayed(self, api_client, booking_data):
+        """Test that client errors are stored like successes, so a corrected payload needs a new key"""
+        url = reverse('public_appointment_booking')
+        booking_data['email'] = 'not-an-email'
+        first = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+        retry = api_client.post(url, booking_data, format='json', HTTP_IDEMPOTENCY_KEY='booking-1')
+
+        assert first.status_code == retry.status_code == status.HTTP_400_BAD_REQUEST
+        assert retry.data == first.data
+
+    def test_without_key_nothing_is_replayed(self, api_client, booking_data):
+        """Test that requests without the header behave as before"""
+        url = reverse('public_appointment_booking')
+        assert api_client.post(url, booking_data, format='json').status_code == status.HTTP_201_CREATED
+        response = api_client.post(url, booking_data, format='json')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert 'Idempotent-Replayed' not in response
+
+    def test_appointment_create_replays(self, authenticated_patient_client, valid_appointment_data):
+        """Test that API appointment creation is replayed per user"""
+        url = reverse('appointment-list')
+        first = authenticated_patient_client.post(url, valid_appointment_data, format='json', HTTP_IDEMPOTENCY_KEY='create-1')
+        retry = authenticated_patient_client.post(url, valid_appointment_data, format='json', HTTP_IDEMPOTENCY_KEY='create-1')
+
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert retry.data['id'] == first.data['id']
+        assert Appointment.objects.count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestPublicRateLimits:
+    """Test cases for the sliding-window limits on public endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def limits(self, settings):
+        settings.RATE_LIMIT_ENABLED = True
+        settings.RATE_LIMITS = {
+            'public-booking': {'ip': '4/hour', 'email': '2/hour'},
+            'guest-lookup': {'ip': '100/hour', 'guest_id': '2/minute'},
+            'login': {'ip': '3/minute', 'username': '100/minute'},
+        }
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_booking_limited_per_email(self, api_client, booking_data):
+        """Test that one email is limited whatever it books, while other emails still get through"""
+        url = reverse('public_appointment_booking')
+        booking_data['firstname'] = ''
+        for _ in range(2):
+            assert api_client.post(url, booking_data, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+        response = api_client.post(url, booking_data, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) > 0
+
+        booking_data.update(firstname='Sara', email='other@example.com')
+        assert api_client.post(url, booking_data, format='json').status_code == status.HTTP_201_CREATED
+
+    def test_booking_limited_per_ip(self, api_client, booking_data):
+        """Test that rotating emails does not get one IP past its own bucket"""
+        url = reverse('public_appointment_booking')
+        booking_data['firstname'] = ''
+        codes = [
+            api_client.post(url, dict(booking_data, email=f'bot{n}@example.com'), format='json').status_code
+            for n in range(5)
+        ]
+        assert codes == [status.HTTP_400_BAD_REQUEST] * 4 + [status.HTTP_429_TOO_MANY_REQUESTS]
+
+        other_ip = api_client.post(url, dict(booking_data, email='bot9@example.com'), format='json', REMOTE_ADDR='198.51.100.4')
+        assert other_ip.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_guest_lookup_limited_per_guest_id(self, api_client):
+        """Test that guessing emails for one guest ID is limited across IPs"""
+        url = reverse('guest_appointment_lookup')
+        codes = [
+            api_client.post(url, {'guest_id': 'GUEST-1', 'email': f'guess{n}@example.com'}, format='json', REMOTE_ADDR=f'198.51.100.{n}').status_code
+            for n in range(3)
+        ]
+        assert codes == [status.HTTP_404_NOT_FOUND] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS]
+
+    def test_login_limited_per_ip(self, api_client):
+        """Test that login attempts are limited per client IP"""
+        url = reverse('customuser-login')
+        codes = [
+            api_client.post(url, {'username': f'user{n}', 'password': 'wrong'}, format='json').status_code
+            for n in range(4)
+        ]
+        assert codes == [status.HTTP_401_UNAUTHORIZED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS]
+
+    def test_limits_can_be_switched_off(self, api_client, settings):
+        """Test that RATE_LIMIT_ENABLED=False lets every request through"""
+        settings.RATE_LIMIT_ENABLED = False
+        url = reverse('customuser-login')
+        for n in range(5):
+            assert api_client.post(url, {'username': f'user{n}', 'password': 'wrong'}, format='json').status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestGuestLookupCache:
+    """Test cases for cached guest appointment lookups"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def guest(self, api_client, booking_data):
+        created = api_client.post(reverse('public_appointment_booking'), booking_data, format='json')
+        return {'guest_id': created.data['guest_id'], 'email': booking_data['email']}
+
+    def test_repeat_lookup_skips_database(self, api_client, guest, django_assert_num_queries):
+        """Test that a repeat lookup is answered from the cache"""
+        url = reverse('guest_appointment_lookup')
+        first = api_client.post(url, guest, format='json')
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data['appointment']['guest_id'] == guest['guest_id']
+        assert first.data['appointment']['date'] == Appointment.objects.get().date.strftime('%Y-%m-%d %H:%M')
+
+        with django_assert_num_queries(0):
+            repeat = api_client.post(url, guest, format='json')
+        assert repeat.data == first.data
+
+    def test_guest_update_invalidates(self, api_client, guest):
+        """Test that guest_appointment_update is visible on the next lookup"""
+        url = reverse('guest_appointment_lookup')
+        api_client.post(url, guest, format='json')
+        api_client.post(reverse('guest_appointment_update'), {**guest, 'note': 'Running late'}, format='json')
+
+        assert api_client.post(url, guest, format='json').data['appointment']['note'] == 'Running late'
+
+    def test_status_change_invalidates(self, api_client, guest):
+        """Test that a status change by staff is visible on the next lookup"""
+        url = reverse('guest_appointment_lookup')
+        api_client.post(url, guest, format='json')
+        appointment = Appointment.objects.get()
+        appointment.status = 'confirmed'
+        appointment.save()
+
+        assert api_client.post(url, guest, format='json').data['appointment']['status'] == 'confirmed'
+
+    def test_wrong_email_not_found(self, api_client, guest):
+        """Test that the email must match and that lookups are not shared between emails"""
+        url = reverse('guest_appointment_lookup')
+        api_client.post(url, guest, format='json')
+
+        response = api_client.post(url, {**guest, 'email': 'other@example.com'}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+@pytest.mark.api
+class TestGuestAppointmentHistory:
+    """Test cases for the guest appointment history endpoint"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def visits(self):
+        return [
+            Appointment.objects.create(
+                is_guest=True, guest_first_name='Sara', guest_last_name='Ahmed', guest_email=email,
+                date=timezone.now() + timedelta(days=n + 1),
+            )
+            for n, email in enumerate(['sara@example.com'] * 3 + ['other@example.com'])
+        ]
+
+    def test_returns_every_visit_for_the_email(self, api_client, visits):
+        """Test that any one guest ID unlocks all appointments booked under its email, newest first"""
+        response = api_client.post(reverse('guest_appointment_history'), {'guest_id': visits[0].guest_id, 'email': 'sara@example.com'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['guest_id'] for item in response.data['results']] == [visit.guest_id for visit in visits[2::-1]]
+        assert response.data['next'] is None
+
+    def test_cursor_pages(self, api_client, visits):
+        """Test that history is paged with cursors and a bad cursor is rejected"""
+        url = reverse('guest_appointment_history')
+        payload = {'guest_id': visits[1].guest_id, 'email': 'sara@example.com'}
+        first = api_client.post(f'{url}?page_size=2', payload, format='json')
+        second = api_client.post(first.data['next'], payload, format='json')
+
+        assert len(first.data['results']) == 2
+        assert [item['guest_id'] for item in second.data['results']] == [visits[0].guest_id]
+        assert api_client.post(f'{url}?cursor=bogus', payload, format='json').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_guest_id_must_match_email(self, api_client, visits):
+        """Test that another guest's ID does not unlock an email's history"""
+        url = reverse('guest_appointment_history')
+        response = api_client.post(url, {'guest_id': visits[3].guest_id, 'email': 'sara@example.com'}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.post(url, {'email': 'sara@example.com'}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_history_uses_partial_index(self):
+        """Test that the history page is a range scan of the (guest_email, date) index"""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Query plan text is SQLite specific')
+        plan = Appointment.objects.filter(is_guest=True, guest_email='sara@example.com').order_by('-date', '-id')[:21].explain()
+        assert 'appointment_guest_history' in plan
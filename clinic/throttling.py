@@ -0,0 +1,221 @@
+"""
+Rate Limiting
+Sliding-window limits for the public endpoints (booking, guest lookup,
+verification resends, login and password reset). Each endpoint has its own
+buckets, one per identity: the client IP and a field of the request body such
+as the email, guest ID or username, so a flood spread over many IPs is still
+caught per email and one busy IP does not lock out everyone behind it.
+
+A bucket keeps two counters, for the current and the previous window, and
+counts the previous one in proportion to how much of it still overlaps the
+sliding window. Memory per bucket is constant however many requests arrive.
+
+On Redis all of a request's buckets are checked and counted by one Lua
+script, a single atomic round trip. Other cache backends use the same
+arithmetic through the cache API, which is not atomic between the check and
+the increment and may let a few concurrent requests through over the limit.
+
+Limits come from settings.RATE_LIMITS ("requests/period" per identity) and
+are switched off with RATE_LIMIT_ENABLED.
+"""
+import hashlib
+import logging
+import math
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+DEFAULT_RATES = {
+    'public-booking': {'ip': '20/hour', 'email': '5/hour'},
+    'guest-lookup': {'ip': '60/hour', 'guest_id': '10/minute', 'email': '20/hour'},
+    'resend-verification': {'ip': '20/hour', 'email': '5/hour'},
+    'login': {'ip': '30/minute', 'username': '10/minute'},
+    'password-reset': {'ip': '20/hour', 'email': '5/hour'},
+}
+
+# KEYS: the current and previous window counters of each bucket.
+# ARGV: limit, window length and seconds elapsed in the current window, per bucket.
+# Returns 0 when the request is counted, otherwise the seconds to wait.
+SLIDING_WINDOW = """
+local wait = 0
+for i = 1, #KEYS, 2 do
+    local n = (i - 1) / 2 * 3
+    local limit = tonumber(ARGV[n + 1])
+    local window = tonumber(ARGV[n + 2])
+    local elapsed = tonumber(ARGV[n + 3])
+    local current = tonumber(redis.call('GET', KEYS[i]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[i + 1]) or '0')
+    local seconds = 0
+    if current >= limit then
+        seconds = window - elapsed + window * (1 - (limit - 1) / current)
+    elseif previous * (window - elapsed) / window + current + 1 > limit then
+        seconds = window - (limit - 1 - current) * window / previous - elapsed
+    end
+    if seconds > wait then
+        wait = seconds
+    end
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for i = 1, #KEYS, 2 do
+    if redis.call('INCR', KEYS[i]) == 1 then
+        redis.call('EXPIRE', KEYS[i], ARGV[(i - 1) / 2 * 3 + 2] * 2)
+    end
+end
+return 0
+"""
+
+_script = None
+
+
+def parse_rate(rate):
+    """'20/hour' -> (20, 3600)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip()[0].lower()]
+
+
+def rates(scope):
+    return getattr(settings, 'RATE_LIMITS', {}).get(scope, DEFAULT_RATES.get(scope, {}))
+
+
+class Bucket:
+    """One identity's counters for one endpoint"""
+
+    __slots__ = ('key', 'limit', 'window')
+
+    def __init__(self, scope, identity, value, rate):
+        digest = hashlib.sha256(value.encode('utf-8')).hexdigest()[:24]
+        self.key = f'ratelimit:{scope}:{identity}:{digest}'
+        self.limit, self.window = parse_rate(rate)
+
+    def counters(self, now):
+        """Keys of the current and previous window, and the seconds into the current one"""
+        index, elapsed = divmod(now, self.window)
+        index = int(index)
+        return f'{self.key}:{index}', f'{self.key}:{index - 1}', elapsed
+
+
+def wait_seconds(current, previous, limit, window, elapsed):
+    """Seconds until one more request fits the window, 0 if it fits now (mirrors SLIDING_WINDOW)"""
+    if current >= limit:
+        # Wait for this window to close, then for its count to slide out far enough
+        return window - elapsed + window * (1 - (limit - 1) / current)
+    if previous * (window - elapsed) / window + current + 1 > limit:
+        return window - (limit - 1 - current) * window / previous - elapsed
+    return 0
+
+
+def redis_client():
+    """The default cache and the redis-py client behind it (None for non-Redis backends)"""
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return backend, backend._cache.get_client(write=True)
+    # django-redis
+    client = getattr(backend, 'client', None)
+    if hasattr(client, 'get_client'):
+        return backend, client.get_client(write=True)
+    return backend, None
+
+
+def check(buckets, now=None):
+    """Count a request against every bucket; returns None if allowed, else seconds to wait"""
+    now = time.time() if now is None else now
+    backend, client = redis_client()
+    if client is None:
+        return _check_cache(buckets, now)
+    try:
+        return _check_redis(backend, client, buckets, now)
+    except redis.RedisError:
+        # Fail open: an unreachable Redis should not take the public endpoints down with it
+        logger.warning('Rate limit check failed; request allowed', exc_info=True)
+        return None
+
+
+def _check_redis(backend, client, buckets, now):
+    global _script
+    if _script is None:
+        _script = client.register_script(SLIDING_WINDOW)
+    keys = []
+    args = []
+    for bucket in buckets:
+        current, previous, elapsed = bucket.counters(now)
+        keys += [backend.make_key(current), backend.make_key(previous)]
+        args += [bucket.limit, bucket.window, elapsed]
+    wait = int(_script(keys=keys, args=args, client=client))
+    return wait or None
+
+
+def _check_cache(buckets, now):
+    counters = [bucket.counters(now) for bucket in buckets]
+    values = cache.get_many([key for current, previous, _ in counters for key in (current, previous)])
+    wait = max(
+        wait_seconds(values.get(current, 0), values.get(previous, 0), bucket.limit, bucket.window, elapsed)
+        for bucket, (current, previous, elapsed) in zip(buckets, counters)
+    )
+    if wait > 0:
+        return math.ceil(wait)
+    for bucket, (current, _, _) in zip(buckets, counters):
+        cache.add(current, 0, bucket.window * 2)
+        try:
+            cache.incr(current)
+        except ValueError:
+            # Evicted between the add and the incr
+            cache.set(current, 1, bucket.window * 2)
+    return None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    DRF throttle checking the buckets of `scope`. Identities other than
+    'ip' are read from the request body; a missing value skips that bucket.
+    """
+    scope = None
+
+    def buckets(self, request):
+        data = request.data if hasattr(request.data, 'get') else {}
+        for identity, rate in rates(self.scope).items():
+            value = self.get_ident(request) if identity == 'ip' else data.get(identity)
+            value = str(value).strip().lower() if value is not None else ''
+            if value:
+                yield Bucket(self.scope, identity, value, rate)
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return True
+        buckets = list(self.buckets(request))
+        if buckets:
+            self.retry_after = check(buckets)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class PublicBookingThrottle(SlidingWindowThrottle):
+    scope = 'public-booking'
+
+
+class GuestLookupThrottle(SlidingWindowThrottle):
+    scope = 'guest-lookup'
+
+
+class ResendVerificationThrottle(SlidingWindowThrottle):
+    scope = 'resend-verification'
+
+
+class LoginThrottle(SlidingWindowThrottle):
+    scope = 'login'
+
+
+class PasswordResetThrottle(SlidingWindowThrottle):
+    scope = 'password-reset'
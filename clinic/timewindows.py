@@ -0,0 +1,70 @@
+"""
+Time Windows
+Calendar filters as half-open [start, end) ranges of aware datetimes in the
+clinic's timezone (TIME_ZONE). Comparing the raw column against two bounds
+lets the database use the index on `date`; lookups like date__date=<day>
+wrap the column in a cast and force a full scan.
+
+A window is a (start, end) pair; either bound may be None for an open end.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def local_today():
+    return timezone.localdate()
+
+
+def day_start(day):
+    """Aware midnight at the start of `day` in the clinic's timezone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def days(first, last):
+    """The window covering the calendar days first..last inclusive"""
+    # Each bound is localized on its own so DST changes never shift the end by an hour
+    return day_start(first), day_start(last + timedelta(days=1))
+
+
+def day(value):
+    return days(value, value)
+
+
+def today():
+    return day(local_today())
+
+
+def tomorrow():
+    return day(local_today() + timedelta(days=1))
+
+
+def week(value=None):
+    """The Monday-to-Sunday week containing `value` (default: today)"""
+    value = value or local_today()
+    monday = value - timedelta(days=value.weekday())
+    return days(monday, monday + timedelta(days=6))
+
+
+def upcoming(now=None):
+    return now or timezone.now(), None
+
+
+def past(now=None):
+    return None, now or timezone.now()
+
+
+def q(field, window):
+    """Q object matching `field` inside the window"""
+    start, end = window
+    bounds = {}
+    if start is not None:
+        bounds[f'{field}__gte'] = start
+    if end is not None:
+        bounds[f'{field}__lt'] = end
+    return Q(**bounds)
+
+
+def within(queryset, field, window):
+    return queryset.filter(q(field, window))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomUserViewSet, AppointmentViewSet, TreatmentPlanViewSet, TestimonialViewSet, health_check, resend_verification, public_appointment_booking, guest_appointment_lookup, guest_appointment_update
+from .views import CustomUserViewSet, AppointmentViewSet, TreatmentPlanViewSet, TestimonialViewSet, health_check, resend_verification, public_appointment_booking, guest_appointment_lookup, guest_appointment_history, guest_appointment_update, dashboard_stats, therapist_availability, search_view
 
 router = DefaultRouter()
 router.register(r'users', CustomUserViewSet)
@@ -14,5 +14,10 @@ urlpatterns = [
     path('resend-verification/', resend_verification, name='resend_verification'),
     path('book-appointment/', public_appointment_booking, name='public_appointment_booking'),
     path('guest-lookup/', guest_appointment_lookup, name='guest_appointment_lookup'),
+    path('guest-history/', guest_appointment_history, name='guest_appointment_history'),
     path('guest-update/', guest_appointment_update, name='guest_appointment_update'),
+    path('availability/', therapist_availability, name='therapist_availability'),
+    path('stats/', dashboard_stats, name='dashboard_stats'),
+    path('stats/<str:section>/', dashboard_stats, name='dashboard_stats_section'),
+    path('search/', search_view, name='search'),
 ] 
\ No newline at end of file
@@ -1,188 +1,77 @@
 from rest_framework import viewsets, permissions, status, serializers, filters
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.core.cache import cache
-from django.db.models import Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404, render
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.core.mail import send_mail
+from django.http import StreamingHttpResponse
 from django.db import connection
+from django.db.models import Count
 from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django_filters.rest_framework import DjangoFilterBackend
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from clinic.models import CustomUser, Appointment, TreatmentPlan, EmailVerification, Testimonial
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from clinic.models import CustomUser, Appointment, TreatmentPlan, EmailVerification, Testimonial, OutboundEmail
 from clinic.serializers import (
-    CustomUserSerializer, AppointmentSerializer, TreatmentPlanSerializer, TestimonialSerializer,
+    CustomUserSerializer, AppointmentSerializer, AppointmentListSerializer, GuestAppointmentSerializer, TreatmentPlanSerializer, TestimonialSerializer, PublicTestimonialSerializer,
     LoginResponseSerializer, LogoutResponseSerializer, ErrorResponseSerializer,
     EmailVerificationSerializer, VerifyEmailSerializer, RequestPasswordResetSerializer,
-    PasswordResetSerializer, ResendVerificationSerializer
+    PasswordResetSerializer, ResendVerificationSerializer, RecordSessionSerializer
 )
 from clinic.filters import AppointmentFilter, TreatmentPlanFilter, CustomUserFilter
+from clinic.pagination import AppointmentCursorPagination, CreatedAtCursorPagination, GuestHistoryCursorPagination
+from clinic import availability, booking, fuzzy, guest_lookup, idempotency, importexport, profile_cache, search, stats, testimonial_feed, throttling
+import logging
 import time
 import redis
 import os
-import re
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # Public Appointment Booking Endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([throttling.PublicBookingThrottle])
+@idempotency.idempotent('public-booking')
 def public_appointment_booking(request):
     """Public endpoint for booking appointments without authentication"""
     try:
-        # Extract data from request
-        data = request.data
-        
-        # Enhanced validation with better error messages
-        validation_errors = []
-        
-        # Required fields validation
-        required_fields = {
-            'firstname': 'First Name',
-            'lastname': 'Last Name', 
-            'email': 'Email Address',
-            'phone': 'Phone Number',
-            'age': 'Age',
-            'gender': 'Gender',
-            'service_type': 'Service Type',
-            'appointment_date': 'Appointment Date',
-            'appointment_time': 'Appointment Time',
-            'symptoms': 'Symptoms Description'
-        }
-        
-        for field, display_name in required_fields.items():
-            value = data.get(field)
-            if not value:
-                validation_errors.append(f'{display_name} is required')
-            elif isinstance(value, str) and value.strip() == '':
-                validation_errors.append(f'{display_name} cannot be empty')
-        
-        # Email format validation
-        email = data.get('email', '').strip()
-        if email and not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-            validation_errors.append('Please enter a valid email address')
-        
-        # Phone number validation (basic)
-        phone = data.get('phone', '').strip()
-        if phone and not re.match(r'^[\d\s\-\+\(\)]{10,}$', phone):
-            validation_errors.append('Please enter a valid phone number (minimum 10 digits)')
-        
-        # Age validation
-        try:
-            age = int(data.get('age', 0))
-            if age < 1 or age > 120:
-                validation_errors.append('Age must be between 1 and 120 years')
-        except (ValueError, TypeError):
-            validation_errors.append('Age must be a valid number')
-        
-        # Gender validation
-        valid_genders = ['male', 'female', 'other']
-        gender = data.get('gender', '').lower().strip()
-        if gender and gender not in valid_genders:
-            validation_errors.append('Gender must be Male, Female, or Other')
-        
-        # Service type validation and mapping
-        service_mapping = {
-            'manual therapy': 'manual-therapy',
-            'physical therapy': 'physical-therapy',
-            'rehabilitation': 'rehabilitation',
-            'consultation': 'consultation',
-            'follow-up': 'follow-up',
-            'assessment': 'assessment'
-        }
-        
-        service_type_input = data.get('service_type', '').strip()
-        if not service_type_input:
-            validation_errors.append('Service type is required')
-        else:
-            # Map human-readable service names to model values
-            service_type = service_mapping.get(service_type_input.lower(), service_type_input.lower())
-            if service_type not in service_mapping.values():
-                validation_errors.append('Please select a valid service type. Available options: Manual Therapy, Physical Therapy, Rehabilitation, Consultation, Follow-up, Assessment')
-            else:
-                # Update the data with the correct service type format
-                data['service_type'] = service_type
-        
-        # Return validation errors if any
+        # One pass over the payload; returns every problem at once
+        data, validation_errors = booking.PUBLIC_BOOKING.validate(request.data)
         if validation_errors:
-            
             return Response({
                 'success': False,
                 'error': 'Please correct the following errors:',
                 'validation_errors': validation_errors,
                 'error_count': len(validation_errors),
-                'received_data': data
+                'received_data': request.data
             }, status=status.HTTP_400_BAD_REQUEST)
+        appointment_datetime = data['date']
         
-        # Enhanced date and time validation
-        try:
-            date_str = data['appointment_date'].strip()
-            time_str = data['appointment_time'].strip()
-            
-            # Validate date format
-            if not re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-                validation_errors.append('Appointment date must be in YYYY-MM-DD format')
-            
-            # Validate time format
-            if not re.match(r'^\d{2}:\d{2}$', time_str):
-                validation_errors.append('Appointment time must be in HH:MM format (24-hour)')
-            
-            # Check if validation errors exist before proceeding
-            if validation_errors:
-                return Response({
-                    'success': False,
-                    'error': 'Please correct the following errors:',
-                    'validation_errors': validation_errors,
-                    'error_count': len(validation_errors)
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Parse date and time
-            datetime_str = f"{date_str} {time_str}:00"
-            appointment_datetime = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
-            
-            # Make the datetime timezone-aware for comparison
-            appointment_datetime = timezone.make_aware(appointment_datetime)
-            
-            # Check if appointment is in the future
-            if appointment_datetime <= timezone.now():
-                validation_errors.append('Appointment date and time must be in the future')
-            
-            # Check if appointment is within reasonable range (not more than 6 months in future)
-            max_future_date = timezone.now() + timezone.timedelta(days=180)
-            if appointment_datetime > max_future_date:
-                validation_errors.append('Appointment cannot be scheduled more than 6 months in advance')
-            
-            # Check if appointment is during business hours (8 AM to 8 PM)
-            hour = appointment_datetime.hour
-            if hour < 8 or hour >= 20:
-                validation_errors.append('Appointments are only available between 8:00 AM and 8:00 PM')
-            
-            # Return validation errors if any
-            if validation_errors:
-                return Response({
-                    'success': False,
-                    'error': 'Please correct the following errors:',
-                    'validation_errors': validation_errors,
-                    'error_count': len(validation_errors)
-                }, status=status.HTTP_400_BAD_REQUEST)
-                
-        except ValueError as e:
+        # Check if this should be a guest appointment
+        is_guest = data['is_guest']
+
+        # Reject bookings that overlap an active appointment for the same patient
+        if is_guest:
+            conflicts = availability.find_conflicts(appointment_datetime, 60, guest_email=data['email'])
+        else:
+            existing_user = CustomUser.objects.filter(email=data['email']).first()
+            conflicts = availability.find_conflicts(appointment_datetime, 60, user=existing_user) if existing_user else []
+        if conflicts:
             return Response({
                 'success': False,
-                'error': 'Invalid date/time format. Please use YYYY-MM-DD for date and HH:MM for time (24-hour format)',
-                'example': 'Date: 2024-12-25, Time: 14:30'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if this should be a guest appointment
-        is_guest = data.get('is_guest', False)
+                'error': 'You already have an appointment at this time. Please choose another slot.',
+                'conflicting_dates': [apt.date.strftime('%Y-%m-%d %H:%M') for apt in conflicts]
+            }, status=status.HTTP_409_CONFLICT)
 
         
         if is_guest:
@@ -198,31 +87,18 @@ def public_appointment_booking(request):
                 guest_gender=data['gender'],
                 date=appointment_datetime,
                 service_type=data['service_type'],
-                note=f"Symptoms: {data.get('symptoms', '')}\n"
-                     f"Medical History: {data.get('medical_history', '')}\n"
-                     f"Previous Treatment: {data.get('previous_treatment', '')}\n"
-                     f"Special Requirements: {data.get('special_requirements', '')}\n"
-                     f"Insurance: {data.get('insurance', '')}\n"
-                     f"Urgency: {data.get('urgency', 'routine')}",
+                note=booking.booking_note(data),
                 status='scheduled',
                 duration=60  # Default 60 minutes
             )
             
-            # Send confirmation email to guest
+            # Queue confirmation email to guest (delivered by process_email_queue)
             try:
-                subject = 'Guest Appointment Confirmation - AL-BOQAI Center'
-                html_message = render_to_string('emails/guest_appointment_confirmation.html', {
-                    'appointment': appointment
-                })
-                plain_message = strip_tags(html_message)
-                
-                send_mail(
-                    subject=subject,
-                    message=plain_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[appointment.guest_email],
-                    html_message=html_message,
-                    fail_silently=False
+                OutboundEmail.enqueue_template(
+                    subject='Guest Appointment Confirmation - AL-BOQAI Center',
+                    template_name='emails/guest_appointment_confirmation.html',
+                    context={'appointment': appointment},
+                    to_email=appointment.guest_email,
                 )
             except Exception as e:
                 # Log error silently for production
@@ -283,32 +159,18 @@ def public_appointment_booking(request):
                 is_guest=False,
                 date=appointment_datetime,
                 service_type=data['service_type'],
-                note=f"Symptoms: {data.get('symptoms', '')}\n"
-                     f"Medical History: {data.get('medical_history', '')}\n"
-                     f"Previous Treatment: {data.get('previous_treatment', '')}\n"
-                     f"Special Requirements: {data.get('special_requirements', '')}\n"
-                     f"Insurance: {data.get('insurance', '')}\n"
-                     f"Urgency: {data.get('urgency', 'routine')}",
+                note=booking.booking_note(data),
                 status='scheduled',
                 duration=60  # Default 60 minutes
             )
             
-            # Send confirmation email
+            # Queue confirmation email (delivered by process_email_queue)
             try:
-                subject = 'Appointment Confirmation - AL-BOQAI Center'
-                html_message = render_to_string('emails/appointment_confirmation.html', {
-                    'appointment': appointment,
-                    'user': user
-                })
-                plain_message = strip_tags(html_message)
-                
-                send_mail(
-                    subject=subject,
-                    message=plain_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[user.email],
-                    html_message=html_message,
-                    fail_silently=False
+                OutboundEmail.enqueue_template(
+                    subject='Appointment Confirmation - AL-BOQAI Center',
+                    template_name='emails/appointment_confirmation.html',
+                    context={'appointment': appointment, 'user': user},
+                    to_email=user.email,
                 )
             except Exception as e:
                 # Log error silently for production
@@ -334,9 +196,8 @@ def public_appointment_booking(request):
                 }
             }, status=status.HTTP_201_CREATED)
         
-    except Exception as e:
-        # Log error silently for production
-        pass
+    except Exception:
+        logger.exception('Public appointment booking failed')
         
         return Response({
             'success': False,
@@ -355,6 +216,7 @@ def public_appointment_booking(request):
 # Guest Appointment Lookup Endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([throttling.GuestLookupThrottle])
 def guest_appointment_lookup(request):
     """Lookup guest appointments using guest ID and email"""
     try:
@@ -368,37 +230,17 @@ def guest_appointment_lookup(request):
                 'error': 'Both guest_id and email are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Find the guest appointment
-        try:
-            appointment = Appointment.objects.get(
-                guest_id=guest_id,
-                guest_email=email,
-                is_guest=True
-            )
-        except Appointment.DoesNotExist:
+        # Repeat lookups are served from the cache until the appointment changes
+        appointment = guest_lookup.get_appointment(guest_id, email)
+        if appointment is None:
             return Response({
                 'success': False,
                 'error': 'No guest appointment found with the provided ID and email'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Return appointment details
         return Response({
             'success': True,
-            'appointment': {
-                'id': appointment.id,
-                'guest_id': appointment.guest_id,
-                'guest_first_name': appointment.guest_first_name,
-                'guest_last_name': appointment.guest_last_name,
-                'guest_email': appointment.guest_email,
-                'guest_phone': appointment.guest_phone,
-                'guest_age': appointment.guest_age,
-                'guest_gender': appointment.guest_gender,
-                'date': appointment.date.strftime('%Y-%m-%d %H:%M'),
-                'service_type': appointment.service_type,
-                'status': appointment.status,
-                'note': appointment.note,
-                'created_at': appointment.created_at.strftime('%Y-%m-%d %H:%M')
-            }
+            'appointment': appointment
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -407,6 +249,53 @@ def guest_appointment_lookup(request):
             'error': f'Failed to lookup appointment: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Guest Appointment History Endpoint
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([throttling.GuestLookupThrottle])
+def guest_appointment_history(request):
+    """
+    Every guest appointment booked under an email, newest first, in cursor
+    pages (?cursor= from `next`, ?page_size= up to 100). Any one of the guest IDs issued to that
+    email proves the guest owns it. The email stays in the POST body rather
+    than the URL so it does not end up in access logs.
+    """
+    try:
+        data = request.data
+        guest_id = data.get('guest_id')
+        email = data.get('email')
+        
+        if not guest_id or not email:
+            return Response({
+                'success': False,
+                'error': 'Both guest_id and email are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if guest_lookup.get_appointment(guest_id, email) is None:
+            return Response({
+                'success': False,
+                'error': 'No guest appointment found with the provided ID and email'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        # One range scan of the (guest_email, date) index per page
+        paginator = GuestHistoryCursorPagination()
+        page = paginator.paginate_queryset(Appointment.objects.filter(is_guest=True, guest_email=email), request)
+        return Response({
+            'success': True,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': GuestAppointmentSerializer(page, many=True).data
+        }, status=status.HTTP_200_OK)
+        
+    except NotFound:
+        # A bad ?cursor= is the client's mistake; DRF answers it with 404
+        raise
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Failed to load appointment history: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # Guest Appointment Update Endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -436,11 +325,17 @@ def guest_appointment_update(request):
                 'error': 'No guest appointment found with the provided ID and email'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Update allowed fields
-        allowed_updates = ['guest_phone', 'note']
-        for field in allowed_updates:
-            if field in data:
-                setattr(appointment, field, data[field])
+        # Only the phone number and note may change; both are checked before anything is written
+        updates, validation_errors = booking.GUEST_UPDATE.validate(data)
+        if validation_errors:
+            return Response({
+                'success': False,
+                'error': 'Please correct the following errors:',
+                'validation_errors': validation_errors,
+                'error_count': len(validation_errors)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        for field, value in updates.items():
+            setattr(appointment, field, value)
         
         appointment.save()
         
@@ -457,6 +352,59 @@ def guest_appointment_update(request):
             'error': f'Failed to update appointment: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('therapist', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=True, description='Therapist user ID'),
+        openapi.Parameter('date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date', required=True, description='Day to check (YYYY-MM-DD)'),
+        openapi.Parameter('duration', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Slot length in minutes (default 60)'),
+    ],
+    operation_description="Free appointment slots for a therapist within business hours"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def therapist_availability(request):
+    """Return the free slots of a therapist on one day"""
+    therapist_id = request.query_params.get('therapist')
+    date_str = request.query_params.get('date')
+    if not therapist_id or not date_str:
+        return Response({
+            'success': False,
+            'error': 'Both therapist and date are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d').date()
+        duration = int(request.query_params.get('duration', 60))
+        if not 15 <= duration <= 480:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Use YYYY-MM-DD for date and a duration between 15 and 480 minutes'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    therapist = CustomUser.objects.filter(id=therapist_id, role='therapist').first()
+    if therapist is None:
+        return Response({
+            'success': False,
+            'error': 'Therapist not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    slots, busy = availability.free_slots(therapist, day, duration=duration)
+    return Response({
+        'success': True,
+        'therapist': therapist.id,
+        'date': day.isoformat(),
+        'duration': duration,
+        'business_hours': {
+            'start': availability.BUSINESS_START.strftime('%H:%M'),
+            'end': availability.BUSINESS_END.strftime('%H:%M'),
+        },
+        'slots': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots],
+        'busy': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in busy],
+    })
+
 # Health Check Endpoint
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -516,8 +464,97 @@ def health_check(request):
         return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
+# Dashboard Statistics Endpoint
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dashboard_stats(request, section='overview'):
+    """
+    Aggregated counts for the admin dashboard and reports.
+    Optional ?start=YYYY-MM-DD&end=YYYY-MM-DD bounds (defaults to the last 30 days).
+    Clinic-wide figures, so only staff and admins may read them.
+    """
+    user = request.user
+    if not user.is_authenticated or not (user.is_staff or user.role == 'admin'):
+        return Response({
+            'success': False,
+            'error': 'Only clinic administrators can view dashboard statistics'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    section = section.replace('-', '_')
+    if section != 'overview' and section not in stats.SECTIONS:
+        return Response({
+            'success': False,
+            'error': f'Unknown statistics section: {section}'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        start, end = stats.parse_range(request.query_params.get('start'), request.query_params.get('end'))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Invalid date range. Use YYYY-MM-DD for start and end, with start before end'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(stats.get_stats(section, start, end))
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description='Search text; every word is matched as a prefix'),
+        openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Comma-separated result types: user, appointment, testimonial'),
+        openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Page number (default 1)'),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Results per page (default 20)'),
+    ],
+    operation_description="Ranked full-text search over users, appointments and testimonials"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_view(request):
+    """
+    Full-text search across the clinic. Staff and therapists see every
+    match; patients see approved testimonials and their own records.
+    """
+    query = request.query_params.get('q', '').strip()
+    kinds = [kind.strip() for kind in request.query_params.get('type', '').split(',') if kind.strip()]
+    if not search.terms(query):
+        return Response({
+            'success': False,
+            'error': 'Enter at least one word to search for'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if any(kind not in search.KINDS for kind in kinds):
+        return Response({
+            'success': False,
+            'error': f"Unknown result type. Use any of: {', '.join(search.KINDS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+        page_size = min(max(1, int(request.query_params.get('page_size', settings.REST_FRAMEWORK['PAGE_SIZE']))),
+                        getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'page and page_size must be numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    total, documents = search.search(query, user=request.user, kinds=kinds, offset=(page - 1) * page_size, limit=page_size)
+    return Response({
+        'success': True,
+        'query': query,
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'has_next': page * page_size < total,
+        'results': [
+            {'type': document.kind, 'id': document.object_id, 'title': document.title, 'rank': document.rank}
+            for document in documents
+        ],
+    })
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([throttling.ResendVerificationThrottle])
 def resend_verification(request):
     """Standalone function for resending verification emails"""
     serializer = ResendVerificationSerializer(data=request.data)
@@ -555,8 +592,10 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]  # Temporarily allow access for testing
     filterset_class = CustomUserFilter
     search_fields = ['username', 'email', 'first_name', 'last_name']
+    search_document_kind = 'user'
     ordering_fields = ['username', 'email', 'created_at']
-    ordering = ['username']
+    ordering = ['-created_at']
+    pagination_class = CreatedAtCursorPagination
 
     def get_permissions(self):
         """Override permissions for specific actions - ALLOW ALL FOR TESTING"""
@@ -573,7 +612,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             user.is_email_verified = True
             user.is_active = True
             user.save()
-            print(f"Auto-verified new user {user.username} for development")
+            logger.debug("Auto-verified new user %s for development", user.username)
             
             return Response({
                 'success': True,
@@ -619,16 +658,6 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                 'message': 'The requested user does not exist'
             }, status=404)
 
-    def list(self, request, *args, **kwargs):
-        """List users with proper permissions"""
-        queryset = self.get_queryset()
-        
-        if not queryset.exists():
-            return Response({'message': 'No users found or access denied'}, status=200)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -646,7 +675,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         operation_description="Authenticate user and return user data with token"
     )
     @method_decorator(csrf_exempt)
-    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny], throttle_classes=[throttling.LoginThrottle])
     def login(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -654,65 +683,42 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         if not username or not password:
             return Response({'error': 'Username and password are required'}, status=400)
         
-        # First, check if user exists and get their status
-        try:
-            user = CustomUser.objects.get(username=username)
-            
-            # For development/testing, auto-verify users if they're not verified
-            if not user.is_email_verified:
-                user.is_email_verified = True
-                user.is_active = True
-                user.save()
-                print(f"Auto-verified user {username} for development")
-            
-            # Check if account is active
-            if not user.is_active:
-                return Response({
-                    'error': 'Account is not active. Please verify your email first.',
-                    'needs_verification': True,
-                    'email': user.email
-                }, status=401)
-            
-            # Now try to authenticate
-            authenticated_user = authenticate(request, username=username, password=password)
-            if authenticated_user is not None:
-                login(request, authenticated_user)
-                
-                # Return full user data for profile display
-                user_data = {
-                    'id': authenticated_user.id,
-                    'username': authenticated_user.username,
-                    'email': authenticated_user.email,
-                    'first_name': authenticated_user.first_name,
-                    'last_name': authenticated_user.last_name,
-                    'phone_number': authenticated_user.phone_number,
-                    'gender': authenticated_user.gender,
-                    'date_of_birth': authenticated_user.date_of_birth.isoformat() if authenticated_user.date_of_birth else None,
-                    'address': authenticated_user.address,
-                    'city': authenticated_user.city,
-                    'blood_type': authenticated_user.blood_type,
-                    'emergency_contact': authenticated_user.emergency_contact,
-                    'medical_history': authenticated_user.medical_history,
-                    'treatment_reason': authenticated_user.treatment_reason,
-                    'condition_description': authenticated_user.condition_description,
-                    'role': authenticated_user.role,
-                    'created_at': authenticated_user.created_at.isoformat() if authenticated_user.created_at else None
-                }
-                
-                return Response({
-                    'success': True, 
-                    'user_id': authenticated_user.id,
-                    'username': authenticated_user.username,
-                    'email': authenticated_user.email,
-                    'role': authenticated_user.role,
-                    'user': user_data  # Include full user data
-                })
-            else:
-                return Response({'error': 'Invalid password. Please check your password and try again.'}, status=401)
-                
-        except CustomUser.DoesNotExist:
-            # Don't reveal if username exists or not for security
+        # One query for the user; the password is then checked on this same object
+        user = CustomUser.objects.filter(username=username).first()
+        if user is None:
+            # Run the hasher anyway so response time does not reveal whether the username exists
+            CustomUser().set_password(password)
             return Response({'error': 'Invalid credentials. Please check your username and password.'}, status=401)
+        
+        # For development/testing, auto-verify users if they're not verified
+        if not user.is_email_verified:
+            user.is_email_verified = True
+            user.is_active = True
+            user.save(update_fields=['is_email_verified', 'is_active', 'updated_at'])
+            logger.debug("Auto-verified user %s for development", username)
+        
+        # Check if account is active
+        if not user.is_active:
+            return Response({
+                'error': 'Account is not active. Please verify your email first.',
+                'needs_verification': True,
+                'email': user.email
+            }, status=401)
+        
+        # check_password() also rehashes the stored password if the work factor changed
+        if not user.check_password(password):
+            return Response({'error': 'Invalid password. Please check your password and try again.'}, status=401)
+        
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+        
+        return Response({
+            'success': True, 
+            'user_id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': user.role,
+            'user': profile_cache.get_profile(user)  # Include full user data; also warms the cache for the dashboard
+        })
 
     @swagger_auto_schema(
         responses={
@@ -730,29 +736,9 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     def profile(self, request):
         """Get current user's profile data"""
         if request.user.is_authenticated:
-            user = request.user
-            user_data = {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'phone_number': user.phone_number,
-                'gender': user.gender,
-                'date_of_birth': user.date_of_birth.isoformat() if user.date_of_birth else None,
-                'address': user.address,
-                'city': user.city,
-                'blood_type': user.blood_type,
-                'emergency_contact': user.emergency_contact,
-                'medical_history': user.medical_history,
-                'treatment_reason': user.treatment_reason,
-                'condition_description': user.condition_description,
-                'role': user.role,
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            }
             return Response({
                 'success': True,
-                'user': user_data
+                'user': profile_cache.get_profile(request.user)
             })
         else:
             return Response({
@@ -760,6 +746,53 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                 'error': 'User not authenticated'
             }, status=401)
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description='Name, email or phone; typos and Arabic/English spellings are tolerated'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description=f'Maximum results (default 10, at most {fuzzy.MAX_RESULTS})'),
+        ],
+        operation_description="Similarity-ranked patient autocomplete for clinic staff"
+    )
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Fuzzy patient finder for the front desk; best matches first"""
+        user = request.user
+        if not user.is_authenticated or not (user.is_staff or user.role in ('admin', 'therapist')):
+            return Response({
+                'success': False,
+                'error': 'Only clinic staff can look up patients'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.get('q', '').strip()
+        if not fuzzy.words(query):
+            return Response({
+                'success': False,
+                'error': 'Enter a name, email or phone number to look up'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(1, int(request.query_params.get('limit', 10))), fuzzy.MAX_RESULTS)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'limit must be a number'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'query': query,
+            'results': [
+                {
+                    'id': patient.id,
+                    'username': patient.username,
+                    'full_name': patient.get_full_name(),
+                    'email': patient.email,
+                    'phone_number': patient.phone_number,
+                    'score': score,
+                }
+                for patient, score in fuzzy.lookup(query, limit=limit)
+            ],
+        })
+
     @swagger_auto_schema(
         request_body=VerifyEmailSerializer,
         responses={
@@ -780,38 +813,19 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             # Clean and normalize the verification code
             verification_code = str(verification_code).strip()
             
-
-            
-            # Find verification by code or token
+            # Find verification by token, or by code scoped to the email it was sent to
             try:
-                if token:
-                    # Try to find by token first
-                    verification = EmailVerification.objects.get(
-                        token=token,
-                        is_used=False
+                verification = EmailVerification.find_open(
+                    'registration',
+                    email=serializer.validated_data.get('email'),
+                    verification_code=verification_code,
+                    token=token,
+                )
+                if verification is None:
+                    return Response(
+                        {'error': 'Invalid verification code. Please check the code and try again.'},
+                        status=status.HTTP_404_NOT_FOUND
                     )
-
-                else:
-                    # Try to find by verification code and email (if provided) or just code
-                    email = serializer.validated_data.get('email')
-                    if email:
-                        verification = EmailVerification.objects.get(
-                            verification_code=verification_code,
-                            email=email,
-                            verification_type='registration',
-                            is_used=False
-                        )
-
-                    else:
-                        # Try to find by verification code only (for registration verifications)
-                        verification = EmailVerification.objects.get(
-                            verification_code=verification_code,
-                            verification_type='registration',
-                            is_used=False
-                        )
-
-                
-
                 
                 if verification.is_expired():
                     return Response(
@@ -829,7 +843,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                 user.save()
                 
                 # Log user in
-                login(request, user)
+                login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
                 
                 return Response({
                     'success': True,
@@ -838,19 +852,6 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                     'user': CustomUserSerializer(user).data
                 })
                 
-            except EmailVerification.DoesNotExist:
-                # Try to find any verification for debugging
-                all_verifications = EmailVerification.objects.filter(
-                    verification_type='registration',
-                    is_used=False
-                ).order_by('-created_at')
-                
-
-                
-                return Response(
-                    {'error': 'Invalid verification code. Please check the code and try again.'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
             except Exception as e:
                 return Response(
                     {'error': 'Verification error occurred. Please try again.'},
@@ -868,7 +869,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         },
         operation_description="Request password reset via email"
     )
-    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny], throttle_classes=[throttling.PasswordResetThrottle])
     def request_password_reset(self, request):
         serializer = RequestPasswordResetSerializer(data=request.data)
         if serializer.is_valid():
@@ -915,46 +916,37 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             token = serializer.validated_data.get('token')
             new_password = serializer.validated_data['new_password']
             
-            # Find password reset verification
-            verification_query = Q(
+            # Find password reset verification by token, or by code scoped to the email
+            verification = EmailVerification.find_open(
+                'password_reset',
+                email=serializer.validated_data.get('email'),
                 verification_code=verification_code,
-                verification_type='password_reset',
-                is_used=False
+                token=token,
             )
-            if token:
-                verification_query |= Q(
-                    token=token,
-                    verification_type='password_reset',
-                    is_used=False
-                )
-            
-            try:
-                verification = EmailVerification.objects.get(verification_query)
-                
-                if verification.is_expired():
-                    return Response(
-                        {'error': 'Verification code has expired. Please request a new password reset.'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Mark verification as used
-                verification.mark_as_used()
-                
-                # Reset user password
-                user = verification.user
-                user.set_password(new_password)
-                user.save()
-                
-                return Response({
-                    'success': True,
-                    'message': 'Password reset successfully. You can now login with your new password.'
-                })
-                
-            except EmailVerification.DoesNotExist:
+            if verification is None:
                 return Response(
                     {'error': 'Invalid verification code.'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            
+            if verification.is_expired():
+                return Response(
+                    {'error': 'Verification code has expired. Please request a new password reset.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Mark verification as used
+            verification.mark_as_used()
+            
+            # Reset user password
+            user = verification.user
+            user.set_password(new_password)
+            user.save()
+            
+            return Response({
+                'success': True,
+                'message': 'Password reset successfully. You can now login with your new password.'
+            })
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -966,7 +958,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         },
         operation_description="Resend verification email"
     )
-    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny], throttle_classes=[throttling.ResendVerificationThrottle])
     def resend_verification(self, request):
         serializer = ResendVerificationSerializer(data=request.data)
         if serializer.is_valid():
@@ -997,6 +989,9 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('include', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['profile'], description='Also return the full profile, saving a second request'),
+        ],
         responses={
             200: CustomUserSerializer,
             401: ErrorResponseSerializer,
@@ -1009,7 +1004,8 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         try:
             user = request.user
             if user.is_authenticated:
-                return Response({
+                # request.user comes from the per-user cache, so this needs no queries
+                data = {
                     'success': True,
                     'user_id': user.id,
                     'username': user.username,
@@ -1019,7 +1015,10 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                     'last_name': user.last_name,
                     'is_active': user.is_active,
                     'is_email_verified': user.is_email_verified
-                })
+                }
+                if 'profile' in request.query_params.get('include', '').split(','):
+                    data['profile'] = profile_cache.get_profile(user)
+                return Response(data)
             else:
                 return Response({'error': 'User not authenticated'}, status=401)
         except Exception as e:
@@ -1028,13 +1027,36 @@ class CustomUserViewSet(viewsets.ModelViewSet):
 
 class AppointmentViewSet(viewsets.ModelViewSet):
     """ViewSet for managing appointments"""
-    queryset = Appointment.objects.all()
+    queryset = Appointment.objects.select_related('user', 'therapist')
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.AllowAny]
     filterset_class = AppointmentFilter
     search_fields = ['user__username', 'user__email', 'service_type', 'status']
+    search_document_kind = 'appointment'
     ordering_fields = ['date', 'created_at', 'updated_at']
-    ordering = ['-date', '-created_at']
+    ordering = ['-date']
+    pagination_class = AppointmentCursorPagination
+
+    def get_serializer_class(self):
+        # Lists use the compact representation; detail views keep the nested profiles
+        if self.action == 'list':
+            return AppointmentListSerializer
+        return AppointmentSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        """Apply the ?fields= and ?expand= selectors on read requests"""
+        if self.request is not None and self.request.method == 'GET':
+            params = self.request.query_params
+            if params.get('fields'):
+                kwargs['fields'] = [name.strip() for name in params['fields'].split(',') if name.strip()]
+            if params.get('expand') and self.get_serializer_class() is AppointmentListSerializer:
+                kwargs['expand'] = [name.strip() for name in params['expand'].split(',')]
+        return super().get_serializer(*args, **kwargs)
+
+    @method_decorator(idempotency.idempotent('appointment-create'))
+    def create(self, request, *args, **kwargs):
+        """Create an appointment; retries sent with the same Idempotency-Key replay the first response"""
+        return super().create(request, *args, **kwargs)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -1043,6 +1065,16 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user_id=user_id)
         return queryset
 
+    @swagger_auto_schema(
+        operation_description="Count the appointments matching the list filters, grouped by status"
+    )
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        """Totals for the list filters; cursor pages carry no count"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        by_status = dict(queryset.values_list('status').annotate(count=Count('id')))
+        return Response({'count': sum(by_status.values()), 'by_status': by_status})
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -1103,17 +1135,33 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                     'error': 'Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SS)'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check for conflicts with other appointments
-            conflicting_appointments = Appointment.objects.filter(
+            new_duration = appointment.duration
+            if request.data.get('new_duration') not in (None, ''):
+                try:
+                    new_duration = int(request.data['new_duration'])
+                    if not 15 <= new_duration <= 480:
+                        raise ValueError
+                except (TypeError, ValueError):
+                    return Response({
+                        'success': False,
+                        'error': 'Duration must be a whole number of minutes between 15 and 480'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Check for overlapping appointments for the patient and the therapist
+            conflicts = availability.find_conflicts(
+                new_date,
+                new_duration,
+                therapist=appointment.therapist,
                 user=appointment.user,
-                date=new_date,
-                status__in=['scheduled', 'confirmed']
-            ).exclude(id=appointment.id)
+                guest_email=appointment.guest_email if appointment.is_guest else None,
+                exclude_id=appointment.id,
+            )
             
-            if conflicting_appointments.exists():
+            if conflicts:
                 return Response({
                     'success': False,
-                    'error': 'There is already an appointment scheduled at this time'
+                    'error': 'There is already an appointment scheduled at this time',
+                    'conflicting_appointments': [apt.id for apt in conflicts]
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Update appointment
@@ -1124,8 +1172,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             # Update optional fields if provided
             if 'new_service_type' in request.data:
                 appointment.service_type = request.data['new_service_type']
-            if 'new_duration' in request.data:
-                appointment.duration = request.data['new_duration']
+            appointment.duration = new_duration
             if 'new_note' in request.data:
                 appointment.note = request.data['new_note']
             
@@ -1159,16 +1206,90 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 'error': f'Failed to reschedule appointment: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _is_admin(self, user):
+        return user.is_staff or getattr(user, 'role', None) == 'admin'
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['csv', 'ndjson'], description='Export format (default csv)'),
+        ],
+        operation_description="Stream every matching appointment as CSV or NDJSON (admin only). Accepts the list filters."
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def export(self, request):
+        """Stream appointments without loading the table into memory"""
+        if not self._is_admin(request.user):
+            return Response({
+                'success': False,
+                'error': 'Only administrators can export appointments'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        output = request.query_params.get('output', 'csv')
+        if output not in importexport.EXPORT_FORMATS:
+            return Response({
+                'success': False,
+                'error': f"Unsupported output '{output}'. Use csv or ndjson"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        response = StreamingHttpResponse(
+            importexport.stream_export(queryset, output),
+            content_type=importexport.EXPORT_FORMATS[output],
+        )
+        filename = f"appointments-{timezone.localdate():%Y%m%d}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='CSV or NDJSON file'),
+            openapi.Parameter('input', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['csv', 'ndjson'], description='File format (default: from the file extension)'),
+            openapi.Parameter('dry_run', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Validate only'),
+        ],
+        operation_description="Bulk import appointments from CSV or NDJSON (admin only)"
+    )
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAuthenticated])
+    def bulk_import(self, request):
+        """Validate and insert appointments in batches with bulk_create"""
+        if not self._is_admin(request.user):
+            return Response({
+                'success': False,
+                'error': 'Only administrators can import appointments'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'success': False,
+                'error': 'Upload the appointments as a multipart "file" field'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        input_format = request.query_params.get('input') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if input_format not in importexport.EXPORT_FORMATS:
+            return Response({
+                'success': False,
+                'error': f"Unsupported input '{input_format}'. Use csv or ndjson"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        summary = importexport.import_appointments(upload.file, input_format=input_format, dry_run=dry_run)
+        return Response({
+            'success': summary['invalid'] == 0,
+            'dry_run': dry_run,
+            **summary
+        }, status=status.HTTP_200_OK if dry_run or not summary['created'] else status.HTTP_201_CREATED)
+
 
 class TreatmentPlanViewSet(viewsets.ModelViewSet):
     """ViewSet for managing treatment plans"""
-    queryset = TreatmentPlan.objects.all()
+    queryset = TreatmentPlan.objects.select_related('appointment__user', 'appointment__therapist')
     serializer_class = TreatmentPlanSerializer
     permission_classes = [permissions.AllowAny]
     filterset_class = TreatmentPlanFilter
     search_fields = ['plan_details', 'appointment__user__username']
     ordering_fields = ['created_at', 'duration_weeks']
     ordering = ['-created_at']
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -1177,13 +1298,43 @@ class TreatmentPlanViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(appointment__user_id=user_id)
         return queryset
 
+    @swagger_auto_schema(
+        request_body=RecordSessionSerializer,
+        responses={
+            200: TreatmentPlanSerializer,
+            400: ErrorResponseSerializer,
+            403: ErrorResponseSerializer,
+        },
+        operation_description="Check in completed sessions for a treatment plan (therapist or admin)"
+    )
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def record_session(self, request, pk=None):
+        """Increment completed sessions atomically and return the updated plan"""
+        if request.user.role not in ('therapist', 'admin') and not request.user.is_staff:
+            return Response({
+                'success': False,
+                'error': 'Only therapists and administrators can record sessions'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = RecordSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        plan = self.get_object()
+        plan.record_session(serializer.validated_data['count'])
+        return Response({
+            'success': True,
+            'treatment_plan': TreatmentPlanSerializer(plan).data
+        })
+
 
 class TestimonialViewSet(viewsets.ModelViewSet):
     """ViewSet for managing testimonials"""
-    queryset = Testimonial.objects.all()
+    queryset = Testimonial.objects.select_related('user')
     serializer_class = TestimonialSerializer
     permission_classes = [permissions.AllowAny]
-    search_fields = ['user__username', 'content', 'rating']
+    search_fields = ['user__username', 'testimonial_text', 'rating']
+    search_document_kind = 'testimonial'
     ordering_fields = ['created_at', 'rating']
     ordering = ['-created_at', '-rating']
 
@@ -1194,6 +1345,36 @@ class TestimonialViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_approved=True)
         return queryset
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('featured', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Only featured testimonials'),
+            openapi.Parameter('treatment_type', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Filter by treatment type'),
+        ],
+        responses={200: PublicTestimonialSerializer(many=True), 304: 'Not modified'},
+        operation_description="Cached public feed of approved testimonials with ETag/Last-Modified support"
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny], authentication_classes=[])
+    def public(self, request):
+        """
+        Approved testimonials for the public site. Served from the cache and
+        answered with 304 when the client's ETag or Last-Modified is current,
+        so repeat views do not touch the database.
+        """
+        feed = testimonial_feed.get_feed(
+            featured=request.query_params.get('featured', '').lower() in ('1', 'true', 'yes'),
+            treatment_type=request.query_params.get('treatment_type'),
+        )
+        etag = quote_etag(feed['etag'])
+        last_modified = int(feed['last_modified'])
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(feed['data'])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
+
 
 class HomeView(viewsets.ViewSet):
     """Simple home view for the root URL"""
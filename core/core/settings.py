@@ -64,6 +64,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
     'x-session-id',
 ]
 
@@ -73,7 +74,7 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
     r"^http://localhost:\d+$",
     r"^http://127\.0\.0\.1:\d+$",
 ]
-CORS_EXPOSE_HEADERS = ['content-type', 'x-csrftoken', 'x-session-id']
+CORS_EXPOSE_HEADERS = ['content-type', 'x-csrftoken', 'x-session-id', 'idempotent-replayed']
 CORS_PREFLIGHT_MAX_AGE = 86400  # 24 hours
 
 
@@ -108,6 +109,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [   
     'django_prometheus.middleware.PrometheusBeforeMiddleware',
+    'clinic.profiling.QueryProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -177,6 +179,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Session users are loaded from the per-user cache instead of the database.
+# ModelBackend stays listed so sessions created before the switch still resolve;
+# CachedModelBackend ends a failed login itself, so passwords are hashed once.
+AUTHENTICATION_BACKENDS = [
+    'clinic.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Password hashing: existing hashes are upgraded to PASSWORD_HASH_ITERATIONS on the next login
+PASSWORD_HASHERS = [
+    'clinic.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=0, cast=int)  # 0 = Django's default
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -253,6 +274,7 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
         'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
             'timeout': 20,
         }
     } if DEBUG else {
@@ -299,7 +321,7 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'clinic.filters.IndexedSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
@@ -353,6 +375,65 @@ EMAIL_USE_SSL = False
 EMAIL_VERIFICATION_REQUIRED = True
 EMAIL_VERIFICATION_EXPIRY_HOURS = 24
 PASSWORD_RESET_EXPIRY_HOURS = 2
+EMAIL_VERIFICATION_PURGE_BATCH_SIZE = 1000  # rows per batch in `manage.py purge_email_verifications`
+
+# Outbound Email Queue (drained by `manage.py process_email_queue`)
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_BACKOFF_SECONDS = 60
+EMAIL_QUEUE_LOCK_TIMEOUT_MINUTES = 10
+
+# Appointment reminders (`manage.py send_appointment_reminders`)
+REMINDER_CHUNK_SIZE = 100
+
+# Dashboard statistics cache (invalidated on writes)
+STATS_CACHE_TIMEOUT = 300
+
+# Per-user session/profile cache (invalidated when the user is saved)
+USER_PROFILE_CACHE_TIMEOUT = 900
+
+# Guest appointment lookups (invalidated when the appointment is saved)
+GUEST_LOOKUP_CACHE_TIMEOUT = 120
+
+# Public testimonial feed (invalidated on writes)
+TESTIMONIAL_FEED_CACHE_TIMEOUT = 3600
+TESTIMONIAL_FEED_LIMIT = 100
+
+# Appointment import/export
+APPOINTMENT_EXPORT_CHUNK_SIZE = 2000
+APPOINTMENT_IMPORT_BATCH_SIZE = 1000
+
+# Therapist availability
+AVAILABILITY_SLOT_MINUTES = 30
+APPOINTMENT_MAX_DURATION_MINUTES = 480
+
+# Full-text search (see clinic/search.py): 'auto' picks the backend from the database
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='auto')
+SEARCH_MAX_PAGE_SIZE = 50
+# Lowest similarity (0-1) a patient needs to appear in /api/users/autocomplete/
+PATIENT_LOOKUP_MIN_SCORE = config('PATIENT_LOOKUP_MIN_SCORE', default=0.5, cast=float)
+
+# Idempotency-Key replay window for booking POSTs (see clinic/idempotency.py), and how
+# long a key stays claimed by a request that is still running
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Sliding-window rate limits for the public endpoints (see clinic/throttling.py), as
+# "requests/period" per client IP and per request field
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMITS = {
+    'public-booking': {'ip': '20/hour', 'email': '5/hour'},
+    'guest-lookup': {'ip': '60/hour', 'guest_id': '10/minute', 'email': '20/hour'},
+    'resend-verification': {'ip': '20/hour', 'email': '5/hour'},
+    'login': {'ip': '30/minute', 'username': '10/minute'},
+    'password-reset': {'ip': '20/hour', 'email': '5/hour'},
+}
+
+# Request profiler (see clinic/profiling.py and `manage.py profile_report`)
+QUERY_PROFILER_ENABLED = config('QUERY_PROFILER_ENABLED', default=False, cast=bool)
+QUERY_PROFILER_SAMPLE_RATE = config('QUERY_PROFILER_SAMPLE_RATE', default=1.0, cast=float)
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = 5
+PERFORMANCE_LOG_FILE = BASE_DIR / 'logs' / 'performance.log'
 
 # Logging Configuration
 LOGGING = {
@@ -368,7 +449,7 @@ LOGGING = {
             'style': '{',
         },
         'json': {
-            'format': '{"timestamp": "%(asctime)s", "level": "%(levelname)s", "module": "%(module)s", "message": "%(message)s"}',
+            '()': 'clinic.profiling.JsonFormatter',
         },
     },
     'handlers': {
@@ -396,7 +477,7 @@ LOGGING = {
         'performance_file': {
             'level': 'INFO',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': BASE_DIR / 'logs' / 'performance.log',
+            'filename': PERFORMANCE_LOG_FILE,
             'maxBytes': config('MAX_LOG_SIZE', default=10*1024*1024, cast=int),
             'backupCount': config('LOG_BACKUP_COUNT', default=5, cast=int),
             'formatter': 'json',
@@ -4,6 +4,7 @@ Simplified Django settings for development integration testing.
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,6 +47,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
 # Additional CORS settings for development
@@ -56,7 +58,7 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
 ]
 
 # Force CORS headers to be sent
-CORS_EXPOSE_HEADERS = ['content-type', 'x-csrftoken']
+CORS_EXPOSE_HEADERS = ['content-type', 'x-csrftoken', 'idempotent-replayed']
 CORS_PREFLIGHT_MAX_AGE = 86400  # 24 hours
 CORS_ORIGIN_ALLOW_ALL = True  # Alternative setting
 
@@ -99,6 +101,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [   
+    'clinic.profiling.QueryProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -134,6 +137,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts: a deferred transaction that
+            # reads and then writes fails with "database is locked" instead of waiting
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than the in-memory default, so the concurrency tests' threads
+        # open real connections that wait on each other's locks. One per process, so
+        # parallel runs and checkouts never share it.
+        'TEST': {
+            'NAME': os.path.join(tempfile.gettempdir(), f'clinic-test-{os.getpid()}.sqlite3'),
+        },
     }
 }
 
@@ -153,6 +168,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Session users are loaded from the per-user cache instead of the database.
+# ModelBackend stays listed so sessions created before the switch still resolve;
+# CachedModelBackend ends a failed login itself, so passwords are hashed once.
+AUTHENTICATION_BACKENDS = [
+    'clinic.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Password hashing: existing hashes are upgraded to PASSWORD_HASH_ITERATIONS on the next login
+PASSWORD_HASHERS = [
+    'clinic.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = 0  # 0 = Django's default
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -186,7 +220,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'clinic.filters.IndexedSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
 }
@@ -204,15 +238,82 @@ DEFAULT_FROM_EMAIL = 'AL-BOQAI Center <albouqaiworld@gmail.com>'
 EMAIL_VERIFICATION_REQUIRED = True  # Re-enabled
 EMAIL_VERIFICATION_EXPIRY_HOURS = 24
 PASSWORD_RESET_EXPIRY_HOURS = 2
+EMAIL_VERIFICATION_PURGE_BATCH_SIZE = 1000  # rows per batch in `manage.py purge_email_verifications`
+
+# Outbound Email Queue (drained by `manage.py process_email_queue`)
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_BACKOFF_SECONDS = 60
+EMAIL_QUEUE_LOCK_TIMEOUT_MINUTES = 10
+
+# Appointment reminders (`manage.py send_appointment_reminders`)
+REMINDER_CHUNK_SIZE = 100
+
+# Dashboard statistics cache (invalidated on writes)
+STATS_CACHE_TIMEOUT = 300
+
+# Per-user session/profile cache (invalidated when the user is saved)
+USER_PROFILE_CACHE_TIMEOUT = 900
+
+# Guest appointment lookups (invalidated when the appointment is saved)
+GUEST_LOOKUP_CACHE_TIMEOUT = 120
+
+# Public testimonial feed (invalidated on writes)
+TESTIMONIAL_FEED_CACHE_TIMEOUT = 3600
+TESTIMONIAL_FEED_LIMIT = 100
+
+# Appointment import/export
+APPOINTMENT_EXPORT_CHUNK_SIZE = 2000
+APPOINTMENT_IMPORT_BATCH_SIZE = 1000
+
+# Therapist availability
+AVAILABILITY_SLOT_MINUTES = 30
+APPOINTMENT_MAX_DURATION_MINUTES = 480
+
+# Full-text search (see clinic/search.py): 'auto' picks the backend from the database
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_PAGE_SIZE = 50
+# Lowest similarity (0-1) a patient needs to appear in /api/users/autocomplete/
+PATIENT_LOOKUP_MIN_SCORE = 0.5
+
+# Idempotency-Key replay window for booking POSTs (see clinic/idempotency.py), and how
+# long a key stays claimed by a request that is still running
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Sliding-window rate limits for the public endpoints (see clinic/throttling.py), as
+# "requests/period" per client IP and per request field
+RATE_LIMIT_ENABLED = False  # like the DRF throttles, off for local development
+RATE_LIMITS = {
+    'public-booking': {'ip': '20/hour', 'email': '5/hour'},
+    'guest-lookup': {'ip': '60/hour', 'guest_id': '10/minute', 'email': '20/hour'},
+    'resend-verification': {'ip': '20/hour', 'email': '5/hour'},
+    'login': {'ip': '30/minute', 'username': '10/minute'},
+    'password-reset': {'ip': '20/hour', 'email': '5/hour'},
+}
+
+# Request profiler (see clinic/profiling.py and `manage.py profile_report`)
+QUERY_PROFILER_ENABLED = False
+QUERY_PROFILER_SAMPLE_RATE = 1.0
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = 5
 
 # Simplified Logging Configuration
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'clinic.profiling.JsonFormatter',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'performance_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -223,6 +324,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'performance': {
+            'handlers': ['performance_console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -6,9 +6,10 @@ class AdminAppointmentsManager {
         this.apiBaseUrl = CONFIG.API.BASE_URL;
         this.currentUser = null;
         this.appointments = [];
-        this.filteredAppointments = [];
+        this.nextUrl = null;
+        this.previousUrl = null;
         this.currentPage = 1;
-        this.itemsPerPage = 10;
+        this.searchTimer = null;
         
         this.init();
     }
@@ -71,32 +72,49 @@ class AdminAppointmentsManager {
     }
 
     // Data Loading Methods
-    async loadAppointments() {
+    // Loads one cursor page; without a url it starts again from the first page of the current filters
+    async loadAppointments(url = null, page = 1) {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/appointments/`, {
-                headers: this.getAuthHeaders()
+            const response = await fetch(url || `${this.apiBaseUrl}/appointments/?${this.getFilterParams()}`, {
+                headers: this.getAuthHeaders(),
+                credentials: 'include'
             });
 
-            if (response.ok) {
-                this.appointments = await response.json();
-                this.filteredAppointments = [...this.appointments];
-                this.renderAppointments();
-                this.updateStatistics();
-                this.updateAppointmentsCount();
-            } else {
+            if (!response.ok) {
                 throw new Error('Failed to load appointments');
             }
+            const data = await response.json();
+            this.appointments = data.results || data;
+            this.nextUrl = data.next || null;
+            this.previousUrl = data.previous || null;
+            this.currentPage = page;
+            this.renderAppointments();
+            if (!url) {
+                await Promise.all([this.updateStatistics(), this.updateAppointmentsCount()]);
+            }
         } catch (error) {
             console.error('Error loading appointments:', error);
             this.renderError('Failed to load appointments');
         }
     }
 
+    async fetchCount(params = '') {
+        const response = await fetch(`${this.apiBaseUrl}/appointments/count/?${params}`, {
+            headers: this.getAuthHeaders(),
+            credentials: 'include'
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to load appointment counts');
+        }
+        return response.json();
+    }
+
     // Rendering Methods
     renderAppointments() {
         const tbody = document.getElementById('appointments-tbody');
         
-        if (this.filteredAppointments.length === 0) {
+        if (this.appointments.length === 0) {
             tbody.innerHTML = `
                 <tr>
                     <td colspan="7" class="empty-row">
@@ -107,14 +125,11 @@ class AdminAppointmentsManager {
                     </td>
                 </tr>
             `;
+            this.renderPagination();
             return;
         }
 
-        const startIndex = (this.currentPage - 1) * this.itemsPerPage;
-        const endIndex = startIndex + this.itemsPerPage;
-        const pageAppointments = this.filteredAppointments.slice(startIndex, endIndex);
-
-        tbody.innerHTML = pageAppointments.map(appointment => {
+        tbody.innerHTML = this.appointments.map(appointment => {
             const appointmentDate = new Date(appointment.date);
             const formattedDate = appointmentDate.toLocaleDateString('en-US', {
                 year: 'numeric',
@@ -140,7 +155,7 @@ class AdminAppointmentsManager {
                     <td>
                         <div class="patient-info">
                             <strong>${patientName}</strong>
-                            ${appointment.user ? `<br><small>${appointment.user.email}</small>` : ''}
+                            ${appointment.patient_email ? `<br><small>${appointment.patient_email}</small>` : ''}
                         </div>
                     </td>
                     <td>${formattedDate}</td>
@@ -172,46 +187,22 @@ class AdminAppointmentsManager {
 
     renderPagination() {
         const pagination = document.getElementById('pagination');
-        const totalPages = Math.ceil(this.filteredAppointments.length / this.itemsPerPage);
         
-        if (totalPages <= 1) {
+        if (!this.nextUrl && !this.previousUrl) {
             pagination.innerHTML = '';
             return;
         }
 
-        let paginationHTML = '';
-        
-        // Previous button
-        paginationHTML += `
-            <button onclick="appointmentsManager.goToPage(${this.currentPage - 1})" 
-                    ${this.currentPage === 1 ? 'disabled' : ''}>
+        // Cursor pages have no total, so only the neighbouring pages can be reached
+        pagination.innerHTML = `
+            <button onclick="appointmentsManager.goToPreviousPage()" ${this.previousUrl ? '' : 'disabled'}>
                 <i class="fas fa-chevron-left"></i>
             </button>
-        `;
-
-        // Page numbers
-        for (let i = 1; i <= totalPages; i++) {
-            if (i === 1 || i === totalPages || (i >= this.currentPage - 2 && i <= this.currentPage + 2)) {
-                paginationHTML += `
-                    <button onclick="appointmentsManager.goToPage(${i})" 
-                            class="${i === this.currentPage ? 'active' : ''}">
-                        ${i}
-                    </button>
-                `;
-            } else if (i === this.currentPage - 3 || i === this.currentPage + 3) {
-                paginationHTML += '<span>...</span>';
-            }
-        }
-
-        // Next button
-        paginationHTML += `
-            <button onclick="appointmentsManager.goToPage(${this.currentPage + 1})" 
-                    ${this.currentPage === totalPages ? 'disabled' : ''}>
+            <button class="active">${this.currentPage}</button>
+            <button onclick="appointmentsManager.goToNextPage()" ${this.nextUrl ? '' : 'disabled'}>
                 <i class="fas fa-chevron-right"></i>
             </button>
         `;
-
-        pagination.innerHTML = paginationHTML;
     }
 
     renderError(message) {
@@ -265,7 +256,9 @@ class AdminAppointmentsManager {
         // Search functionality
         const searchInput = document.getElementById('search-input');
         searchInput.addEventListener('input', (e) => {
-            this.filterAppointments();
+            // Wait for a pause in typing before asking the server
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.filterAppointments(), 300);
         });
 
         // Filter controls
@@ -278,82 +271,66 @@ class AdminAppointmentsManager {
         dateFilter.addEventListener('change', () => this.filterAppointments());
     }
 
-    filterAppointments() {
-        const searchTerm = document.getElementById('search-input').value.toLowerCase();
-        const statusFilter = document.getElementById('status-filter').value;
-        const serviceFilter = document.getElementById('service-filter').value;
-        const dateFilter = document.getElementById('date-filter').value;
+    getFilterParams() {
+        const params = new URLSearchParams();
+        const filters = {
+            search: document.getElementById('search-input').value.trim(),
+            status: document.getElementById('status-filter').value,
+            service_type: document.getElementById('service-filter').value,
+            date__date: document.getElementById('date-filter').value
+        };
 
-        this.filteredAppointments = this.appointments.filter(appointment => {
-            // Search filter
-            const patientName = appointment.user ? 
-                `${appointment.user.first_name} ${appointment.user.last_name}`.toLowerCase() : 
-                (appointment.patient_name || '').toLowerCase();
-            const patientEmail = appointment.user ? appointment.user.email.toLowerCase() : '';
-            const notes = (appointment.note || '').toLowerCase();
-            
-            const matchesSearch = !searchTerm || 
-                patientName.includes(searchTerm) || 
-                patientEmail.includes(searchTerm) || 
-                notes.includes(searchTerm);
-
-            // Status filter
-            const matchesStatus = !statusFilter || appointment.status === statusFilter;
-
-            // Service filter
-            const matchesService = !serviceFilter || appointment.service_type === serviceFilter;
-
-            // Date filter
-            let matchesDate = true;
-            if (dateFilter) {
-                const appointmentDate = new Date(appointment.date);
-                const filterDate = new Date(dateFilter);
-                matchesDate = appointmentDate.toDateString() === filterDate.toDateString();
+        Object.entries(filters).forEach(([name, value]) => {
+            if (value) {
+                params.set(name, value);
             }
-
-            return matchesSearch && matchesStatus && matchesService && matchesDate;
         });
+        return params.toString();
+    }
 
-        this.currentPage = 1;
-        this.renderAppointments();
-        this.updateAppointmentsCount();
+    filterAppointments() {
+        // Filtering happens on the server, so every change starts again from the first page
+        this.loadAppointments();
     }
 
     // Pagination Methods
-    goToPage(page) {
-        const totalPages = Math.ceil(this.filteredAppointments.length / this.itemsPerPage);
-        if (page >= 1 && page <= totalPages) {
-            this.currentPage = page;
-            this.renderAppointments();
+    goToNextPage() {
+        if (this.nextUrl) {
+            this.loadAppointments(this.nextUrl, this.currentPage + 1);
         }
     }
 
-    // Statistics Methods
-    updateStatistics() {
-        const stats = {
-            scheduled: 0,
-            confirmed: 0,
-            completed: 0,
-            cancelled: 0,
-            total: this.appointments.length
-        };
-
-        this.appointments.forEach(apt => {
-            if (stats.hasOwnProperty(apt.status)) {
-                stats[apt.status]++;
-            }
-        });
+    goToPreviousPage() {
+        if (this.previousUrl) {
+            this.loadAppointments(this.previousUrl, this.currentPage - 1);
+        }
+    }
 
-        document.getElementById('scheduled-count').textContent = stats.scheduled;
-        document.getElementById('confirmed-count').textContent = stats.confirmed;
-        document.getElementById('completed-count').textContent = stats.completed;
-        document.getElementById('cancelled-count').textContent = stats.cancelled;
-        document.getElementById('total-count').textContent = stats.total;
+    // Statistics Methods
+    async updateStatistics() {
+        try {
+            const totals = await this.fetchCount();
+            const byStatus = totals.by_status;
+
+            document.getElementById('scheduled-count').textContent = byStatus.scheduled || 0;
+            document.getElementById('confirmed-count').textContent = byStatus.confirmed || 0;
+            document.getElementById('completed-count').textContent = byStatus.completed || 0;
+            document.getElementById('cancelled-count').textContent = byStatus.cancelled || 0;
+            document.getElementById('total-count').textContent = totals.count;
+        } catch (error) {
+            console.error('Error loading appointment statistics:', error);
+        }
     }
 
-    updateAppointmentsCount() {
+    async updateAppointmentsCount() {
         const countElement = document.getElementById('appointments-count');
-        countElement.textContent = `${this.filteredAppointments.length} appointment${this.filteredAppointments.length !== 1 ? 's' : ''}`;
+        try {
+            const { count } = await this.fetchCount(this.getFilterParams());
+            countElement.textContent = `${count} appointment${count !== 1 ? 's' : ''}`;
+        } catch (error) {
+            console.error('Error counting appointments:', error);
+            countElement.textContent = '';
+        }
     }
 
     // Action Methods
@@ -588,7 +565,7 @@ class AdminAppointmentsManager {
                     <strong>Patient:</strong> ${patientName}
                 </div>
                 <div class="detail-row">
-                    <strong>Email:</strong> ${appointment.user ? appointment.user.email : 'N/A'}
+                    <strong>Email:</strong> ${appointment.patient_email || 'N/A'}
                 </div>
                 <div class="detail-row">
                     <strong>Date:</strong> ${new Date(appointment.date).toLocaleString()}
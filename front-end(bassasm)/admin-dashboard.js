@@ -557,7 +557,7 @@ class AdminDashboard {
 
         try {
             // Validate session with backend using session cookies
-            const response = await fetch(`${this.apiBaseUrl}/users/validate_session/`, {
+            const response = await fetch(`${this.apiBaseUrl}/users/validate_session/?include=profile`, {
                 method: 'GET',
                 headers: {
                     'Content-Type': 'application/json',
@@ -567,7 +567,8 @@ class AdminDashboard {
 
             if (response.ok) {
                 const userData = await response.json();
-                this.currentUser = userData;
+                // The profile comes with the session check, so no second request is needed
+                this.currentUser = userData.profile ? { ...userData, ...userData.profile } : userData;
                 
                 // Check if user is admin
                 if (this.currentUser.role !== 'admin') {
@@ -622,13 +623,14 @@ class AdminDashboard {
     // Data Loading Methods
     async loadDashboardData() {
         try {
+            // Counts come pre-aggregated from /stats/; only the recent lists need appointment rows
             await Promise.all([
-                this.loadAllAppointments(),
-                this.loadUsers(),
-                this.loadTestimonials(),
-                this.updateStatistics()
+                this.loadStats(),
+                this.loadRecentAppointments()
             ]);
             
+            this.updateStatistics();
+            this.updateAppointmentStats();
             this.renderServiceChart();
             this.renderActivityList();
             this.hideLoadingStates();
@@ -640,85 +642,47 @@ class AdminDashboard {
         }
     }
 
-    async loadAllAppointments() {
+    async loadStats() {
+        const response = await fetch(`${this.apiBaseUrl}/stats/totals/`, {
+            headers: this.getAuthHeaders(),
+            credentials: 'include' // The stats endpoint is admin-only
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to load statistics');
+        }
+        this.stats = (await response.json()).totals;
+    }
+
+    async loadRecentAppointments() {
         try {
+            // The first page is ordered newest first, which is all the dashboard lists show
             const response = await fetch(`${this.apiBaseUrl}/appointments/`, {
                 headers: this.getAuthHeaders(),
                 credentials: 'include' // Include cookies for session authentication
             });
 
-            if (response.ok) {
-                this.appointments = await response.json();
-                this.renderRecentAppointments();
-                this.updateAppointmentStats();
-            } else {
+            if (!response.ok) {
                 throw new Error('Failed to load appointments');
             }
+            const data = await response.json();
+            this.appointments = data.results || data;
+            this.renderRecentAppointments();
         } catch (error) {
             console.error('Error loading appointments:', error);
+            this.appointments = [];
             this.renderAppointmentsError();
         }
     }
 
-    async loadUsers() {
-        try {
-            const response = await fetch(`${this.apiBaseUrl}/users/`, {
-                headers: this.getAuthHeaders()
-            });
-
-            if (response.ok) {
-                this.users = await response.json();
-            } else {
-                throw new Error('Failed to load users');
-            }
-        } catch (error) {
-            console.error('Error loading users:', error);
-            const currentLang = localStorage.getItem('lang') || 'en';
-            const t = translations[currentLang];
-            this.showNotification(t.notifications.failedToLoadUsers, 'error');
-        }
-    }
-
-    async loadTestimonials() {
-        try {
-            // Testimonials endpoint allows anonymous access, so we don't need auth headers
-            const response = await fetch(`${this.apiBaseUrl}/testimonials/`, {
-                headers: {
-                    'Content-Type': 'application/json'
-                }
-            });
-
-            if (response.ok) {
-                this.testimonials = await response.json();
-            } else {
-                throw new Error('Failed to load testimonials');
-            }
-        } catch (error) {
-            console.error('Error loading testimonials:', error);
-            const currentLang = localStorage.getItem('lang') || 'en';
-            const t = translations[currentLang];
-            this.showNotification(t.notifications.failedToLoadTestimonials, 'error');
-        }
-    }
-
-    async updateStatistics() {
-        try {
-            // Update dashboard statistics
-            document.getElementById('total-appointments').textContent = this.appointments.length;
-            document.getElementById('total-users').textContent = this.users.length;
-            document.getElementById('total-testimonials').textContent = this.testimonials.length;
-            
-            // Calculate today's appointments
-            const today = new Date();
-            const todayAppointments = this.appointments.filter(apt => {
-                const aptDate = new Date(apt.date);
-                return aptDate.toDateString() === today.toDateString();
-            }).length;
-            document.getElementById('today-appointments').textContent = todayAppointments;
-            
-        } catch (error) {
-            console.error('Error updating statistics:', error);
+    updateStatistics() {
+        if (!this.stats.appointments) {
+            return;
         }
+        document.getElementById('total-appointments').textContent = this.stats.appointments.total;
+        document.getElementById('total-users').textContent = this.stats.users;
+        document.getElementById('total-testimonials').textContent = this.stats.testimonials;
+        document.getElementById('today-appointments').textContent = this.stats.appointments.today;
     }
 
     // Rendering Methods
@@ -796,23 +760,12 @@ class AdminDashboard {
     }
 
     updateAppointmentStats() {
-        const stats = {
-            scheduled: 0,
-            confirmed: 0,
-            completed: 0,
-            cancelled: 0
-        };
+        const byStatus = this.stats.appointments?.by_status || {};
 
-        this.appointments.forEach(apt => {
-            if (stats.hasOwnProperty(apt.status)) {
-                stats[apt.status]++;
-            }
-        });
-
-        document.getElementById('scheduled-count').textContent = stats.scheduled;
-        document.getElementById('confirmed-count').textContent = stats.confirmed;
-        document.getElementById('completed-count').textContent = stats.completed;
-        document.getElementById('cancelled-count').textContent = stats.cancelled;
+        document.getElementById('scheduled-count').textContent = byStatus.scheduled || 0;
+        document.getElementById('confirmed-count').textContent = byStatus.confirmed || 0;
+        document.getElementById('completed-count').textContent = byStatus.completed || 0;
+        document.getElementById('cancelled-count').textContent = byStatus.cancelled || 0;
     }
 
     renderAppointmentsError() {
@@ -824,7 +777,7 @@ class AdminDashboard {
             <div class="error-state">
                 <i class="fas fa-exclamation-triangle"></i>
                 <p>${t.recentAppointments.failedToLoad}</p>
-                <button class="retry-btn" onclick="adminDashboard.loadAllAppointments()">${t.actions.retry}</button>
+                <button class="retry-btn" onclick="adminDashboard.loadRecentAppointments()">${t.actions.retry}</button>
             </div>
         `;
     }
@@ -1158,7 +1111,10 @@ class AdminDashboard {
         const currentLang = localStorage.getItem('lang') || 'en';
         const t = translations[currentLang];
         
-        if (!this.appointments || this.appointments.length === 0) {
+        const serviceCounts = this.stats.appointments?.by_service_type || {};
+        const totalAppointments = this.stats.appointments?.total || 0;
+
+        if (totalAppointments === 0) {
             serviceChart.innerHTML = `
                 <div class="empty-state">
                     <i class="fas fa-chart-pie"></i>
@@ -1168,17 +1124,10 @@ class AdminDashboard {
             return;
         }
 
-        // Count service types
-        const serviceCounts = {};
-        this.appointments.forEach(apt => {
-            const service = apt.service_type || 'unknown';
-            serviceCounts[service] = (serviceCounts[service] || 0) + 1;
-        });
-
         // Create service chart HTML
         const chartHTML = Object.entries(serviceCounts).map(([service, count]) => {
-            const serviceName = this.formatServiceType(service);
-            const percentage = ((count / this.appointments.length) * 100).toFixed(1);
+            const serviceName = this.formatServiceType(service || 'unknown');
+            const percentage = ((count / totalAppointments) * 100).toFixed(1);
             
             return `
                 <div class="service-item">
@@ -1338,28 +1287,25 @@ class AdminDashboard {
         });
 
         // Calculate statistics
-        const totalAppointments = this.appointments?.length || 0;
-        const completedAppointments = this.appointments?.filter(a => a.status === 'completed').length || 0;
-        const pendingAppointments = this.appointments?.filter(a => a.status === 'scheduled' || a.status === 'confirmed').length || 0;
-        const cancelledAppointments = this.appointments?.filter(a => a.status === 'cancelled').length || 0;
+        const appointmentTotals = this.stats.appointments || { total: 0, by_status: {}, by_service_type: {}, by_month: [] };
+        const byStatus = appointmentTotals.by_status;
+        const totalAppointments = appointmentTotals.total;
+        const completedAppointments = byStatus.completed || 0;
+        const pendingAppointments = (byStatus.scheduled || 0) + (byStatus.confirmed || 0);
+        const cancelledAppointments = byStatus.cancelled || 0;
 
         // Service type breakdown
         const serviceBreakdown = {};
-        if (this.appointments) {
-            this.appointments.forEach(appointment => {
-                const serviceType = appointment.service_type || 'unknown';
-                serviceBreakdown[serviceType] = (serviceBreakdown[serviceType] || 0) + 1;
-            });
-        }
+        Object.entries(appointmentTotals.by_service_type).forEach(([serviceType, count]) => {
+            serviceBreakdown[serviceType || 'unknown'] = count;
+        });
 
         // Monthly trends
         const monthlyTrends = {};
-        if (this.appointments) {
-            this.appointments.forEach(appointment => {
-                const month = new Date(appointment.date).toLocaleDateString('en-US', { year: 'numeric', month: 'long' });
-                monthlyTrends[month] = (monthlyTrends[month] || 0) + 1;
-            });
-        }
+        appointmentTotals.by_month.forEach(({ month, count }) => {
+            const label = new Date(`${month}-01T00:00:00`).toLocaleDateString('en-US', { year: 'numeric', month: 'long' });
+            monthlyTrends[label] = count;
+        });
 
         return {
             reportDate,
@@ -6,10 +6,9 @@ class AdminReportsManager {
         this.apiBaseUrl = CONFIG.API.BASE_URL;
         this.currentUser = null;
         this.charts = {};
+        this.stats = null;
         this.data = {
-            appointments: [],
-            users: [],
-            testimonials: []
+            appointments: []
         };
         this.init();
     }
@@ -18,9 +17,9 @@ class AdminReportsManager {
         try {
             await this.checkAdminAuthentication();
             this.setupDateRange();
+            this.initializeCharts();
             await this.loadAnalyticsData();
             this.setupEventListeners();
-            this.initializeCharts();
         } catch (error) {
             console.error('Admin reports manager initialization error:', error);
             this.handleAuthError();
@@ -85,10 +84,10 @@ class AdminReportsManager {
     // Data Loading Methods
     async loadAnalyticsData() {
         try {
+            // Aggregates are computed server-side; only the recent-activity feed needs rows
             await Promise.all([
-                this.loadAppointments(),
-                this.loadUsers(),
-                this.loadTestimonials()
+                this.loadStats(),
+                this.loadRecentAppointments()
             ]);
             
             this.updateMetrics();
@@ -98,97 +97,59 @@ class AdminReportsManager {
             this.hideLoadingStates();
         } catch (error) {
             console.error('Error loading analytics data:', error);
-            this.showError('Failed to load analytics data');
+            this.hideLoadingStates();
+            this.showError(`Failed to load clinic statistics: ${error.message}`);
         }
     }
 
-    async loadAppointments() {
-        try {
-            const response = await fetch(`${this.apiBaseUrl}/appointments/`, {
-                headers: this.getAuthHeaders()
-            });
+    async loadStats() {
+        const params = new URLSearchParams({
+            start: document.getElementById('start-date').value,
+            end: document.getElementById('end-date').value
+        });
+        // The stats endpoint is admin-only, so the session cookie has to go with the request
+        const response = await fetch(`${this.apiBaseUrl}/stats/?${params}`, {
+            headers: this.getAuthHeaders(),
+            credentials: 'include'
+        });
 
-            if (response.ok) {
-                this.data.appointments = await response.json();
-            } else {
-                throw new Error('Failed to load appointments');
-            }
-        } catch (error) {
-            console.error('Error loading appointments:', error);
+        if (response.status === 401 || response.status === 403) {
+            throw new Error('your session does not have admin access. Please sign in again.');
         }
-    }
-
-    async loadUsers() {
-        try {
-            const response = await fetch(`${this.apiBaseUrl}/users/`, {
-                headers: this.getAuthHeaders()
-            });
-
-            if (response.ok) {
-                this.data.users = await response.json();
-            } else {
-                throw new Error('Failed to load users');
-            }
-        } catch (error) {
-            console.error('Error loading users:', error);
+        if (!response.ok) {
+            throw new Error(`the server responded with ${response.status}`);
         }
+        this.stats = await response.json();
     }
 
-    async loadTestimonials() {
+    async loadRecentAppointments() {
         try {
-            // Testimonials endpoint allows anonymous access, so we don't need auth headers
-            const response = await fetch(`${this.apiBaseUrl}/testimonials/`, {
-                headers: {
-                    'Content-Type': 'application/json'
-                }
+            const response = await fetch(`${this.apiBaseUrl}/appointments/?fields=id,date,patient_name,created_at`, {
+                headers: this.getAuthHeaders(),
+                credentials: 'include'
             });
 
             if (response.ok) {
-                this.data.testimonials = await response.json();
+                const data = await response.json();
+                this.data.appointments = data.results || data;
             } else {
-                throw new Error('Failed to load testimonials');
+                throw new Error('Failed to load appointments');
             }
         } catch (error) {
-            console.error('Error loading testimonials:', error);
+            console.error('Error loading appointments:', error);
         }
     }
 
     // Metrics Update Methods
     updateMetrics() {
-        const startDate = new Date(document.getElementById('start-date').value);
-        const endDate = new Date(document.getElementById('end-date').value);
-        
-        // Filter data by date range
-        const filteredAppointments = this.data.appointments.filter(apt => {
-            const aptDate = new Date(apt.date);
-            return aptDate >= startDate && aptDate <= endDate;
-        });
+        const appointmentsTotal = this.stats.appointments.total;
 
-        const filteredUsers = this.data.users.filter(user => {
-            const userDate = new Date(user.date_joined);
-            return userDate >= startDate && userDate <= endDate;
-        });
-
-        const filteredTestimonials = this.data.testimonials.filter(testimonial => {
-            const testimonialDate = new Date(testimonial.created_at);
-            return testimonialDate >= startDate && testimonialDate <= endDate;
-        });
-
-        // Update metric displays
-        document.getElementById('total-appointments-metric').textContent = filteredAppointments.length;
-        document.getElementById('total-users-metric').textContent = filteredUsers.length;
-        
-        // Calculate average rating
-        if (filteredTestimonials.length > 0) {
-            const totalRating = filteredTestimonials.reduce((sum, t) => sum + t.rating, 0);
-            const avgRating = (totalRating / filteredTestimonials.length).toFixed(1);
-            document.getElementById('avg-rating-metric').textContent = avgRating;
-        } else {
-            document.getElementById('avg-rating-metric').textContent = '0.0';
-        }
+        document.getElementById('total-appointments-metric').textContent = appointmentsTotal;
+        document.getElementById('total-users-metric').textContent = this.stats.users.new_total;
+        document.getElementById('avg-rating-metric').textContent = this.stats.testimonials.average_rating.toFixed(1);
 
         // Calculate revenue (mock calculation)
-        const revenue = filteredAppointments.length * 50; // Assuming $50 per appointment
+        const revenue = appointmentsTotal * 50; // Assuming $50 per appointment
         document.getElementById('revenue-metric').textContent = `$${revenue}`;
     }
 
@@ -304,24 +265,19 @@ class AdminReportsManager {
     }
 
     updateAppointmentTrendsChart() {
-        const startDate = new Date(document.getElementById('start-date').value);
-        const endDate = new Date(document.getElementById('end-date').value);
+        const startDate = new Date(`${document.getElementById('start-date').value}T00:00:00`);
+        const endDate = new Date(`${document.getElementById('end-date').value}T00:00:00`);
+        const countsByDay = Object.fromEntries(
+            this.stats.appointments.by_day.map(row => [row.day, row.count])
+        );
         
-        // Generate date labels for the last 30 days
         const labels = [];
         const data = [];
         const currentDate = new Date(startDate);
         
         while (currentDate <= endDate) {
-            const dateStr = currentDate.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
-            labels.push(dateStr);
-            
-            const appointmentsOnDate = this.data.appointments.filter(apt => {
-                const aptDate = new Date(apt.date);
-                return aptDate.toDateString() === currentDate.toDateString();
-            }).length;
-            
-            data.push(appointmentsOnDate);
+            labels.push(currentDate.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }));
+            data.push(countsByDay[this.toIsoDate(currentDate)] || 0);
             currentDate.setDate(currentDate.getDate() + 1);
         }
 
@@ -331,48 +287,25 @@ class AdminReportsManager {
     }
 
     updateServiceDistributionChart() {
-        const serviceCounts = {};
-        
-        this.data.appointments.forEach(apt => {
-            const service = apt.service_type || 'unknown';
-            serviceCounts[service] = (serviceCounts[service] || 0) + 1;
-        });
+        const serviceCounts = this.stats.appointments.by_service_type;
 
-        const labels = Object.keys(serviceCounts).map(service => this.formatServiceType(service));
-        const data = Object.values(serviceCounts);
-
-        this.charts.serviceDistribution.data.labels = labels;
-        this.charts.serviceDistribution.data.datasets[0].data = data;
+        this.charts.serviceDistribution.data.labels = Object.keys(serviceCounts).map(service => this.formatServiceType(service));
+        this.charts.serviceDistribution.data.datasets[0].data = Object.values(serviceCounts);
         this.charts.serviceDistribution.update();
     }
 
     updateUserGrowthChart() {
-        const startDate = new Date(document.getElementById('start-date').value);
-        const endDate = new Date(document.getElementById('end-date').value);
-        
-        // Generate weekly labels
         const labels = [];
         const data = [];
-        const currentDate = new Date(startDate);
         
-        while (currentDate <= endDate) {
-            const weekStart = new Date(currentDate);
-            weekStart.setDate(currentDate.getDate() - currentDate.getDay());
-            
+        this.stats.users.new_by_week.forEach(row => {
+            const weekStart = new Date(`${row.week}T00:00:00`);
             const weekEnd = new Date(weekStart);
             weekEnd.setDate(weekStart.getDate() + 6);
             
-            const weekLabel = `${weekStart.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })} - ${weekEnd.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })}`;
-            labels.push(weekLabel);
-            
-            const usersInWeek = this.data.users.filter(user => {
-                const userDate = new Date(user.date_joined);
-                return userDate >= weekStart && userDate <= weekEnd;
-            }).length;
-            
-            data.push(usersInWeek);
-            currentDate.setDate(currentDate.getDate() + 7);
-        }
+            labels.push(`${weekStart.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })} - ${weekEnd.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })}`);
+            data.push(row.count);
+        });
 
         this.charts.userGrowth.data.labels = labels;
         this.charts.userGrowth.data.datasets[0].data = data;
@@ -382,8 +315,9 @@ class AdminReportsManager {
     // Rendering Methods
     renderTopServices() {
         const servicesList = document.getElementById('top-services-list');
+        const total = this.stats.appointments.total;
         
-        if (this.data.appointments.length === 0) {
+        if (total === 0) {
             servicesList.innerHTML = `
                 <div class="empty-state">
                     <i class="fas fa-stethoscope"></i>
@@ -393,21 +327,14 @@ class AdminReportsManager {
             return;
         }
 
-        // Count service occurrences
-        const serviceCounts = {};
-        this.data.appointments.forEach(apt => {
-            const service = apt.service_type || 'unknown';
-            serviceCounts[service] = (serviceCounts[service] || 0) + 1;
-        });
-
         // Sort by count and take top 5
-        const topServices = Object.entries(serviceCounts)
+        const topServices = Object.entries(this.stats.appointments.by_service_type)
             .sort(([,a], [,b]) => b - a)
             .slice(0, 5);
 
         servicesList.innerHTML = topServices.map(([service, count], index) => {
             const serviceName = this.formatServiceType(service);
-            const percentage = ((count / this.data.appointments.length) * 100).toFixed(1);
+            const percentage = ((count / total) * 100).toFixed(1);
             
             return `
                 <div class="service-item">
@@ -425,7 +352,7 @@ class AdminReportsManager {
     renderRecentActivity() {
         const activityList = document.getElementById('recent-activity-list');
         
-        if (this.data.appointments.length === 0 && this.data.users.length === 0) {
+        if (this.data.appointments.length === 0) {
             activityList.innerHTML = `
                 <div class="empty-state">
                     <i class="fas fa-history"></i>
@@ -435,32 +362,13 @@ class AdminReportsManager {
             return;
         }
 
-        // Combine and sort recent activities
-        const activities = [];
-        
-        // Add recent appointments
-        this.data.appointments.slice(0, 10).forEach(apt => {
-            activities.push({
-                type: 'appointment',
-                date: new Date(apt.date),
-                text: `New appointment scheduled for ${apt.user ? `${apt.user.first_name} ${apt.user.last_name}` : 'Anonymous'}`,
-                icon: 'fas fa-calendar-plus'
-            });
-        });
-
-        // Add recent user registrations
-        this.data.users.slice(0, 10).forEach(user => {
-            activities.push({
-                type: 'user',
-                date: new Date(user.date_joined),
-                text: `New user registered: ${user.first_name} ${user.last_name}`,
-                icon: 'fas fa-user-plus'
-            });
-        });
-
-        // Sort by date and take top 10
-        activities.sort((a, b) => b.date - a.date);
-        const recentActivities = activities.slice(0, 10);
+        const recentActivities = this.data.appointments.slice(0, 10).map(apt => ({
+            type: 'appointment',
+            date: new Date(apt.created_at || apt.date),
+            text: `New appointment scheduled for ${apt.patient_name || 'Anonymous'}`,
+            icon: 'fas fa-calendar-plus'
+        }));
+        recentActivities.sort((a, b) => b.date - a.date);
 
         activityList.innerHTML = recentActivities.map(activity => {
             const timeAgo = this.getTimeAgo(activity.date);
@@ -500,6 +408,12 @@ class AdminReportsManager {
         return serviceTypes[serviceType] || serviceType;
     }
 
+    toIsoDate(date) {
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${date.getFullYear()}-${month}-${day}`;
+    }
+
     getTimeAgo(date) {
         const now = new Date();
         const diffInSeconds = Math.floor((now - date) / 1000);
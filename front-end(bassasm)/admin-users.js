@@ -6,7 +6,10 @@ class AdminUsersManager {
         this.apiBaseUrl = CONFIG.API.BASE_URL;
         this.currentUser = null;
         this.users = [];
-        this.filteredUsers = [];
+        this.nextUrl = null;
+        this.previousUrl = null;
+        this.currentPage = 1;
+        this.searchTimer = null;
         this.init();
     }
 
@@ -69,20 +72,24 @@ class AdminUsersManager {
     }
 
     // Data Loading Methods
-    async loadUsers() {
+    // Loads one cursor page; without a url it starts again from the first page of the current filters
+    async loadUsers(url = null, page = 1) {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/users/`, {
-                headers: this.getAuthHeaders()
+            const response = await fetch(url || `${this.apiBaseUrl}/users/?${this.getFilterParams()}`, {
+                headers: this.getAuthHeaders(),
+                credentials: 'include'
             });
 
-            if (response.ok) {
-                this.users = await response.json();
-                this.filteredUsers = [...this.users];
-                this.renderUsersTable();
-                this.hideLoadingState();
-            } else {
+            if (!response.ok) {
                 throw new Error('Failed to load users');
             }
+            const data = await response.json();
+            this.users = data.results || data;
+            this.nextUrl = data.next || null;
+            this.previousUrl = data.previous || null;
+            this.currentPage = page;
+            this.renderUsersTable();
+            this.hideLoadingState();
         } catch (error) {
             console.error('Error loading users:', error);
             this.renderUsersError();
@@ -93,7 +100,9 @@ class AdminUsersManager {
     renderUsersTable() {
         const tableBody = document.getElementById('users-table-body');
         
-        if (this.filteredUsers.length === 0) {
+        this.renderPagination();
+
+        if (this.users.length === 0) {
             tableBody.innerHTML = `
                 <tr>
                     <td colspan="6" class="empty-state">
@@ -105,7 +114,7 @@ class AdminUsersManager {
             return;
         }
 
-        tableBody.innerHTML = this.filteredUsers.map(user => {
+        tableBody.innerHTML = this.users.map(user => {
             const statusClass = user.is_active ? 'status-active' : 'status-inactive';
             const statusText = user.is_active ? 'Active' : 'Inactive';
             const roleText = this.formatRole(user.role);
@@ -154,6 +163,38 @@ class AdminUsersManager {
         }).join('');
     }
 
+    renderPagination() {
+        const pagination = document.getElementById('pagination');
+        
+        if (!this.nextUrl && !this.previousUrl) {
+            pagination.innerHTML = '';
+            return;
+        }
+
+        // Cursor pages have no total, so only the neighbouring pages can be reached
+        pagination.innerHTML = `
+            <button onclick="adminUsersManager.goToPreviousPage()" ${this.previousUrl ? '' : 'disabled'}>
+                <i class="fas fa-chevron-left"></i>
+            </button>
+            <button class="active">${this.currentPage}</button>
+            <button onclick="adminUsersManager.goToNextPage()" ${this.nextUrl ? '' : 'disabled'}>
+                <i class="fas fa-chevron-right"></i>
+            </button>
+        `;
+    }
+
+    goToNextPage() {
+        if (this.nextUrl) {
+            this.loadUsers(this.nextUrl, this.currentPage + 1);
+        }
+    }
+
+    goToPreviousPage() {
+        if (this.previousUrl) {
+            this.loadUsers(this.previousUrl, this.currentPage - 1);
+        }
+    }
+
     renderUsersError() {
         const tableBody = document.getElementById('users-table-body');
         tableBody.innerHTML = `
@@ -198,31 +239,36 @@ class AdminUsersManager {
         const roleFilter = document.getElementById('role-filter');
         const statusFilter = document.getElementById('status-filter');
 
-        searchInput.addEventListener('input', () => this.filterUsers());
+        searchInput.addEventListener('input', () => {
+            // Wait for a pause in typing before asking the server
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.filterUsers(), 300);
+        });
         roleFilter.addEventListener('change', () => this.filterUsers());
         statusFilter.addEventListener('change', () => this.filterUsers());
     }
 
-    filterUsers() {
-        const searchTerm = document.getElementById('search-input').value.toLowerCase();
+    getFilterParams() {
+        const params = new URLSearchParams();
+        const searchTerm = document.getElementById('search-input').value.trim();
         const roleFilter = document.getElementById('role-filter').value;
         const statusFilter = document.getElementById('status-filter').value;
 
-        this.filteredUsers = this.users.filter(user => {
-            const matchesSearch = !searchTerm || 
-                user.first_name.toLowerCase().includes(searchTerm) ||
-                user.last_name.toLowerCase().includes(searchTerm) ||
-                user.email.toLowerCase().includes(searchTerm);
-            
-            const matchesRole = !roleFilter || user.role === roleFilter;
-            const matchesStatus = !statusFilter || 
-                (statusFilter === 'active' && user.is_active) ||
-                (statusFilter === 'inactive' && !user.is_active);
-
-            return matchesSearch && matchesRole && matchesStatus;
-        });
+        if (searchTerm) {
+            params.set('search', searchTerm);
+        }
+        if (roleFilter) {
+            params.set('role', roleFilter);
+        }
+        if (statusFilter) {
+            params.set('is_active', statusFilter === 'active' ? 'true' : 'false');
+        }
+        return params.toString();
+    }
 
-        this.renderUsersTable();
+    filterUsers() {
+        // Filtering happens on the server, so every change starts again from the first page
+        this.loadUsers();
     }
 
     // Action Methods
@@ -254,7 +254,7 @@ class TreatmentPlanCreator {
             const date = new Date(appointment.date).toLocaleDateString();
             const time = appointment.time ? appointment.time.substring(0, 5) : '';
             const serviceType = appointment.service_type ? appointment.service_type.replace('-', ' ').replace(/\b\w/g, l => l.toUpperCase()) : 'Unknown';
-            option.textContent = `${date} ${time} - ${serviceType} (${appointment.user?.first_name} ${appointment.user?.last_name})`;
+            option.textContent = `${date} ${time} - ${serviceType} (${appointment.patient_name})`;
             appointmentSelect.appendChild(option);
         });
     }
@@ -353,7 +353,7 @@ class TreatmentPlanCreator {
         }
 
         // Filter appointments for selected patient
-        const patientAppointments = this.appointments.filter(apt => apt.user?.id == selectedPatientId);
+        const patientAppointments = this.appointments.filter(apt => apt.patient_id == selectedPatientId);
         
         appointmentSelect.innerHTML = '<option value="">Choose an appointment...</option>';
         patientAppointments.forEach(appointment => {
@@ -525,8 +525,8 @@ class TreatmentPlanCreator {
 
     getPatientName(appointmentId) {
         const appointment = this.appointments.find(apt => apt.id == appointmentId);
-        if (appointment && appointment.user) {
-            return `${appointment.user.first_name} ${appointment.user.last_name}`;
+        if (appointment && appointment.patient_name) {
+            return appointment.patient_name;
         }
         return 'Unknown Patient';
     }
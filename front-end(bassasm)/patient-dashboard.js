@@ -217,7 +217,7 @@ class PatientDashboard {
 
             // Only try to validate session for non-patient users
 
-            const response = await fetch(`${this.apiBaseUrl}/users/validate_session/`, {
+            const response = await fetch(`${this.apiBaseUrl}/users/validate_session/?include=profile`, {
 
                 method: 'GET',
 
@@ -237,7 +237,9 @@ class PatientDashboard {
 
                 const userData = await response.json();
 
-                this.currentUser = userData;
+                // The profile comes with the session check, so no second request is needed
+
+                this.currentUser = userData.profile ? { ...userData, ...userData.profile } : userData;
 
                 this.updateWelcomeSection();
 
@@ -2741,7 +2743,9 @@ class PatientDashboard {
 
         try {
 
-            const response = await fetch(`${this.apiBaseUrl}/appointments/?count=true`, {
+            // Cursor pages carry no total, so the count comes from the aggregate action
+
+            const response = await fetch(`${this.apiBaseUrl}/appointments/count/?user=${this.currentUser.id}`, {
 
                 headers: this.getAuthHeaders(),
 